@@ -1,7 +1,9 @@
 from typing import List
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from deps import get_session
 from api_v1.services import categories
 from core.models.categories import CategoryModel, CategoryCreateModel, CategoryUpdateModel
 
@@ -53,7 +55,7 @@ router = APIRouter(tags=["Категории"])
         }
     }
 )
-async def get_categories():
+async def get_categories(session: AsyncSession = Depends(get_session)):
     """
     Получить список всех категорий.
     
@@ -63,7 +65,7 @@ async def get_categories():
     Raises:
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await categories.get_categories()
+    return await categories.get_categories(session)
 
 
 @router.post(
@@ -123,7 +125,7 @@ async def get_categories():
         }
     }
 )
-async def create_category(category_data: CategoryCreateModel):
+async def create_category(category_data: CategoryCreateModel, session: AsyncSession = Depends(get_session)):
     """
     Создает новую категорию.
     
@@ -138,7 +140,7 @@ async def create_category(category_data: CategoryCreateModel):
         HTTPException: 403 если нет прав для создания
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await categories.create_category(category_data)
+    return await categories.create_category(session, category_data)
 
 
 @router.put(
@@ -209,7 +211,7 @@ async def create_category(category_data: CategoryCreateModel):
         }
     }
 )
-async def update_category(category_id: int, category_data: CategoryUpdateModel):
+async def update_category(category_id: int, category_data: CategoryUpdateModel, session: AsyncSession = Depends(get_session)):
     """
     Обновляет существующую категорию.
     
@@ -226,7 +228,7 @@ async def update_category(category_id: int, category_data: CategoryUpdateModel):
         HTTPException: 404 если категория не найдена
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await categories.update_category(category_id, category_data)
+    return await categories.update_category(session, category_id, category_data)
 
 
 @router.delete(
@@ -288,7 +290,7 @@ async def update_category(category_id: int, category_data: CategoryUpdateModel):
         }
     }
 )
-async def delete_category(category_id: int):
+async def delete_category(category_id: int, session: AsyncSession = Depends(get_session)):
     """
     Удаляет категорию.
     
@@ -304,5 +306,5 @@ async def delete_category(category_id: int):
         HTTPException: 404 если категория не найдена
         HTTPException: 500 при внутренней ошибке сервера
     """
-    await categories.delete_category(category_id)
+    await categories.delete_category(session, category_id)
     return {"message": "Категория успешно удалена"}
\ No newline at end of file
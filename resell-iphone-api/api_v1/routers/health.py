@@ -1,19 +1,19 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from database import db
-from config import DatabaseMarker
+from deps import DatabaseMarker
 
 router = APIRouter(tags=["Health"])
 
 
 @router.get("/health-check")
-async def health_check():
+async def health_check(sessionmaker: async_sessionmaker = Depends(DatabaseMarker)):
     """
     Проверка работоспособности API и подключения к базе данных
     """
     try:
-        async with db.sessionmaker() as session:
+        async with sessionmaker() as session:
             # Пробуем выполнить простой запрос к базе данных
             result = await session.execute(text("SELECT 1"))
             db_status = "connected" if result.scalar() == 1 else "error"
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from core.models.images import ImageModel
+from deps import get_session
+from core.uploads import store_image_upload, discard_upload
+
+from core.models.images import ImageModel, ImageSize
 from api_v1.services.images import save_image, get_item_images, delete_image
 
 router = APIRouter(
@@ -23,9 +27,10 @@ router = APIRouter(
     Загружает изображение для указанного товара.
     
     - Поддерживаемые форматы: JPG, PNG, GIF
-    - Максимальный размер файла: 1MB
-    - Изображение сохраняется в директории static/uploads
-    - Генерируется уникальное имя файла
+    - Максимальный размер файла задается MAX_UPLOAD_SIZE (по умолчанию 10MB)
+    - Изображение сохраняется в static/uploads под именем по хэшу содержимого
+    - Одинаковые изображения хранятся одним файлом
+    - Строятся производные thumb, card и full в форматах JPEG и WebP без метаданных EXIF
     """,
     responses={
         200: {
@@ -34,16 +39,26 @@ router = APIRouter(
                 "application/json": {
                     "example": {
                         "id": 1,
-                        "file_path": "static/uploads/550e8400-e29b-41d4-a716-446655440000.jpg",
+                        "file_path": "static/uploads/9f/86/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08.jpg",
                         "item_id": 1,
-                        "created_at": "2024-04-15T12:00:00"
+                        "created_at": "2024-04-15T12:00:00",
+                        "variants": {
+                            "thumb": {
+                                "jpeg": "static/uploads/derived/9f/86/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08_thumb.jpg",
+                                "webp": "static/uploads/derived/9f/86/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08_thumb.webp"
+                            }
+                        }
                     }
                 }
             }
         }
     }
 )
-async def upload_image(item_id: int, file: UploadFile = File(...)):
+async def upload_image(
+    item_id: int,
+    file: UploadFile = File(...),
+    session: AsyncSession = Depends(get_session),
+):
     """
     Загружает изображение для товара.
     
@@ -57,11 +72,20 @@ async def upload_image(item_id: int, file: UploadFile = File(...)):
     Raises:
         HTTPException: 404 если товар не найден
         HTTPException: 400 если файл не является изображением
+        HTTPException: 413 если файл больше MAX_UPLOAD_SIZE
         HTTPException: 500 при ошибке сохранения файла
     """
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
-    return await save_image(file, item_id)
+
+    # Файл сохраняется до первого обращения к БД, чтобы соединение из пула
+    # не было занято на время записи на диск
+    upload = await store_image_upload(file)
+    try:
+        return await save_image(session, upload, item_id)
+    except BaseException:
+        await discard_upload(upload)
+        raise
 
 
 @router.get(
@@ -73,6 +97,7 @@ async def upload_image(item_id: int, file: UploadFile = File(...)):
     
     - Возвращает пустой список, если у товара нет изображений
     - Изображения сортируются по дате создания (от новых к старым)
+    - Параметр size подставляет в file_path уменьшенную JPEG-копию изображения
     """,
     responses={
         200: {
@@ -81,7 +106,7 @@ async def upload_image(item_id: int, file: UploadFile = File(...)):
                 "application/json": {
                     "example": [{
                         "id": 1,
-                        "file_path": "static/uploads/550e8400-e29b-41d4-a716-446655440000.jpg",
+                        "file_path": "static/uploads/9f/86/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08.jpg",
                         "item_id": 1,
                         "created_at": "2024-04-15T12:00:00"
                     }]
@@ -90,17 +115,24 @@ async def upload_image(item_id: int, file: UploadFile = File(...)):
         }
     }
 )
-async def get_images(item_id: int):
+async def get_images(
+    item_id: int,
+    size: Optional[ImageSize] = Query(
+        None, description="Размер изображения: thumb, card или full (по умолчанию оригинал)"
+    ),
+    session: AsyncSession = Depends(get_session),
+):
     """
     Получает список всех изображений товара.
     
     Args:
         item_id (int): ID товара
+        size (ImageSize, optional): Размер изображения в поле file_path
         
     Returns:
         List[ImageModel]: Список изображений товара
     """
-    return await get_item_images(item_id)
+    return await get_item_images(session, item_id, size)
 
 
 @router.delete(
@@ -109,7 +141,7 @@ async def get_images(item_id: int):
     description="""
     Удаляет изображение по его ID.
     
-    - Удаляет файл из файловой системы
+    - Удаляет файл и его производные после коммита, если на файл не ссылаются другие изображения
     - Удаляет запись из базы данных
     - Операция необратима
     """,
@@ -126,7 +158,7 @@ async def get_images(item_id: int):
         }
     }
 )
-async def remove_image(image_id: int):
+async def remove_image(image_id: int, session: AsyncSession = Depends(get_session)):
     """
     Удаляет изображение.
     
@@ -138,7 +170,6 @@ async def remove_image(image_id: int):
         
     Raises:
         HTTPException: 404 если изображение не найдено
-        HTTPException: 500 при ошибке удаления файла
     """
-    await delete_image(image_id)
+    await delete_image(session, image_id)
     return {"message": "Image deleted successfully"} 
\ No newline at end of file
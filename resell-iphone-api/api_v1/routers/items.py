@@ -1,19 +1,22 @@
-from fastapi import APIRouter, Query, Form, File, UploadFile
+from fastapi import APIRouter, Query, Form, File, UploadFile, Depends, Response
 from fastapi.params import Query
 from fastapi.exceptions import HTTPException
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from api_v1.services import items, users
-from core.models.items import ItemsModel, ItemExtendedModel, ItemCreateModel, ItemUpdateIsSold
+from core.models.items import ItemsModel, ItemExtendedModel, ItemsBatchModel, ItemCreateModel, ItemUpdateIsSold
 from core.models.users import UserBase
-from database import db
-from core.db.tables import Item
-from config import DatabaseMarker
+from deps import get_session
+from core.uploads import discard_upload, receive_image_upload
+from core.models.images import ImageSize
+from core.pagination import parse_ids
+from config import settings
 
 router = APIRouter(tags=["Товары"])
 
 
+
 @router.get(
     "/",
     response_model=ItemsModel,
@@ -24,7 +27,9 @@ router = APIRouter(tags=["Товары"])
     - Поддерживает фильтрацию по категории
     - Поддерживает сортировку по различным параметрам (цена, дата)
     - Реализовано разбиение на страницы
+    - Поддерживает keyset-пагинацию по курсору next_cursor для сортировки по дате и цене
     - Возвращает только актуальные объявления (не старше 7 дней)
+    - Ответы кэшируются (LISTING_CACHE_TTL) и сбрасываются при изменении товаров
     """,
     responses={
         200: {
@@ -34,6 +39,7 @@ router = APIRouter(tags=["Товары"])
                     "example": {
                         "page": 1,
                         "next_page": True,
+                        "next_cursor": "WyJkYXRlOmRlc2MiLCIyMDI0LTA0LTE1VDEyOjAwOjAwIiwxXQ",
                         "items": [
                             {
                                 "id": 1,
@@ -70,9 +76,16 @@ async def get_items(
     category: str = Query(None, description="Фильтр по категории"),
     page: int = Query(1, description="Номер страницы для разбиения на страницы"),
     filter_type: str = Query(
-        None, description="Тип фильтра (например, price, date)"
+        None, description="Поле сортировки: price или date"
+    ),
+    filter_value: str = Query(None, description="Направление сортировки: asc или desc"),
+    cursor: str = Query(
+        None, description="Курсор следующей страницы из поля next_cursor предыдущего ответа"
+    ),
+    limit: int = Query(
+        None, ge=1, description="Размер страницы (не больше PAGINATION_LIMIT)"
     ),
-    filter_value: str = Query(None, description="Значение фильтра (asc или desc)"),
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Получить список товаров с возможностью фильтрации и разбиения на страницы.
@@ -82,19 +95,27 @@ async def get_items(
         page (int, optional): Номер страницы для пагинации
         filter_type (str, optional): Поле для сортировки (price, date)
         filter_value (str, optional): Направление сортировки (asc, desc)
+        cursor (str, optional): Курсор для keyset-пагинации (сортировка по дате или цене)
+        limit (int, optional): Размер страницы
         
     Returns:
         ItemsModel: Модель со списком товаров и информацией о пагинации
         
     Raises:
+        HTTPException: 400 если поле или направление сортировки не поддерживается
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await items.get_items(
+    body = await items.get_cached_listing(
+        session,
+        unsold=False,
         category=category,
         page=page,
         filter_type=filter_type,
         filter_value=filter_value,
+        cursor=cursor,
+        limit=limit,
     )
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/unsold", response_model=ItemsModel)
@@ -102,9 +123,16 @@ async def get_unsold_items(
     category: str = Query(None, description="Фильтр по категории"),
     page: int = Query(1, description="Номер страницы для разбиения на страницы"),
     filter_type: str = Query(
-        None, description="Тип фильтра (например, цена, дата)"
+        None, description="Поле сортировки: price или date"
     ),
-    filter_value: str = Query(None, description="Значение для выбранного фильтра"),
+    filter_value: str = Query(None, description="Направление сортировки: asc или desc"),
+    cursor: str = Query(
+        None, description="Курсор следующей страницы из поля next_cursor предыдущего ответа"
+    ),
+    limit: int = Query(
+        None, ge=1, description="Размер страницы (не больше PAGINATION_LIMIT)"
+    ),
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Получить список непроданных товаров с возможностью фильтрации и разбиения на страницы.
@@ -118,20 +146,28 @@ async def get_unsold_items(
         page (int, необязательный): Номер страницы для разбиения на страницы. По умолчанию 1.
         filter_type (str, необязательный): Тип фильтра (например, цена, дата). По умолчанию None.
         filter_value (str, необязательный): Значение для выбранного фильтра. По умолчанию None.
+        cursor (str, необязательный): Курсор следующей страницы (next_cursor). По умолчанию None.
+        limit (int, необязательный): Размер страницы, не больше PAGINATION_LIMIT. По умолчанию None.
 
     Возвращает:
         ItemsModel: Модель со списком непроданных товаров, информацией о разбиении на страницы 
         и индикатором следующей страницы. Если товары не найдены — возвращает пустой список.
 
     Ошибки:
+        400: Неподдерживаемое поле или направление сортировки.
         500: Внутренняя ошибка сервера при получении данных.
     """
-    return await items.get_unsold_items(
+    body = await items.get_cached_listing(
+        session,
+        unsold=True,
         category=category,
         page=page,
         filter_type=filter_type,
         filter_value=filter_value,
+        cursor=cursor,
+        limit=limit,
     )
+    return Response(content=body, media_type="application/json")
 
 
 @router.get(
@@ -141,9 +177,10 @@ async def get_unsold_items(
     description="""
     Поиск товаров по строке запроса с возможностью разбиения на страницы.
     
-    - Поддерживает полнотекстовый поиск по названию и описанию
-    - Реализовано разбиение на страницы
-    - Возвращает только актуальные объявления (не старше 7 дней)
+    - Поддерживает полнотекстовый поиск по названию и описанию (совпадения в названии весят больше)
+    - Реализовано разбиение на страницы, в том числе по курсору next_cursor
+    - Возвращает только актуальные объявления (не старше 7 дней), по умолчанию только непроданные
+    - Дополнительно фильтрует по категории, диапазону цены и статусу продажи
     - Результаты сортируются по релевантности
     """,
     responses={
@@ -154,6 +191,7 @@ async def get_unsold_items(
                     "example": {
                         "page": 1,
                         "next_page": True,
+                        "next_cursor": "WyJkYXRlOmRlc2MiLCIyMDI0LTA0LTE1VDEyOjAwOjAwIiwxXQ",
                         "items": [
                             {
                                 "id": 1,
@@ -209,6 +247,17 @@ async def get_unsold_items(
 async def search_items(
     query: str = Query(..., description="Строка поиска"),
     page: int = Query(1, description="Номер страницы для разбиения на страницы"),
+    cursor: str = Query(
+        None, description="Курсор следующей страницы из поля next_cursor предыдущего ответа"
+    ),
+    limit: int = Query(
+        None, ge=1, description="Размер страницы (не больше PAGINATION_LIMIT)"
+    ),
+    category: str = Query(None, description="Фильтр по категории"),
+    price_min: float = Query(None, ge=0, description="Минимальная цена"),
+    price_max: float = Query(None, ge=0, description="Максимальная цена"),
+    is_sold: bool = Query(False, description="Искать среди проданных (true) или непроданных (false) товаров"),
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Поиск товаров по строке запроса.
@@ -216,6 +265,12 @@ async def search_items(
     Args:
         query (str): Строка поиска
         page (int, optional): Номер страницы для пагинации
+        cursor (str, optional): Курсор для keyset-пагинации по релевантности
+        limit (int, optional): Размер страницы
+        category (str, optional): Фильтр по категории
+        price_min (float, optional): Минимальная цена
+        price_max (float, optional): Максимальная цена
+        is_sold (bool, optional): Статус продажи, по умолчанию непроданные
         
     Returns:
         ItemsModel: Модель со списком найденных товаров и информацией о пагинации
@@ -225,10 +280,104 @@ async def search_items(
         HTTPException: 404 если товары не найдены
         HTTPException: 500 при внутренней ошибке сервера
     """
-    result = await items.get_search_results(search_query=query, page=page)
+    result = await items.get_search_results(
+        session,
+        search_query=query,
+        page=page,
+        cursor=cursor,
+        limit=limit,
+        category=category,
+        price_min=price_min,
+        price_max=price_max,
+        is_sold=is_sold,
+    )
     return result
 
 
+@router.get(
+    "/batch",
+    response_model=ItemsBatchModel,
+    summary="Получить несколько товаров по ID",
+    description="""
+    Получает товары по списку идентификаторов одним запросом.
+    
+    - Идентификаторы передаются через запятую: ?ids=3,1,2 (не больше BATCH_MAX_IDS)
+    - Товары возвращаются в порядке запрошенных ID, повторы не дублируются
+    - Не найденные ID перечисляются в поле missing, ошибка 404 не возвращается
+    - Просроченные объявления возвращаются только с include_archived=true
+    """,
+    responses={
+        200: {
+            "description": "Товары успешно получены",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "items": [
+                            {
+                                "id": 1,
+                                "name": "iPhone 13 Pro",
+                                "image": "static/uploads/image.jpg",
+                                "date": "2024-04-15T12:00:00",
+                                "price": 999.99,
+                                "currency": "USD",
+                                "category": "Смартфоны",
+                                "contact": "@username",
+                                "description": "Отличное состояние, гарантия",
+                                "user_id": 1,
+                                "username": "user123",
+                                "is_sold": False
+                            }
+                        ],
+                        "missing": [5]
+                    }
+                }
+            }
+        },
+        400: {
+            "description": "Некорректный список ID",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "ids must be a comma-separated list of integers"
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Внутренняя ошибка сервера",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Internal server error"
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_items_batch(
+    ids: str = Query(..., description="ID товаров через запятую"),
+    include_archived: bool = Query(False, description="Искать также среди архивных объявлений"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Получает несколько товаров по списку ID.
+    
+    Args:
+        ids (str): ID товаров через запятую
+        include_archived (bool, optional): Искать также в архиве объявлений
+        
+    Returns:
+        ItemsBatchModel: Найденные товары в порядке ids и список не найденных ID
+        
+    Raises:
+        HTTPException: 400 если список ID некорректен или слишком длинный
+        HTTPException: 500 при внутренней ошибке сервера
+    """
+    item_ids = parse_ids(ids, settings.batch_max_ids)
+    return await items.get_items_batch(session, item_ids, include_archived=include_archived)
+
+
 @router.get(
     "/{item_id}",
     response_model=ItemExtendedModel,
@@ -238,7 +387,9 @@ async def search_items(
     
     - Возвращает полную информацию о товаре
     - Включает данные о пользователе-продавце
-    - Возвращает только актуальные объявления (не старше 7 дней)
+    - Возвращает только актуальные объявления (не старше LISTING_TTL_DAYS дней)
+    - С include_archived=true возвращает также просроченные и архивные объявления
+    - Параметр size подставляет в image уменьшенную JPEG-копию изображения
     """,
     responses={
         200: {
@@ -284,12 +435,23 @@ async def search_items(
         }
     }
 )
-async def get_item(item_id: int):
+async def get_item(
+    item_id: int,
+    size: Optional[ImageSize] = Query(
+        None, description="Размер изображения: thumb, card или full (по умолчанию оригинал)"
+    ),
+    include_archived: bool = Query(
+        False, description="Искать также среди просроченных и архивных объявлений"
+    ),
+    session: AsyncSession = Depends(get_session),
+):
     """
     Получить информацию о товаре по его ID.
     
     Args:
         item_id (int): ID товара
+        size (ImageSize, optional): Размер изображения в поле image
+        include_archived (bool): Искать также в архиве объявлений
         
     Returns:
         ItemExtendedModel: Модель с полной информацией о товаре
@@ -298,7 +460,7 @@ async def get_item(item_id: int):
         HTTPException: 404 если товар не найден
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await items.get_item(item_id)
+    return await items.get_item(session, item_id, size, include_archived)
 
 
 @router.get(
@@ -320,6 +482,7 @@ async def get_item(item_id: int):
                     "example": {
                         "page": 1,
                         "next_page": True,
+                        "next_cursor": "WyJkYXRlOmRlc2MiLCIyMDI0LTA0LTE1VDEyOjAwOjAwIiwxXQ",
                         "items": [
                             {
                                 "id": 1,
@@ -364,7 +527,14 @@ async def get_item(item_id: int):
 )
 async def get_user_items(
     user_id: int,
-    page: int = Query(1, description="Номер страницы для разбиения на страницы")
+    page: int = Query(1, description="Номер страницы для разбиения на страницы"),
+    cursor: str = Query(
+        None, description="Курсор следующей страницы из поля next_cursor предыдущего ответа"
+    ),
+    limit: int = Query(
+        None, ge=1, description="Размер страницы (не больше PAGINATION_LIMIT)"
+    ),
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Получить список товаров пользователя.
@@ -372,6 +542,8 @@ async def get_user_items(
     Args:
         user_id (int): ID пользователя
         page (int, optional): Номер страницы для пагинации
+        cursor (str, optional): Курсор для keyset-пагинации
+        limit (int, optional): Размер страницы
         
     Returns:
         ItemsModel: Модель со списком товаров и информацией о пагинации
@@ -380,7 +552,7 @@ async def get_user_items(
         HTTPException: 404 если товары пользователя не найдены
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await items.get_users_items(user_id, page)
+    return await items.get_users_items(session, user_id, page, cursor=cursor, limit=limit)
 
 
 @router.get(
@@ -403,6 +575,7 @@ async def get_user_items(
                     "example": {
                         "page": 1,
                         "next_page": True,
+                        "next_cursor": "WyJkYXRlOmRlc2MiLCIyMDI0LTA0LTE1VDEyOjAwOjAwIiwxXQ",
                         "items": [
                             {
                                 "id": 1,
@@ -447,7 +620,14 @@ async def get_user_items(
 )
 async def get_user_unsold_items(
     user_id: int,
-    page: int = Query(1, description="Номер страницы для разбиения на страницы")
+    page: int = Query(1, description="Номер страницы для разбиения на страницы"),
+    cursor: str = Query(
+        None, description="Курсор следующей страницы из поля next_cursor предыдущего ответа"
+    ),
+    limit: int = Query(
+        None, ge=1, description="Размер страницы (не больше PAGINATION_LIMIT)"
+    ),
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Получить список непроданных товаров пользователя.
@@ -455,6 +635,8 @@ async def get_user_unsold_items(
     Args:
         user_id (int): ID пользователя
         page (int, optional): Номер страницы для пагинации
+        cursor (str, optional): Курсор для keyset-пагинации
+        limit (int, optional): Размер страницы
         
     Returns:
         ItemsModel: Модель со списком непроданных товаров и информацией о пагинации
@@ -463,7 +645,7 @@ async def get_user_unsold_items(
         HTTPException: 404 если непроданные товары пользователя не найдены
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await items.get_users_unsold_items(user_id, page)
+    return await items.get_users_unsold_items(session, user_id, page, cursor=cursor, limit=limit)
 
 
 @router.post(
@@ -476,8 +658,11 @@ async def get_user_unsold_items(
     - Все поля, кроме изображения, обязательны
     - Категория должна существовать в базе данных
     - Telegram ID пользователя должен быть указан
-    - Изображение сохраняется в директории static/uploads
-    - Генерируется уникальное имя файла для изображения
+    - Изображение сохраняется в static/uploads под именем по хэшу содержимого
+    - Одинаковые изображения хранятся одним файлом
+    - Вместо загрузки файла можно передать image_path — путь к файлу в общем
+      каталоге static (например, к фото, сохраненному ботом): файл связывается
+      жесткой ссылкой, его содержимое не передается в запросе
     """,
     responses={
         200: {
@@ -526,7 +711,9 @@ async def create_item(
     contact: str = Form(..., description="Контактная информация"),
     description: str = Form(..., description="Подробное описание товара"),
     image: UploadFile = File(None, description="Изображение товара (необязательно)"),
-    telegram_id: int = Query(..., description="Telegram ID пользователя, создающего объявление")
+    image_path: str = Form(None, description="Путь к изображению в общем каталоге static вместо image"),
+    telegram_id: int = Query(..., description="Telegram ID пользователя, создающего объявление"),
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Создает новое объявление с возможностью загрузки изображения.
@@ -539,6 +726,7 @@ async def create_item(
         contact (str): Контактная информация
         description (str): Описание товара
         image (UploadFile, optional): Изображение товара
+        image_path (str, optional): Путь к изображению в общем каталоге static
         telegram_id (int): Telegram ID пользователя
         
     Returns:
@@ -547,21 +735,31 @@ async def create_item(
     Raises:
         HTTPException: 404 если категория или пользователь не найдены
         HTTPException: 422 если данные некорректны
+        HTTPException: 400 если файл не является изображением, передан
+            недопустимый image_path или переданы одновременно image и image_path
+        HTTPException: 413 если изображение больше MAX_UPLOAD_SIZE
         HTTPException: 500 при внутренней ошибке сервера
     """
-    # Получаем ID пользователя по telegram_id
-    user_id = await users.get_user_id_by_telegram_id(telegram_id)
-    
-    data = ItemCreateModel(
-        name=name,
-        price=price,
-        currency=currency,
-        category=category,
-        contact=contact,
-        description=description,
-        image=image
-    )
-    await items.create_item(data, user_id)
+    # Файл сохраняется до первого обращения к БД, чтобы соединение из пула
+    # не было занято на время записи на диск
+    upload = await receive_image_upload(image, image_path)
+    try:
+        # Получаем ID пользователя по telegram_id
+        user_id = await users.get_user_id_by_telegram_id(session, telegram_id)
+
+        data = ItemCreateModel(
+            name=name,
+            price=price,
+            currency=currency,
+            category=category,
+            contact=contact,
+            description=description,
+        )
+        await items.create_item(session, data, user_id, upload)
+    except BaseException:
+        if upload:
+            await discard_upload(upload)
+        raise
 
 
 @router.patch(
@@ -574,8 +772,11 @@ async def create_item(
     
     - Все поля, кроме изображения, необязательны
     - Категория должна существовать в базе данных
-    - Изображение сохраняется в директории static/uploads
-    - Генерируется уникальное имя файла для изображения
+    - Изображение сохраняется в static/uploads под именем по хэшу содержимого
+    - Одинаковые изображения хранятся одним файлом
+    - Вместо загрузки файла можно передать image_path — путь к файлу в общем
+      каталоге static (например, к фото, сохраненному ботом): файл связывается
+      жесткой ссылкой, его содержимое не передается в запросе
     """,
     responses={
         204: {
@@ -617,7 +818,9 @@ async def update_item(
     category: str = Form(None, description="Название категории"),
     contact: str = Form(None, description="Контактная информация"),
     description: str = Form(None, description="Подробное описание товара"),
-    image: UploadFile = File(None, description="Изображение товара (необязательно)")
+    image: UploadFile = File(None, description="Изображение товара (необязательно)"),
+    image_path: str = Form(None, description="Путь к изображению в общем каталоге static вместо image"),
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Обновляет существующее объявление с возможностью загрузки нового изображения.
@@ -631,6 +834,7 @@ async def update_item(
         contact (str, optional): Новая контактная информация
         description (str, optional): Новое описание товара
         image (UploadFile, optional): Новое изображение товара
+        image_path (str, optional): Путь к новому изображению в общем каталоге static
         
     Returns:
         None: Если объявление успешно обновлено
@@ -638,18 +842,26 @@ async def update_item(
     Raises:
         HTTPException: 404 если товар или категория не найдены
         HTTPException: 422 если данные некорректны
+        HTTPException: 400 если файл не является изображением, передан
+            недопустимый image_path или переданы одновременно image и image_path
+        HTTPException: 413 если изображение больше MAX_UPLOAD_SIZE
         HTTPException: 500 при внутренней ошибке сервера
     """
-    data = ItemCreateModel(
-        name=name,
-        price=price,
-        currency=currency,
-        category=category,
-        contact=contact,
-        description=description,
-        image=image
-    )
-    await items.update_item(item_id, data)
+    upload = await receive_image_upload(image, image_path)
+    try:
+        data = ItemCreateModel(
+            name=name,
+            price=price,
+            currency=currency,
+            category=category,
+            contact=contact,
+            description=description,
+        )
+        await items.update_item(session, item_id, data, upload)
+    except BaseException:
+        if upload:
+            await discard_upload(upload)
+        raise
 
 
 @router.delete(
@@ -701,7 +913,7 @@ async def update_item(
         }
     }
 )
-async def delete_item(item_id: int):
+async def delete_item(item_id: int, session: AsyncSession = Depends(get_session)):
     """
     Удаляет товар по его ID.
     
@@ -716,7 +928,7 @@ async def delete_item(item_id: int):
         HTTPException: 403 если нет прав для удаления
         HTTPException: 500 при внутренней ошибке сервера
     """
-    await items.delete_item(item_id)
+    await items.delete_item(session, item_id)
 
 
 @router.patch(
@@ -786,7 +998,8 @@ async def delete_item(item_id: int):
 )
 async def update_item_is_sold(
     item_id: int,
-    is_sold_data: ItemUpdateIsSold
+    is_sold_data: ItemUpdateIsSold,
+    session: AsyncSession = Depends(get_session),
 ):
     """
     Обновляет статус is_sold для товара.
@@ -803,4 +1016,4 @@ async def update_item_is_sold(
         HTTPException: 403 если нет прав для обновления
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await items.update_item_is_sold(item_id, is_sold_data)
+    return await items.update_item_is_sold(session, item_id, is_sold_data)
@@ -1,5 +1,11 @@
-from fastapi import APIRouter, Query
-from core.models.orders import OrderModel, OrderCreateModel, OrderUpdateModel
+from fastapi import APIRouter, Query, Depends
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import settings
+from deps import DatabaseMarker, get_session
+from core.models.orders import (
+    OrderModel, OrderCreateModel, OrderUpdateModel, OrdersPageModel, OrderEventsModel,
+)
 from api_v1.services import orders
 
 router = APIRouter(tags=["Заказы"])
@@ -55,7 +61,7 @@ router = APIRouter(tags=["Заказы"])
         }
     }
 )
-async def create_order(order_data: OrderCreateModel):
+async def create_order(order_data: OrderCreateModel, session: AsyncSession = Depends(get_session)):
     """
     Создает новый заказ в системе.
     
@@ -69,7 +75,119 @@ async def create_order(order_data: OrderCreateModel):
         HTTPException: 404 если товар, покупатель или продавец не найдены
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await orders.create_order(order_data)
+    return await orders.create_order(session, order_data)
+
+
+@router.get(
+    "/events",
+    response_model=OrderEventsModel,
+    summary="Получить события заказов",
+    description="""
+    Возвращает смены статуса заказов (создание, оплата и т.д.) в порядке записи.
+    
+    - События пишутся в той же транзакции, что и изменение заказа, и не теряются
+    - Каждое событие содержит заказ с товаром (в том числе из архива)
+    - Ответ содержит cursor: его передают в следующий запрос, чтобы получить события после этих
+    - Без cursor событий нет, а cursor указывает на конец журнала — с него начинает новый потребитель
+    - События хранятся ORDER_EVENTS_RETENTION_DAYS дней: потребитель, отставший сильнее,
+      пропустит удаленные события
+    - wait > 0 включает long polling: если новых событий нет, ответ ждет их до wait секунд
+      (не больше ORDER_EVENTS_MAX_WAIT)
+    """,
+    responses={
+        200: {
+            "description": "События заказов успешно получены",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "events": [
+                            {
+                                "id": 15,
+                                "order_id": 2,
+                                "status": "PAID",
+                                "previous_status": "CREATED",
+                                "created_at": "2024-04-15T13:00:00",
+                                "order": {
+                                    "id": 2,
+                                    "item_id": 2,
+                                    "buyer_id": 2,
+                                    "seller_id": 4,
+                                    "buyer_telegram_id": 123456789,
+                                    "seller_telegram_id": 987654321,
+                                    "buyer_phone": "+79990000000",
+                                    "seller_phone": "+79991111111",
+                                    "delivery_address": "Москва, ул. Ленина, 1",
+                                    "status": "PAID",
+                                    "total": 999.99,
+                                    "created_at": "2024-04-15T12:00:00",
+                                    "updated_at": "2024-04-15T13:00:00",
+                                    "item": {
+                                        "id": 2,
+                                        "name": "iPhone 13 Pro",
+                                        "price": 999.99,
+                                        "currency": "USD",
+                                        "is_sold": True,
+                                        "archived": False
+                                    },
+                                    "buyer": None,
+                                    "seller": None
+                                }
+                            }
+                        ],
+                        "cursor": "WyJ0eGlkOmFzYyIsNzQxLDE1XQ"
+                    }
+                }
+            }
+        },
+        400: {
+            "description": "Некорректный курсор",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Invalid cursor"
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Внутренняя ошибка сервера",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Internal server error"
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_order_events(
+    cursor: str = Query(None, description="Курсор из поля cursor предыдущего ответа"),
+    limit: int = Query(
+        None, ge=1, description="Максимум событий в ответе (не больше PAGINATION_LIMIT)"
+    ),
+    wait: float = Query(
+        0, ge=0, le=settings.order_events_max_wait,
+        description="Сколько секунд ждать новых событий, если их пока нет",
+    ),
+    sessionmaker: async_sessionmaker = Depends(DatabaseMarker),
+):
+    """
+    Получает события заказов после курсора.
+    
+    Args:
+        cursor (str, optional): Курсор из предыдущего ответа
+        limit (int, optional): Максимум событий в ответе
+        wait (float, optional): Время ожидания новых событий в секундах
+        
+    Returns:
+        OrderEventsModel: События и курсор для следующего запроса
+        
+    Raises:
+        HTTPException: 400 если курсор поврежден
+        HTTPException: 500 при внутренней ошибке сервера
+    """
+    return await orders.wait_for_order_events(sessionmaker, cursor, limit, wait)
 
 
 @router.get(
@@ -122,7 +240,7 @@ async def create_order(order_data: OrderCreateModel):
         }
     }
 )
-async def get_order(order_id: int):
+async def get_order(order_id: int, session: AsyncSession = Depends(get_session)):
     """
     Получает информацию о заказе по его ID.
     
@@ -136,7 +254,7 @@ async def get_order(order_id: int):
         HTTPException: 404 если заказ не найден
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await orders.get_order(order_id)
+    return await orders.get_order(session, order_id)
 
 
 @router.patch(
@@ -189,7 +307,7 @@ async def get_order(order_id: int):
         }
     }
 )
-async def update_order(order_id: int, order_data: OrderUpdateModel):
+async def update_order(order_id: int, order_data: OrderUpdateModel, session: AsyncSession = Depends(get_session)):
     """
     Обновляет информацию о заказе.
     
@@ -204,45 +322,71 @@ async def update_order(order_id: int, order_data: OrderUpdateModel):
         HTTPException: 404 если заказ не найден
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await orders.update_order(order_id, order_data)
+    return await orders.update_order(session, order_id, order_data)
 
 
 @router.get(
     "/user/{user_id}",
-    response_model=list[OrderModel],
+    response_model=OrdersPageModel,
     summary="Получить заказы пользователя",
     description="""
-    Получает список заказов пользователя.
+    Получает страницу заказов пользователя, новые первыми.
     
     - Можно получить заказы как покупателя или продавца
-    - Возвращает полную информацию о каждом заказе
-    - Включает статус и даты создания/обновления
+    - Фильтр по статусу заказа (CREATED, PAID)
+    - Разбиение на страницы по курсору next_cursor, размер страницы не больше PAGINATION_LIMIT
+    - expand=item,buyer,seller добавляет товар (в том числе из архива) и участников сделки,
+      данные подтягиваются тем же запросом к базе
     """,
     responses={
         200: {
             "description": "Список заказов пользователя успешно получен",
             "content": {
                 "application/json": {
-                    "example": [
-                        {
-                            "id": 1,
-                            "item_id": 1,
-                            "buyer_id": 2,
-                            "seller_id": 3,
-                            "status": "created",
-                            "created_at": "2024-04-15T12:00:00",
-                            "updated_at": "2024-04-15T12:00:00"
-                        },
-                        {
-                            "id": 2,
-                            "item_id": 2,
-                            "buyer_id": 2,
-                            "seller_id": 4,
-                            "status": "completed",
-                            "created_at": "2024-04-15T11:00:00",
-                            "updated_at": "2024-04-15T13:00:00"
-                        }
-                    ]
+                    "example": {
+                        "orders": [
+                            {
+                                "id": 2,
+                                "item_id": 2,
+                                "buyer_id": 2,
+                                "seller_id": 4,
+                                "buyer_telegram_id": 123456789,
+                                "seller_telegram_id": 987654321,
+                                "buyer_phone": "+79990000000",
+                                "seller_phone": "+79991111111",
+                                "delivery_address": "Москва, ул. Ленина, 1",
+                                "status": "PAID",
+                                "total": 999.99,
+                                "created_at": "2024-04-15T12:00:00",
+                                "updated_at": "2024-04-15T13:00:00",
+                                "item": {
+                                    "id": 2,
+                                    "name": "iPhone 13 Pro",
+                                    "price": 999.99,
+                                    "currency": "USD",
+                                    "is_sold": True,
+                                    "archived": False
+                                },
+                                "buyer": {
+                                    "id": 2,
+                                    "username": "user123",
+                                    "name": "Иван Иванов"
+                                },
+                                "seller": None
+                            }
+                        ],
+                        "next_cursor": "WyJjcmVhdGVkX2F0OmRlc2MiLCIyMDI0LTA0LTE1VDEyOjAwOjAwIiwyXQ"
+                    }
+                }
+            }
+        },
+        400: {
+            "description": "Некорректный курсор или значение expand",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Unknown expand value: items"
+                    }
                 }
             }
         },
@@ -260,19 +404,41 @@ async def update_order(order_id: int, order_data: OrderUpdateModel):
 )
 async def get_user_orders(
     user_id: int,
-    is_buyer: bool = Query(True, description="Получить заказы как покупателя (True) или продавца (False)")
+    is_buyer: bool = Query(True, description="Получить заказы как покупателя (True) или продавца (False)"),
+    status: str = Query(None, description="Фильтр по статусу заказа"),
+    cursor: str = Query(
+        None, description="Курсор следующей страницы из поля next_cursor предыдущего ответа"
+    ),
+    limit: int = Query(
+        None, ge=1, description="Размер страницы (не больше PAGINATION_LIMIT)"
+    ),
+    expand: str = Query(None, description="Связанные данные через запятую: item, buyer, seller"),
+    session: AsyncSession = Depends(get_session),
 ):
     """
-    Получает список заказов пользователя.
+    Получает страницу заказов пользователя.
     
     Args:
         user_id (int): ID пользователя
         is_buyer (bool, optional): Флаг, указывающий, является ли пользователь покупателем
+        status (str, optional): Фильтр по статусу заказа
+        cursor (str, optional): Курсор для keyset-пагинации
+        limit (int, optional): Размер страницы
+        expand (str, optional): Связанные данные: item, buyer, seller
         
     Returns:
-        list[OrderModel]: Список заказов пользователя
+        OrdersPageModel: Заказы текущей страницы и курсор следующей
         
     Raises:
+        HTTPException: 400 если курсор поврежден или expand содержит неизвестное значение
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await orders.get_user_orders(user_id, is_buyer) 
\ No newline at end of file
+    return await orders.get_user_orders(
+        session,
+        user_id,
+        is_buyer,
+        status=status,
+        cursor=cursor,
+        limit=limit,
+        expand=orders.parse_expand(expand),
+    ) 
\ No newline at end of file
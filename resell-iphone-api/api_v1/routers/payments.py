@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from deps import get_session
 from api_v1.services.payments import PaymentService
 
 router = APIRouter(
@@ -22,5 +25,5 @@ router = APIRouter(
     response_description="Подтверждение получения уведомления",
     status_code=200
 )
-async def yookassa_webhook(request: Request):
-    return await PaymentService.handle_webhook(request) 
\ No newline at end of file
+async def yookassa_webhook(request: Request, session: AsyncSession = Depends(get_session)):
+    return await PaymentService.handle_webhook(request, session) 
\ No newline at end of file
@@ -1,5 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from deps import DatabaseMarker
 from api_v1.services import statistics
 from core.models.statistics import StatisticsResponse
 
@@ -17,6 +19,9 @@ router = APIRouter(tags=["Статистика"])
     - Количество активных продавцов и покупателей
     - Статистика заказов за разные периоды
     - Финансовая статистика за разные периоды
+    
+    Ответ кэшируется (STATISTICS_CACHE_TTL); время расчета указано в last_updated.
+    Параметр fresh=true принудительно пересчитывает статистику.
     """,
     responses={
         200: {
@@ -51,14 +56,20 @@ router = APIRouter(tags=["Статистика"])
         }
     }
 )
-async def get_statistics():
+async def get_statistics(
+    fresh: bool = Query(False, description="Пересчитать статистику, не используя кэш"),
+    sessionmaker: async_sessionmaker = Depends(DatabaseMarker),
+):
     """
     Получает полную статистику магазина.
     
+    Args:
+        fresh (bool, optional): Пересчитать статистику, не используя кэш
+        
     Returns:
         StatisticsResponse: Объект со статистикой магазина
         
     Raises:
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await statistics.get_statistics() 
\ No newline at end of file
+    return await statistics.get_cached_statistics(sessionmaker, fresh=fresh) 
\ No newline at end of file
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from deps import get_session
+from core.pagination import parse_ids
 from api_v1.services import users
 
 from core.models.users import (
     UserResponseModel, 
+    UsersBatchModel,
     UserBase,
     RoleBase,
     RoleResponseModel
@@ -80,7 +86,7 @@ router = APIRouter(tags=["Пользователи"])
         }
     }
 )
-async def create_user(data: UserBase) -> UserResponseModel:
+async def create_user(data: UserBase, session: AsyncSession = Depends(get_session)) -> UserResponseModel:
     """
     Создает нового пользователя.
     
@@ -95,7 +101,90 @@ async def create_user(data: UserBase) -> UserResponseModel:
         HTTPException: 422 при некорректных данных запроса
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await users.create_user(data)
+    return await users.create_user(session, data)
+
+
+@router.get(
+    "/batch",
+    response_model=UsersBatchModel,
+    summary="Получить несколько пользователей по ID",
+    description="""
+    Получает пользователей по списку идентификаторов одним запросом.
+    
+    - Идентификаторы передаются через запятую: ?ids=3,1,2 (не больше BATCH_MAX_IDS)
+    - Пользователи возвращаются в порядке запрошенных ID, повторы не дублируются
+    - Не найденные ID перечисляются в поле missing, ошибка 404 не возвращается
+    """,
+    responses={
+        200: {
+            "description": "Пользователи успешно получены",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "users": [
+                            {
+                                "id": 1,
+                                "username": "john_doe",
+                                "name": "John Doe",
+                                "contact": "@johndoe",
+                                "telegram_id": 123456789,
+                                "role_id": 1,
+                                "created_at": "2024-04-15T12:00:00",
+                                "updated_at": "2024-04-15T12:00:00",
+                                "role": {
+                                    "id": 1,
+                                    "name": "user",
+                                    "description": "Обычный пользователь",
+                                    "created_at": "2024-04-15T12:00:00",
+                                    "updated_at": "2024-04-15T12:00:00"
+                                }
+                            }
+                        ],
+                        "missing": [7]
+                    }
+                }
+            }
+        },
+        400: {
+            "description": "Некорректный список ID",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "ids must be a comma-separated list of integers"
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Внутренняя ошибка сервера",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Internal server error"
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_users_batch(
+    ids: str = Query(..., description="ID пользователей через запятую"),
+    session: AsyncSession = Depends(get_session),
+) -> UsersBatchModel:
+    """
+    Получает несколько пользователей по списку ID.
+    
+    Args:
+        ids (str): ID пользователей через запятую
+        
+    Returns:
+        UsersBatchModel: Найденные пользователи в порядке ids и список не найденных ID
+        
+    Raises:
+        HTTPException: 400 если список ID некорректен или слишком длинный
+        HTTPException: 500 при внутренней ошибке сервера
+    """
+    return await users.get_users_batch(session, parse_ids(ids, settings.batch_max_ids))
 
 
 @router.get(
@@ -156,7 +245,7 @@ async def create_user(data: UserBase) -> UserResponseModel:
         }
     }
 )
-async def get_user(user_id: int) -> UserResponseModel:
+async def get_user(user_id: int, session: AsyncSession = Depends(get_session)) -> UserResponseModel:
     """
     Получает информацию о пользователе по его ID.
     
@@ -170,7 +259,84 @@ async def get_user(user_id: int) -> UserResponseModel:
         HTTPException: 404 если пользователь не найден
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await users.get_user(user_id)
+    return await users.get_user(session, user_id)
+
+
+@router.get(
+    "/telegram/{telegram_id}",
+    response_model=UserResponseModel,
+    summary="Получить пользователя по Telegram ID",
+    description="""
+    Получает полную информацию о пользователе с ролью по его Telegram ID.
+    
+    - Заменяет последовательные запросы /telegram/{telegram_id}/exists, /telegram/{telegram_id}/id и /{user_id}
+    - Ответ кэшируется в памяти API на USER_CACHE_TTL секунд, создание пользователя и смена роли сбрасывают кэш
+    - Возвращает 404 если пользователь не зарегистрирован
+    """,
+    responses={
+        200: {
+            "description": "Информация о пользователе успешно получена",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "id": 1,
+                        "username": "user123",
+                        "name": "Иван Иванов",
+                        "contact": "@ivanov",
+                        "telegram_id": 123456789,
+                        "role_id": 1,
+                        "created_at": "2024-04-15T12:00:00",
+                        "updated_at": "2024-04-15T12:00:00",
+                        "role": {
+                            "id": 1,
+                            "name": "user",
+                            "description": "Обычный пользователь",
+                            "created_at": "2024-04-15T12:00:00",
+                            "updated_at": "2024-04-15T12:00:00"
+                        }
+                    }
+                }
+            }
+        },
+        404: {
+            "description": "Пользователь с указанным Telegram ID не найден",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "User not found"
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Внутренняя ошибка сервера",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Internal server error"
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_user_by_telegram_id(
+    telegram_id: int, session: AsyncSession = Depends(get_session)
+) -> UserResponseModel:
+    """
+    Получает информацию о пользователе по его Telegram ID.
+    
+    Args:
+        telegram_id (int): Telegram ID пользователя
+        
+    Returns:
+        UserResponseModel: Полная информация о пользователе
+        
+    Raises:
+        HTTPException: 404 если пользователь не найден
+        HTTPException: 500 при внутренней ошибке сервера
+    """
+    return await users.get_user_by_telegram_id(session, telegram_id)
 
 
 @router.get(
@@ -215,7 +381,7 @@ async def get_user(user_id: int) -> UserResponseModel:
         }
     }
 )
-async def get_user_id_by_telegram_id(telegram_id: int) -> int:
+async def get_user_id_by_telegram_id(telegram_id: int, session: AsyncSession = Depends(get_session)) -> int:
     """
     Получает ID пользователя по его Telegram ID.
     
@@ -229,7 +395,7 @@ async def get_user_id_by_telegram_id(telegram_id: int) -> int:
         HTTPException: 404 если пользователь не найден
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await users.get_user_id_by_telegram_id(telegram_id)
+    return await users.get_user_id_by_telegram_id(session, telegram_id)
 
 
 @router.get(
@@ -264,7 +430,7 @@ async def get_user_id_by_telegram_id(telegram_id: int) -> int:
         }
     }
 )
-async def check_user_exists(telegram_id: int) -> bool:
+async def check_user_exists(telegram_id: int, session: AsyncSession = Depends(get_session)) -> bool:
     """
     Проверяет существование пользователя по Telegram ID.
     
@@ -277,7 +443,7 @@ async def check_user_exists(telegram_id: int) -> bool:
     Raises:
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await users.check_user_exists(telegram_id)
+    return await users.check_user_exists(session, telegram_id)
 
 
 @router.post(
@@ -339,7 +505,7 @@ async def check_user_exists(telegram_id: int) -> bool:
         }
     }
 )
-async def create_role(data: RoleBase) -> RoleResponseModel:
+async def create_role(data: RoleBase, session: AsyncSession = Depends(get_session)) -> RoleResponseModel:
     """
     Создает новую роль в системе.
     
@@ -354,7 +520,7 @@ async def create_role(data: RoleBase) -> RoleResponseModel:
         HTTPException: 422 при некорректных данных запроса
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await users.create_role(data)
+    return await users.create_role(session, data)
 
 
 @router.get(
@@ -404,7 +570,7 @@ async def create_role(data: RoleBase) -> RoleResponseModel:
         }
     }
 )
-async def get_roles() -> list[RoleResponseModel]:
+async def get_roles(session: AsyncSession = Depends(get_session)) -> list[RoleResponseModel]:
     """
     Получает список всех ролей в системе.
     
@@ -414,7 +580,7 @@ async def get_roles() -> list[RoleResponseModel]:
     Raises:
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await users.get_roles()
+    return await users.get_roles(session)
 
 
 @router.put(
@@ -475,7 +641,7 @@ async def get_roles() -> list[RoleResponseModel]:
         }
     }
 )
-async def update_user_role(user_id: int, role_id: int) -> UserResponseModel:
+async def update_user_role(user_id: int, role_id: int, session: AsyncSession = Depends(get_session)) -> UserResponseModel:
     """
     Обновляет роль пользователя.
     
@@ -490,4 +656,4 @@ async def update_user_role(user_id: int, role_id: int) -> UserResponseModel:
         HTTPException: 404 если пользователь или роль не найдены
         HTTPException: 500 при внутренней ошибке сервера
     """
-    return await users.update_user_role(user_id, role_id)
+    return await users.update_user_role(session, user_id, role_id)
@@ -1,86 +1,101 @@
-import os
-import uuid
-from typing import List
-from fastapi import UploadFile, HTTPException
-from sqlalchemy import select
+import logging
+from typing import List, Optional
+from fastapi import HTTPException
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.db.hooks import on_commit
 from core.db.tables import Image, Item
-from core.models.images import ImageModel, ImageCreateModel
-from database import db
-
-
-async def save_image(file: UploadFile, item_id: int) -> ImageModel:
-    # Create uploads directory if it doesn't exist
-    upload_dir = "static/uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filename
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(upload_dir, unique_filename)
-    
-    # Save file
-    try:
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
-    
-    # Save to database
-    async with db.sessionmaker() as session:
-        # Verify item exists
-        item = await session.execute(select(Item).where(Item.id == item_id))
-        if not item.scalars().first():
-            raise HTTPException(status_code=404, detail="Item not found")
+from core.imaging import pick_variant
+from core.models.images import ImageModel, ImageCreateModel, ImageSize
+from core.uploads import StoredUpload, remove_image_files
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def _to_image_model(image: Image, size: Optional[ImageSize] = None) -> ImageModel:
+    return ImageModel(
+        id=image.id,
+        file_path=pick_variant(image.file_path, image.variants, size and size.value),
+        item_id=image.item_id,
+        created_at=image.created_at.isoformat(),
+        variants=image.variants,
+        content_hash=image.content_hash,
+    )
+
+
+def new_image(upload: StoredUpload, item_id: int) -> Image:
+    return Image(
+        file_path=upload.path,
+        content_hash=upload.content_hash,
+        variants=upload.variants,
+        item_id=item_id,
+    )
+
+
+async def count_references(session: AsyncSession, content_hash: str) -> int:
+    """Число записей images, ссылающихся на файл с содержимым content_hash."""
+    return await session.scalar(
+        select(func.count()).select_from(Image).where(Image.content_hash == content_hash)
+    )
+
+
+async def save_image(session: AsyncSession, upload: StoredUpload, item_id: int) -> ImageModel:
+    """
+    Создает запись об изображении. upload — уже сохраненный на диск файл
+    с производными (core.uploads.store_image_upload).
+    """
+    # Verify item exists
+    item = await session.execute(select(Item).where(Item.id == item_id))
+    if not item.scalars().first():
+        raise HTTPException(status_code=404, detail="Item not found")
         
-        # Create image record
-        image = Image(file_path=file_path, item_id=item_id)
-        session.add(image)
-        await session.commit()
-        await session.refresh(image)
+    # Create image record
+    image = new_image(upload, item_id)
+    session.add(image)
+    await session.flush()
+    await session.refresh(image)
         
-        return ImageModel(
-            id=image.id,
-            file_path=image.file_path,
-            item_id=image.item_id,
-            created_at=image.created_at.isoformat()
-        )
-
-
-async def get_item_images(item_id: int) -> List[ImageModel]:
-    async with db.sessionmaker() as session:
-        query = select(Image).where(Image.item_id == item_id)
-        result = await session.execute(query)
-        images = result.scalars().all()
+    return _to_image_model(image)
+
+
+async def get_item_images(
+    session: AsyncSession, item_id: int, size: Optional[ImageSize] = None
+) -> List[ImageModel]:
+    """
+    Изображения товара. Если задан size, file_path указывает на JPEG-вариант
+    этого размера (для изображений без производных — на оригинал).
+    """
+    query = select(Image).where(Image.item_id == item_id)
+    result = await session.execute(query)
+    images = result.scalars().all()
         
-        return [
-            ImageModel(
-                id=image.id,
-                file_path=image.file_path,
-                item_id=image.item_id,
-                created_at=image.created_at.isoformat()
-            )
-            for image in images
-        ]
-
-
-async def delete_image(image_id: int):
-    async with db.sessionmaker() as session:
-        query = select(Image).where(Image.id == image_id)
-        result = await session.execute(query)
-        image = result.scalars().first()
+    return [_to_image_model(image, size) for image in images]
+
+
+async def delete_image(session: AsyncSession, image_id: int):
+    query = select(Image).where(Image.id == image_id)
+    result = await session.execute(query)
+    image = result.scalars().first()
         
-        if not image:
-            raise HTTPException(status_code=404, detail="Image not found")
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
         
-        # Delete file from filesystem
+    # Delete from database
+    await session.delete(image)
+    await session.flush()
+
+    # Одинаковые загрузки хранятся одним файлом: удаляем его вместе
+    # с производными, только когда на него не осталось других записей
+    if image.content_hash and await count_references(session, image.content_hash):
+        return
+
+    file_path, variants = image.file_path, image.variants
+
+    def remove_files() -> None:
         try:
-            if os.path.exists(image.file_path):
-                os.remove(image.file_path)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Could not delete file: {str(e)}")
-        
-        # Delete from database
-        await session.delete(image)
-        await session.commit() 
\ No newline at end of file
+            remove_image_files(file_path, variants)
+        except OSError as e:
+            logger.warning(f"Не удалось удалить файл изображения {file_path}: {e}")
+
+    on_commit(session, remove_files)
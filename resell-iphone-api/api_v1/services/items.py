@@ -1,508 +1,650 @@
-from datetime import timedelta
-from typing import List
-import os
-import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
 
 from fastapi import HTTPException
-from sqlalchemy import select, func
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, func, tuple_, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from core.db.tables import Category, Item, ItemVector, User, Image
-from core.models.items import ItemModel, ItemsModel, ItemExtendedModel, ItemCreateModel, ItemUpdateIsSold
-from database import db
+from core.db.tables import Item, ItemArchive, User, Image
+from core.models.items import (
+    ItemModel, ItemsModel, ItemExtendedModel, ItemsBatchModel, ItemCreateModel, ItemUpdateIsSold,
+)
 from config import settings
+from core.pagination import encode_cursor, decode_cursor, page_size, cursor_int, cursor_number
+from core.lookups import categories_lookup
+from core.cache import ResponseCache
+from core.db.hooks import on_commit
+from core.imaging import pick_variant
+from core.models.images import ImageSize
+from core.uploads import StoredUpload
+from api_v1.services.images import new_image
 
+# Объявления старше LISTING_TTL не показываются и переносятся в items_archive
+LISTING_TTL = timedelta(days=settings.listing_ttl_days)
 
-async def get_category_id(category: str) -> int:
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        query = select(Category).where(Category.name == category)
-        result = await session.execute(query)
-        category = result.scalars().first()
-        if not category:
-            raise HTTPException(status_code=404, detail="Category not found")
-        return category.id
+# Сортировки, для которых поддерживается keyset-пагинация по курсору
+KEYSET_SORTS = ("date", "price")
 
+# Поля, по которым можно сортировать выдачу (filter_type), и направления (filter_value)
+SORT_COLUMNS = {"date": Item.date, "price": Item.price}
+SORT_DIRECTIONS = ("asc", "desc")
 
-async def get_item(item_id: int) -> ItemExtendedModel:
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
+# Готовые ответы GET /items и /items/unsold
+listings_cache = ResponseCache(
+    "listings",
+    max_entries=settings.listing_cache_size,
+    max_bytes=settings.listing_cache_max_bytes,
+    ttl=settings.listing_cache_ttl,
+)
+
+
+def _listing_tag(category_id: Optional[int]) -> str:
+    return "listings:all" if category_id is None else f"listings:category:{category_id}"
+
+
+def invalidate_listings(session: AsyncSession, *category_ids: int) -> None:
+    """
+    После коммита сбрасывает закэшированные ленты, в которые мог попасть товар
+    из указанных категорий: общие ленты и ленты этих категорий.
+    """
+    tags = {_listing_tag(None)} | {_listing_tag(id) for id in category_ids if id is not None}
+    on_commit(session, lambda: listings_cache.invalidate_tags(*tags))
+
+
+async def get_category_id(session: AsyncSession, category: str) -> int:
+    category_id = await categories_lookup.get_id(session, category)
+    if category_id is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return category_id
+
+
+def _resolve_sort(filter_type: Optional[str], filter_value: Optional[str]):
+    """
+    Определяет колонку и направление сортировки выдачи.
+    По умолчанию товары сортируются от новых к старым.
+
+    Raises:
+        HTTPException: 400 если поле или направление сортировки не поддерживается
+    """
+    if not (filter_type and filter_value):
+        return "date", Item.date, True
+    if filter_type not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail="Invalid filter type provided")
+    if filter_value not in SORT_DIRECTIONS:
+        raise HTTPException(status_code=400, detail="Invalid filter value provided")
+    return filter_type, SORT_COLUMNS[filter_type], filter_value == "desc"
+
+
+async def _paginate(
+    session: AsyncSession,
+    query,
+    page: int,
+    cursor: Optional[str],
+    limit: Optional[int],
+    filter_type: Optional[str] = None,
+    filter_value: Optional[str] = None,
+):
+    """
+    Применяет сортировку и пагинацию к запросу выдачи товаров.
+
+    В режиме курсора страница ищется по индексу (ключ сортировки, id),
+    поэтому любая страница стоит столько же, сколько первая.
+    Без курсора сохраняется прежняя постраничная выдача через OFFSET.
+
+    Returns:
+        tuple: строки текущей страницы, признак следующей страницы и курсор следующей страницы
+    """
+    limit = page_size(limit, settings.pagination_limit)
+    sort_name, column, descending = _resolve_sort(filter_type, filter_value)
+    sort_key = f"{sort_name}:{'desc' if descending else 'asc'}"
+    keyset = sort_name in KEYSET_SORTS
+
+    if descending:
+        query = query.order_by(column.desc(), Item.id.desc())
+    else:
+        query = query.order_by(column.asc(), Item.id.asc())
+
+    if cursor:
+        if not keyset:
+            raise HTTPException(
+                status_code=400,
+                detail="Cursor pagination supports only date and price sorting",
+            )
+        value, last_id = decode_cursor(cursor, sort_key)
+        last_id = cursor_int(last_id)
+        if sort_name == "date":
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        else:
+            value = cursor_number(value)
+        position = tuple_(column, Item.id)
+        boundary = tuple_(literal(value), literal(last_id))
+        query = query.where(position < boundary if descending else position > boundary)
+    else:
+        query = query.offset((page - 1) * limit)
+
+    result = await session.execute(query.limit(limit + 1))
+    rows = result.all()
+
+    next_page = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if next_page and keyset:
+        last_item = rows[-1][0]
+        next_cursor = encode_cursor(sort_key, getattr(last_item, sort_name), last_item.id)
+    return rows, next_page, next_cursor
+
+
+def _to_item_model(item: Item, category_name: str, username: str) -> ItemModel:
+    return ItemModel(
+        id=item.id,
+        name=item.name,
+        image=item.image,
+        date=item.date,
+        price=item.price,
+        currency=item.currency,
+        category=category_name,
+        contact=item.contact,
+        username=username,
+        is_sold=item.is_sold,
+    )
+
+
+async def get_item(
+    session: AsyncSession,
+    item_id: int,
+    size: Optional[ImageSize] = None,
+    include_archived: bool = False,
+) -> ItemExtendedModel:
+    """
+    Объявление по id. Если задан size, image указывает на JPEG-вариант
+    главного изображения этого размера. С include_archived возвращаются
+    также просроченные и перенесенные в items_archive объявления
+    (например, для истории заказов).
+    """
+    query = select(Item, User.username).join(User).where(Item.id == item_id)
+    if not include_archived:
+        query = query.where(Item.date >= func.now() - LISTING_TTL)
+    row = (await session.execute(query)).first()
+    if row is None and include_archived:
         query = (
-            select(Item, Category.name, User.username)
-            .join(Category)
-            .join(User)
-            .where(Item.id == item_id)
-            .where(Item.date >= func.now() - timedelta(days=7))
+            select(ItemArchive, User.username)
+            .join(User, User.id == ItemArchive.user_id)
+            .where(ItemArchive.id == item_id)
         )
-        result = await session.execute(query)
-        try:
-            item, category_name, username = result.first()
-        except TypeError:
-            raise HTTPException(status_code=404, detail="Item not found")
-        if not item:
-            raise HTTPException(status_code=404, detail="Item not found")
-        return ItemExtendedModel(
-            id=item.id,
-            name=item.name,
-            image=item.image,
-            date=item.date,
-            price=item.price,
-            currency=item.currency,
-            category=category_name,
-            contact=item.contact,
-            description=item.description,
-            user_id=item.user_id,
-            username=username,
+        row = (await session.execute(query)).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    item, username = row
+    category_name = await categories_lookup.get_value(session, item.category_id)
+
+    image = item.image
+    if size and image:
+        variants = await session.scalar(
+            select(Image.variants)
+            .where(Image.item_id == item.id, Image.file_path == item.image)
+            .limit(1)
         )
+        image = pick_variant(item.image, variants, size.value)
+
+    return ItemExtendedModel(
+        id=item.id,
+        name=item.name,
+        image=image,
+        date=item.date,
+        price=item.price,
+        currency=item.currency,
+        category=category_name,
+        contact=item.contact,
+        description=item.description,
+        user_id=item.user_id,
+        username=username,
+    )
+
+
+# Колонки, общие для items и items_archive
+_ITEM_COLUMNS = (
+    "id", "name", "image", "date", "price", "currency", "category_id",
+    "contact", "description", "user_id", "is_sold",
+)
+
+
+async def get_items_batch(
+    session: AsyncSession, ids: List[int], include_archived: bool = False
+) -> ItemsBatchModel:
+    """
+    Несколько объявлений одним запросом, в порядке ids.
+
+    Не найденные (или просроченные без include_archived) id перечисляются в missing.
+    """
+    live = select(*(getattr(Item, column) for column in _ITEM_COLUMNS)).where(Item.id.in_(ids))
+    if include_archived:
+        archived = select(
+            *(getattr(ItemArchive, column) for column in _ITEM_COLUMNS)
+        ).where(ItemArchive.id.in_(ids))
+        source = union_all(live, archived).subquery()
+    else:
+        source = live.where(Item.date >= func.now() - LISTING_TTL).subquery()
+
+    query = select(source, User.username).join(User, User.id == source.c.user_id)
+    rows = {row["id"]: row for row in (await session.execute(query)).mappings()}
+
+    category_names = await categories_lookup.values(
+        session, [row["category_id"] for row in rows.values()]
+    )
+    items = []
+    for item_id in ids:
+        row = rows.get(item_id)
+        if row is None:
+            continue
+        items.append(ItemExtendedModel(
+            id=row["id"],
+            name=row["name"],
+            image=row["image"],
+            date=row["date"],
+            price=row["price"],
+            currency=row["currency"],
+            category=category_names.get(row["category_id"]),
+            contact=row["contact"],
+            description=row["description"],
+            user_id=row["user_id"],
+            username=row["username"],
+            is_sold=row["is_sold"],
+        ))
+    return ItemsBatchModel(items=items, missing=[id for id in ids if id not in rows])
 
 
 async def get_items(
+    session: AsyncSession,
     page: int = 1,
     category: str = None,
-    ids: List[int] = None,
     filter_type: str = None,
     filter_value: str = None,
+    cursor: str = None,
+    limit: int = None,
 ) -> ItemsModel:
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        limit = settings.pagination_limit
-        next_page = False
-        offset = (page - 1) * limit
-        query = (
-            select(Item, Category.name, User.username)
-            .join(Category)
-            .join(User)
-            .where(Item.date >= func.now() - timedelta(days=7))
-            .limit(limit + 1)
-            .offset(offset)
-        )
-        if category:
-            category_id = await get_category_id(category)
-            query = query.where(Item.category_id == category_id)
-        elif ids:
-            query = query.where(Item.id.in_(ids))
-        if filter_type and filter_value:
-            try:
-                attr = getattr(Item, filter_type)
-            except AttributeError:
-                raise HTTPException(
-                    status_code=400, detail="Invalid filter type provided"
-                )
-            else:
-                if filter_value == "asc":
-                    query = query.order_by(attr.asc())
-                elif filter_value == "desc":
-                    query = query.order_by(attr.desc())
-        else:
-            query = query.order_by(Item.date.desc())
-
-        result = await session.execute(query)
-        items = result.all()
-
-        if not items:
-            return ItemsModel(page=page, next_page=next_page, items=[])
-        elif len(items) > limit:
-            items = items[:-1]
-            next_page = True
+    query = (
+        select(Item, User.username)
+        .join(User)
+        .where(Item.date >= func.now() - LISTING_TTL)
+    )
+    if category:
+        category_id = await get_category_id(session, category)
+        query = query.where(Item.category_id == category_id)
+
+    items, next_page, next_cursor = await _paginate(
+        session, query, page, cursor, limit, filter_type, filter_value
+    )
+
+    category_names = await categories_lookup.values(
+        session, [item.category_id for item, *_ in items]
+    )
+    return ItemsModel(
+        page=page,
+        next_page=next_page,
+        next_cursor=next_cursor,
+        items=[
+            _to_item_model(item, category_names.get(item.category_id), username)
+            for item, username in items
+        ],
+    )
+
+
+async def get_cached_listing(
+    session: AsyncSession,
+    unsold: bool,
+    page: int = 1,
+    category: str = None,
+    filter_type: str = None,
+    filter_value: str = None,
+    cursor: str = None,
+    limit: int = None,
+) -> bytes:
+    """
+    JSON-ответ ленты товаров (get_items или get_unsold_items) из кэша listings_cache.
 
-        return ItemsModel(
+    Ключ строится из нормализованных параметров, поэтому запросы, которые дают
+    одинаковую выдачу, попадают в одну запись.
+    """
+    category_id = await get_category_id(session, category) if category else None
+    if not (filter_type and filter_value):
+        filter_type = filter_value = None
+    key = (
+        "unsold" if unsold else "all",
+        page,
+        category_id,
+        filter_type,
+        filter_value,
+        cursor,
+        page_size(limit, settings.pagination_limit),
+    )
+
+    body = listings_cache.get(key)
+    if body is None:
+        generation = listings_cache.generation
+        loader = get_unsold_items if unsold else get_items
+        result = await loader(
+            session,
             page=page,
-            next_page=next_page,
-            items=[
-                ItemModel(
-                    id=item.id,
-                    name=item.name,
-                    image=item.image,
-                    date=item.date,
-                    price=item.price,
-                    currency=item.currency,
-                    category=category_name,
-                    contact=item.contact,
-                    description=item.description,
-                    user_id=item.user_id,
-                    username=username,
-                    is_sold=item.is_sold,
-                )
-                for item, category_name, username in items
-            ],
+            category=category,
+            filter_type=filter_type,
+            filter_value=filter_value,
+            cursor=cursor,
+            limit=limit,
         )
+        body = JSONResponse(content=jsonable_encoder(result)).body
+        listings_cache.set(key, body, [_listing_tag(category_id)], generation)
+    return body
 
 
-async def get_search_results(search_query: str, page: int) -> ItemsModel:
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        ts_query = func.plainto_tsquery("russian", search_query)
-        rank = func.ts_rank(ItemVector.vector, ts_query).label("rank")
-
-        query = (
-            select(Item.id)
-            .join(ItemVector, Item.id == ItemVector.product_id)
-            .where(ItemVector.vector.op("@@")(ts_query))
-            .order_by(rank.desc())
-        )
+async def get_search_results(
+    session: AsyncSession,
+    search_query: str,
+    page: int = 1,
+    cursor: str = None,
+    limit: int = None,
+    category: str = None,
+    price_min: float = None,
+    price_max: float = None,
+    is_sold: bool = False,
+) -> ItemsModel:
+    """
+    Полнотекстовый поиск одним запросом: фильтрация, ранжирование и страница top-k.
 
-        result = await session.execute(query)
-        product_ids = [id[0] for id in result.fetchall()]
-        if not product_ids:
-            raise HTTPException(status_code=404, detail="Products not found")
-
-        products = await get_items(ids=product_ids, page=page)
-
-        return products
-
-
-async def save_image_file(file, upload_dir: str = "static/uploads") -> str:
-    # Create uploads directory if it doesn't exist
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filename
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(upload_dir, unique_filename)
-    
-    # Save file
-    try:
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
-    
-    return file_path
-
-
-async def create_item(data: ItemCreateModel, user_id: int):
-    async with db.sessionmaker() as session:
-        user = await session.execute(select(User).where(User.id == user_id))
-        user_instance = user.scalars().first()
-        if not user_instance:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        data_dict = data.__dict__
-        image_file = data_dict.pop("image", None)
-
-        data_dict["date"] = func.now()
-        if "category" in data_dict:
-            category_name = data_dict.pop("category")
-            category = await session.execute(
-                select(Category).where(Category.name == category_name)
-            )
-            category_instance = category.scalars().first()
-            if not category_instance:
-                raise HTTPException(status_code=404, detail="Category not found")
-            data_dict["category"] = category_instance
-
-        # Create item without image first
-        item = Item(**data_dict, user_id=user_id, image="")
-        session.add(item)
-        await session.flush()
-
-        # If image was provided, save it and create image record
-        if image_file:
-            file_path = await save_image_file(image_file)
-            image = Image(file_path=file_path, item_id=item.id)
-            session.add(image)
-            item.image = file_path
-
-        # Create search vector
-        item_vector = ItemVector(
-            product_id=item.id,
-            vector=func.to_tsvector(data_dict["name"] + " " + data_dict["description"]),
-        )
-        session.add(item_vector)
-        await session.commit()
-        return item
+    Товары упорядочены по (ts_rank, id) по убыванию; next_cursor продолжает выдачу
+    с той же позиции. 404 возвращается, только если ничего не найдено на первой странице.
+    """
+    limit = page_size(limit, settings.pagination_limit)
+    ts_query = func.plainto_tsquery("russian", search_query)
+    rank = func.ts_rank(Item.search_vector, ts_query)
+
+    query = (
+        select(Item, User.username, rank)
+        .join(User)
+        .where(Item.search_vector.op("@@")(ts_query))
+        .where(Item.date >= func.now() - LISTING_TTL)
+        .where(Item.is_sold == is_sold)
+        .order_by(rank.desc(), Item.id.desc())
+    )
+    if category:
+        category_id = await get_category_id(session, category)
+        query = query.where(Item.category_id == category_id)
+    if price_min is not None:
+        query = query.where(Item.price >= price_min)
+    if price_max is not None:
+        query = query.where(Item.price <= price_max)
+
+    if cursor:
+        last_rank, last_id = decode_cursor(cursor, "rank:desc")
+        last_rank, last_id = cursor_number(last_rank), cursor_int(last_id)
+        query = query.where(tuple_(rank, Item.id) < tuple_(literal(last_rank), literal(last_id)))
+    else:
+        query = query.offset((page - 1) * limit)
+
+    result = await session.execute(query.limit(limit + 1))
+    rows = result.all()
+    if not rows and page == 1 and not cursor:
+        raise HTTPException(status_code=404, detail="Products not found")
+
+    next_page = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if next_page:
+        last_item, _, last_rank = rows[-1]
+        next_cursor = encode_cursor("rank:desc", last_rank, last_item.id)
+
+    category_names = await categories_lookup.values(
+        session, [item.category_id for item, *_ in rows]
+    )
+    return ItemsModel(
+        page=page,
+        next_page=next_page,
+        next_cursor=next_cursor,
+        items=[
+            _to_item_model(item, category_names.get(item.category_id), username)
+            for item, username, _ in rows
+        ],
+    )
+
+
+async def create_item(
+    session: AsyncSession,
+    data: ItemCreateModel,
+    user_id: int,
+    image: Optional[StoredUpload] = None,
+):
+    """
+    Создает объявление. image — уже сохраненный на диск файл с производными
+    (core.uploads.store_image_upload).
+    """
+    user = await session.execute(select(User).where(User.id == user_id))
+    user_instance = user.scalars().first()
+    if not user_instance:
+        raise HTTPException(status_code=404, detail="User not found")
 
+    data_dict = data.__dict__
+    data_dict.pop("image", None)
 
-async def get_users_items(user_id: int, page: int) -> ItemsModel:
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        limit = settings.pagination_limit
-        next_page = False
-        offset = (page - 1) * limit
-        query = (
-            select(Item, Category.name, User.username)
-            .join(Category)
-            .join(User)
-            .where(Item.user_id == user_id)
-            .where(Item.date >= func.now() - timedelta(days=7))
-            .limit(limit + 1)
-            .offset(offset)
-        )
-        result = await session.execute(query)
-        items = result.all()
-        if not items:
-            raise HTTPException(status_code=404, detail="Items not found")
-        elif len(items) > limit:
-            next_page = True
-            items = items[:limit]
-
-        items = [
-            ItemModel(
-                id=item.Item.id,
-                name=item.Item.name,
-                image=item.Item.image,
-                date=item.Item.date,
-                price=item.Item.price,
-                currency=item.Item.currency,
-                category=item.name,
-                contact=item.Item.contact,
-                username=item.username,
-                is_sold=item.Item.is_sold,
-            )
-            for item in items
-        ]
+    data_dict["date"] = func.now()
+    if "category" in data_dict:
+        category_name = data_dict.pop("category")
+        data_dict["category_id"] = await get_category_id(session, category_name)
 
-        return ItemsModel(page=page, next_page=next_page, items=items)
+    # Create item without image first
+    item = Item(**data_dict, user_id=user_id, image="")
+    session.add(item)
+    await session.flush()
 
+    # If image was provided, create image record
+    if image:
+        session.add(new_image(image, item.id))
+        item.image = image.path
 
-async def update_item(item_id: int, data: ItemCreateModel):
-    async with db.sessionmaker() as session:
-        data_dict = data.__dict__
-        image_file = data_dict.pop("image", None)
+    # search_vector заполняется триггером items_search_vector_trigger
+    await session.flush()
+    invalidate_listings(session, item.category_id)
+    return item
 
-        # Get existing item
-        query = select(Item).where(Item.id == item_id)
-        result = await session.execute(query)
-        item = result.scalars().first()
-        if not item:
-            raise HTTPException(status_code=404, detail="Item not found")
 
-        # Update category if provided
-        if "category" in data_dict:
-            category_name = data_dict.pop("category")
-            category = await session.execute(
-                select(Category).where(Category.name == category_name)
-            )
-            category_instance = category.scalars().first()
-            if not category_instance:
-                raise HTTPException(status_code=404, detail="Category not found")
-            data_dict["category_id"] = category_instance.id
-
-        # Update other fields
-        for key, value in data_dict.items():
-            if value is not None:  # Only update if value is provided
-                setattr(item, key, value)
-
-        # Handle image update
-        if image_file:
-            # Save new image
-            file_path = await save_image_file(image_file)
-            
-            # Create new image record
-            image = Image(file_path=file_path, item_id=item_id)
-            session.add(image)
+async def get_users_items(
+    session: AsyncSession, user_id: int, page: int, cursor: str = None, limit: int = None
+) -> ItemsModel:
+    query = (
+        select(Item, User.username)
+        .join(User)
+        .where(Item.user_id == user_id)
+        .where(Item.date >= func.now() - LISTING_TTL)
+    )
+    items, next_page, next_cursor = await _paginate(session, query, page, cursor, limit)
+    if not items:
+        raise HTTPException(status_code=404, detail="Items not found")
+
+    category_names = await categories_lookup.values(
+        session, [item.category_id for item, *_ in items]
+    )
+    return ItemsModel(
+        page=page,
+        next_page=next_page,
+        next_cursor=next_cursor,
+        items=[
+            _to_item_model(item, category_names.get(item.category_id), username)
+            for item, username in items
+        ],
+    )
+
+
+async def update_item(
+    session: AsyncSession,
+    item_id: int,
+    data: ItemCreateModel,
+    image: Optional[StoredUpload] = None,
+):
+    data_dict = data.__dict__
+    data_dict.pop("image", None)
+
+    # Get existing item
+    query = select(Item).where(Item.id == item_id)
+    result = await session.execute(query)
+    item = result.scalars().first()
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    previous_category_id = item.category_id
+
+    # Update category if provided
+    if "category" in data_dict:
+        category_name = data_dict.pop("category")
+        if category_name is not None:
+            data_dict["category_id"] = await get_category_id(session, category_name)
+
+    # Update other fields
+    for key, value in data_dict.items():
+        if value is not None:  # Only update if value is provided
+            setattr(item, key, value)
+
+    # Handle image update
+    if image:
+        # Create new image record
+        session.add(new_image(image, item_id))
             
-            # Update item's main image
-            item.image = file_path
-
-        # Update search vector
-        vector_query = select(ItemVector).where(ItemVector.product_id == item_id)
-        vector_result = await session.execute(vector_query)
-        item_vector = vector_result.scalars().first()
-        
-        if item_vector:
-            item_vector.vector = func.to_tsvector(
-                data_dict.get("name", item.name) + " " + data_dict.get("description", item.description)
-            )
-        else:
-            item_vector = ItemVector(
-                product_id=item_id,
-                vector=func.to_tsvector(
-                    data_dict.get("name", item.name) + " " + data_dict.get("description", item.description)
-                ),
-            )
-            session.add(item_vector)
-
-        await session.commit()
-        return
+        # Update item's main image
+        item.image = image.path
 
+    await session.flush()
+    invalidate_listings(session, previous_category_id, item.category_id)
+    return
 
-async def delete_item(item_id: int):
-    async with db.sessionmaker() as session:
-        # Получаем объявление вместе с изображениями
-        query = select(Item).options(selectinload(Item.images)).where(Item.id == item_id)
-        result = await session.execute(query)
-        item = result.scalars().first()
-        if not item:
-            raise HTTPException(status_code=404, detail="Item not found")
 
-        # Удаляем вектор поиска
-        vector_query = select(ItemVector).where(ItemVector.product_id == item_id)
-        vector_result = await session.execute(vector_query)
-        item_vector = vector_result.scalars().first()
-        if item_vector:
-            await session.delete(item_vector)
+async def delete_item(session: AsyncSession, item_id: int):
+    # Получаем объявление вместе с изображениями
+    query = select(Item).options(selectinload(Item.images)).where(Item.id == item_id)
+    result = await session.execute(query)
+    item = result.scalars().first()
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
 
-        # Удаляем изображения
-        for image in item.images:
-            # Здесь можно добавить удаление файла с диска, если нужно
-            await session.delete(image)
+    # Удаляем изображения
+    for image in item.images:
+        # Файлы без ссылок удаляет tasks.collect_uploads
+        await session.delete(image)
 
-        # Удаляем само объявление
-        await session.delete(item)
-        await session.commit()
-        return
+    # Удаляем само объявление
+    await session.delete(item)
+    await session.flush()
+    invalidate_listings(session, item.category_id)
+    return
 
 
 async def get_unsold_items(
+    session: AsyncSession,
     page: int = 1,
     category: str = None,
     filter_type: str = None,
     filter_value: str = None,
+    cursor: str = None,
+    limit: int = None,
 ) -> ItemsModel:
     """
     Получить список непроданных товаров с возможностью фильтрации и разбиения на страницы.
     """
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        limit = settings.pagination_limit
-        next_page = False
-        offset = (page - 1) * limit
-        query = (
-            select(Item, Category.name, User.username)
-            .join(Category)
-            .join(User)
-            .where(Item.is_sold == False)
-            .where(Item.date >= func.now() - timedelta(days=7))
-            .limit(limit + 1)
-            .offset(offset)
-        )
+    query = (
+        select(Item, User.username)
+        .join(User)
+        .where(Item.is_sold == False)
+        .where(Item.date >= func.now() - LISTING_TTL)
+    )
         
-        if category:
-            category_id = await get_category_id(category)
-            query = query.where(Item.category_id == category_id)
-            
-        if filter_type and filter_value:
-            try:
-                attr = getattr(Item, filter_type)
-            except AttributeError:
-                raise HTTPException(
-                    status_code=400, detail="Invalid filter type provided"
-                )
-            else:
-                if filter_value == "asc":
-                    query = query.order_by(attr.asc())
-                elif filter_value == "desc":
-                    query = query.order_by(attr.desc())
-        else:
-            query = query.order_by(Item.date.desc())
-
-        result = await session.execute(query)
-        items = result.all()
-
-        if not items:
-            return ItemsModel(page=page, next_page=next_page, items=[])
-        elif len(items) > limit:
-            items = items[:-1]
-            next_page = True
-
-        return ItemsModel(
-            page=page,
-            next_page=next_page,
-            items=[
-                ItemModel(
-                    id=item.id,
-                    name=item.name,
-                    image=item.image,
-                    date=item.date,
-                    price=item.price,
-                    currency=item.currency,
-                    category=category_name,
-                    contact=item.contact,
-                    description=item.description,
-                    user_id=item.user_id,
-                    username=username,
-                    is_sold=item.is_sold,
-                )
-                for item, category_name, username in items
-            ],
-        )
-
-
-async def get_users_unsold_items(user_id: int, page: int) -> ItemsModel:
+    if category:
+        category_id = await get_category_id(session, category)
+        query = query.where(Item.category_id == category_id)
+
+    items, next_page, next_cursor = await _paginate(
+        session, query, page, cursor, limit, filter_type, filter_value
+    )
+
+    category_names = await categories_lookup.values(
+        session, [item.category_id for item, *_ in items]
+    )
+    return ItemsModel(
+        page=page,
+        next_page=next_page,
+        next_cursor=next_cursor,
+        items=[
+            _to_item_model(item, category_names.get(item.category_id), username)
+            for item, username in items
+        ],
+    )
+
+
+async def get_users_unsold_items(
+    session: AsyncSession, user_id: int, page: int, cursor: str = None, limit: int = None
+) -> ItemsModel:
     """
     Получить список непроданных товаров конкретного пользователя.
     """
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        limit = settings.pagination_limit
-        next_page = False
-        offset = (page - 1) * limit
-        query = (
-            select(Item, Category.name, User.username)
-            .join(Category)
-            .join(User)
-            .where(Item.user_id == user_id)
-            .where(Item.is_sold == False)
-            .where(Item.date >= func.now() - timedelta(days=7))
-            .limit(limit + 1)
-            .offset(offset)
-        )
-        result = await session.execute(query)
-        items = result.all()
-        if not items:
-            raise HTTPException(status_code=404, detail="Items not found")
-        elif len(items) > limit:
-            next_page = True
-            items = items[:limit]
-
-        items = [
-            ItemModel(
-                id=item.Item.id,
-                name=item.Item.name,
-                image=item.Item.image,
-                date=item.Item.date,
-                price=item.Item.price,
-                currency=item.Item.currency,
-                category=item.name,
-                contact=item.Item.contact,
-                username=item.username,
-                is_sold=item.Item.is_sold,
-            )
-            for item in items
-        ]
-
-        return ItemsModel(page=page, next_page=next_page, items=items)
-
-
-async def update_item_is_sold(item_id: int, is_sold_data: ItemUpdateIsSold) -> ItemModel:
+    query = (
+        select(Item, User.username)
+        .join(User)
+        .where(Item.user_id == user_id)
+        .where(Item.is_sold == False)
+        .where(Item.date >= func.now() - LISTING_TTL)
+    )
+    items, next_page, next_cursor = await _paginate(session, query, page, cursor, limit)
+    if not items:
+        raise HTTPException(status_code=404, detail="Items not found")
+
+    category_names = await categories_lookup.values(
+        session, [item.category_id for item, *_ in items]
+    )
+    return ItemsModel(
+        page=page,
+        next_page=next_page,
+        next_cursor=next_cursor,
+        items=[
+            _to_item_model(item, category_names.get(item.category_id), username)
+            for item, username in items
+        ],
+    )
+
+
+async def update_item_is_sold(session: AsyncSession, item_id: int, is_sold_data: ItemUpdateIsSold) -> ItemModel:
     """
     Обновляет статус is_sold для товара.
     """
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        query = select(Item).where(Item.id == item_id)
-        result = await session.execute(query)
-        item = result.scalar_one_or_none()
+    query = select(Item).where(Item.id == item_id)
+    result = await session.execute(query)
+    item = result.scalar_one_or_none()
         
-        if not item:
-            raise HTTPException(status_code=404, detail="Товар не найден")
+    if not item:
+        raise HTTPException(status_code=404, detail="Товар не найден")
             
-        item.is_sold = is_sold_data.is_sold
-        await session.commit()
-        await session.refresh(item)
+    item.is_sold = is_sold_data.is_sold
+    await session.flush()
+    await session.refresh(item)
+    invalidate_listings(session, item.category_id)
         
-        # Получаем категорию и имя пользователя
-        category_query = select(Category.name).where(Category.id == item.category_id)
-        category_result = await session.execute(category_query)
-        category_name = category_result.scalar_one()
+    # Получаем категорию и имя пользователя
+    category_name = await categories_lookup.get_value(session, item.category_id)
         
-        user_query = select(User.username).where(User.id == item.user_id)
-        user_result = await session.execute(user_query)
-        username = user_result.scalar_one()
+    user_query = select(User.username).where(User.id == item.user_id)
+    user_result = await session.execute(user_query)
+    username = user_result.scalar_one()
         
-        return ItemModel(
-            id=item.id,
-            name=item.name,
-            image=item.image,
-            date=item.date,
-            price=item.price,
-            currency=item.currency,
-            category=category_name,
-            contact=item.contact,
-            description=item.description,
-            user_id=item.user_id,
-            username=username,
-            is_sold=item.is_sold,
-        )
+    return ItemModel(
+        id=item.id,
+        name=item.name,
+        image=item.image,
+        date=item.date,
+        price=item.price,
+        currency=item.currency,
+        category=category_name,
+        contact=item.contact,
+        description=item.description,
+        user_id=item.user_id,
+        username=username,
+        is_sold=item.is_sold,
+    )
@@ -1,113 +1,329 @@
+import asyncio
+from contextlib import suppress
 from datetime import datetime
-from typing import List
+from typing import Collection, List, Optional
 
 from fastapi import HTTPException
-from sqlalchemy import select, func
+from sqlalchemy import select, func, tuple_, literal
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import aliased
 
-from core.db.tables import Order, Item, User
-from core.models.orders import OrderModel, OrdersModel, OrderCreateModel, OrderUpdateModel
-from database import db
+from config import settings
+from core.db.hooks import on_commit
+from core.db.tables import Order, OrderEvent, Item, ItemArchive, User
+from core.models.orders import (
+    OrderModel, OrdersModel, OrderCreateModel, OrderUpdateModel,
+    OrderExpandedModel, OrdersPageModel, OrderItemModel, OrderUserModel,
+    OrderEventModel, OrderEventsModel,
+)
+from core.pagination import encode_cursor, decode_cursor, page_size, cursor_int
+from api_v1.services.items import invalidate_listings
 
+# Связанные данные, которые можно запросить в списке заказов через expand
+ORDER_EXPANSIONS = ("item", "buyer", "seller")
 
-async def create_order(order_data: OrderCreateModel) -> OrderModel:
+ORDERS_SORT_KEY = "created_at:desc"
+
+ORDER_EVENTS_SORT_KEY = "txid:asc"
+
+# Будит ожидающие GET /orders/events после коммита смены статуса в этом
+# процессе. Событие создается первым ожидающим (внутри event loop) и
+# сбрасывается при срабатывании, поэтому ожидающий берет текущее до запроса
+# к базе и не пропускает сигнал
+_order_events_changed: Optional[asyncio.Event] = None
+
+
+def _order_events_signal() -> asyncio.Event:
+    global _order_events_changed
+    if _order_events_changed is None:
+        _order_events_changed = asyncio.Event()
+    return _order_events_changed
+
+
+def _notify_order_events() -> None:
+    global _order_events_changed
+    changed, _order_events_changed = _order_events_changed, None
+    if changed is not None:
+        changed.set()
+
+
+async def create_order(session: AsyncSession, order_data: OrderCreateModel) -> OrderModel:
     """
     Создать новый заказ.
     """
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        # Проверяем существование товара
-        item_query = select(Item).where(Item.id == order_data.item_id)
-        item_result = await session.execute(item_query)
-        item = item_result.scalar_one_or_none()
+    # Проверяем существование товара
+    item_query = select(Item).where(Item.id == order_data.item_id)
+    item_result = await session.execute(item_query)
+    item = item_result.scalar_one_or_none()
         
-        if not item:
-            raise HTTPException(status_code=404, detail="Item not found")
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
             
-        # Проверяем существование покупателя
-        buyer_query = select(User).where(User.id == order_data.buyer_id)
-        buyer_result = await session.execute(buyer_query)
-        buyer = buyer_result.scalar_one_or_none()
+    # Проверяем существование покупателя
+    buyer_query = select(User).where(User.id == order_data.buyer_id)
+    buyer_result = await session.execute(buyer_query)
+    buyer = buyer_result.scalar_one_or_none()
         
-        if not buyer:
-            raise HTTPException(status_code=404, detail="Buyer not found")
+    if not buyer:
+        raise HTTPException(status_code=404, detail="Buyer not found")
             
-        # Проверяем существование продавца
-        seller_query = select(User).where(User.id == order_data.seller_id)
-        seller_result = await session.execute(seller_query)
-        seller = seller_result.scalar_one_or_none()
+    # Проверяем существование продавца
+    seller_query = select(User).where(User.id == order_data.seller_id)
+    seller_result = await session.execute(seller_query)
+    seller = seller_result.scalar_one_or_none()
         
-        if not seller:
-            raise HTTPException(status_code=404, detail="Seller not found")
+    if not seller:
+        raise HTTPException(status_code=404, detail="Seller not found")
             
-        # Создаем заказ
-        order = Order(**order_data.dict())
-        session.add(order)
-        await session.commit()
-        await session.refresh(order)
+    # Создаем заказ
+    order = Order(**order_data.dict())
+    session.add(order)
+    await session.flush()
+    await session.refresh(order)
+    on_commit(session, _notify_order_events)
         
-        return OrderModel.from_orm(order)
+    return OrderModel.from_orm(order)
 
 
-async def get_order(order_id: int) -> OrderModel:
+async def get_order(session: AsyncSession, order_id: int) -> OrderModel:
     """
     Получить информацию о заказе по его ID.
     """
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        query = select(Order).where(Order.id == order_id)
-        result = await session.execute(query)
-        order = result.scalar_one_or_none()
+    query = select(Order).where(Order.id == order_id)
+    result = await session.execute(query)
+    order = result.scalar_one_or_none()
         
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
             
-        return OrderModel.from_orm(order)
+    return OrderModel.from_orm(order)
 
 
-async def update_order(order_id: int, order_data: OrderUpdateModel) -> OrderModel:
+async def update_order(session: AsyncSession, order_id: int, order_data: OrderUpdateModel) -> OrderModel:
     """
     Обновить информацию о заказе.
     """
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        query = select(Order).where(Order.id == order_id)
-        result = await session.execute(query)
-        order = result.scalar_one_or_none()
+    query = select(Order).where(Order.id == order_id)
+    result = await session.execute(query)
+    order = result.scalar_one_or_none()
         
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
             
-        # Обновляем только указанные поля
-        for field, value in order_data.dict(exclude_unset=True).items():
-            setattr(order, field, value)
+    # Обновляем только указанные поля
+    for field, value in order_data.dict(exclude_unset=True).items():
+        setattr(order, field, value)
             
-        # Если статус заказа изменен на PAID, обновляем статус товара
-        if order_data.status == "PAID":
-            item_query = select(Item).where(Item.id == order.item_id)
-            item_result = await session.execute(item_query)
-            item = item_result.scalar_one_or_none()
+    # Если статус заказа изменен на PAID, обновляем статус товара
+    if order_data.status == "PAID":
+        item_query = select(Item).where(Item.id == order.item_id)
+        item_result = await session.execute(item_query)
+        item = item_result.scalar_one_or_none()
             
-            if item:
-                item.is_sold = True
+        if item:
+            item.is_sold = True
+            invalidate_listings(session, item.category_id)
+
+    if order_data.status is not None:
+        on_commit(session, _notify_order_events)
             
-        await session.commit()
-        await session.refresh(order)
+    await session.flush()
+    await session.refresh(order)
         
-        return OrderModel.from_orm(order)
+    return OrderModel.from_orm(order)
 
 
-async def get_user_orders(user_id: int, is_buyer: bool = True) -> list[OrderModel]:
+def parse_expand(raw: Optional[str]) -> set[str]:
     """
-    Получить список заказов пользователя (как покупателя или продавца).
+    Разбирает параметр expand ("item,buyer").
+
+    Raises:
+        HTTPException: 400 если указано неизвестное значение
     """
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        if is_buyer:
-            query = select(Order).where(Order.buyer_id == user_id)
-        else:
-            query = select(Order).where(Order.seller_id == user_id)
-            
-        result = await session.execute(query)
-        orders = result.scalars().all()
-        
-        return [OrderModel.from_orm(order) for order in orders] 
\ No newline at end of file
+    if not raw:
+        return set()
+    expand = {part.strip() for part in raw.split(",") if part.strip()}
+    unknown = expand.difference(ORDER_EXPANSIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown expand value: {', '.join(sorted(unknown))}",
+        )
+    return expand
+
+
+async def get_user_orders(
+    session: AsyncSession,
+    user_id: int,
+    is_buyer: bool = True,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    expand: Collection[str] = (),
+) -> OrdersPageModel:
+    """
+    Получить страницу заказов пользователя (как покупателя или продавца), новые первыми.
+
+    Страница ищется по индексу (buyer_id или seller_id, created_at, id),
+    следующая задается курсором. Связанные товар и участники из expand
+    подтягиваются тем же запросом через LEFT JOIN; товар ищется и в items_archive.
+    """
+    limit = page_size(limit, settings.pagination_limit)
+    owner_column = Order.buyer_id if is_buyer else Order.seller_id
+    columns = [Order]
+
+    if "item" in expand:
+        columns += _item_columns()
+    if "buyer" in expand:
+        buyer = aliased(User)
+        columns += [buyer.username.label("buyer_username"), buyer.name.label("buyer_name")]
+    if "seller" in expand:
+        seller = aliased(User)
+        columns += [seller.username.label("seller_username"), seller.name.label("seller_name")]
+
+    query = select(*columns).where(owner_column == user_id)
+    if "item" in expand:
+        query = (
+            query.outerjoin(Item, Item.id == Order.item_id)
+            .outerjoin(ItemArchive, ItemArchive.id == Order.item_id)
+        )
+    if "buyer" in expand:
+        query = query.outerjoin(buyer, buyer.id == Order.buyer_id)
+    if "seller" in expand:
+        query = query.outerjoin(seller, seller.id == Order.seller_id)
+    if status:
+        query = query.where(Order.status == status)
+
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, ORDERS_SORT_KEY)
+        last_id = cursor_int(last_id)
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(
+            tuple_(Order.created_at, Order.id) < tuple_(literal(created_at), literal(last_id))
+        )
+    query = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1)
+
+    rows = (await session.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_order = rows[-1].Order
+        next_cursor = encode_cursor(ORDERS_SORT_KEY, last_order.created_at, last_order.id)
+
+    return OrdersPageModel(
+        orders=[_to_expanded_order(row, expand) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+
+def _item_columns() -> list:
+    """Колонки товара заказа для expand=item (товар ищется и в items_archive)."""
+    return [
+        func.coalesce(Item.name, ItemArchive.name).label("item_name"),
+        func.coalesce(Item.price, ItemArchive.price).label("item_price"),
+        func.coalesce(Item.currency, ItemArchive.currency).label("item_currency"),
+        func.coalesce(Item.is_sold, ItemArchive.is_sold).label("item_is_sold"),
+        (Item.id.is_(None)).label("item_archived"),
+    ]
+
+
+def _to_expanded_order(row, expand: Collection[str]) -> OrderExpandedModel:
+    order = OrderExpandedModel.from_orm(row.Order)
+    # Имена обязательны, поэтому NULL означает, что связанной записи нет
+    if "item" in expand and row.item_name is not None:
+        order.item = OrderItemModel(
+            id=order.item_id,
+            name=row.item_name,
+            price=row.item_price,
+            currency=row.item_currency,
+            is_sold=row.item_is_sold,
+            archived=row.item_archived,
+        )
+    if "buyer" in expand and row.buyer_name is not None:
+        order.buyer = OrderUserModel(id=order.buyer_id, username=row.buyer_username, name=row.buyer_name)
+    if "seller" in expand and row.seller_name is not None:
+        order.seller = OrderUserModel(id=order.seller_id, username=row.seller_username, name=row.seller_name)
+    return order
+
+
+async def get_order_events(
+    session: AsyncSession, cursor: Optional[str] = None, limit: Optional[int] = None
+) -> OrderEventsModel:
+    """
+    Получить события заказов после курсора, в порядке записи.
+
+    Отдаются только события завершенных транзакций (txid меньше xmin
+    снимка), поэтому курсор по (txid, id) не перескакивает событие,
+    закоммиченное позже соседнего. Без курсора события не возвращаются,
+    а курсор указывает на текущий конец журнала. События старше
+    ORDER_EVENTS_RETENTION_DAYS удаляются (tasks.prune_order_events), и
+    по более старому курсору они уже не будут получены.
+
+    Raises:
+        HTTPException: 400 если курсор поврежден
+    """
+    safe_txid = func.txid_snapshot_xmin(func.txid_current_snapshot())
+    if cursor is None:
+        tail = (await session.execute(select(safe_txid))).scalar_one()
+        return OrderEventsModel(events=[], cursor=encode_cursor(ORDER_EVENTS_SORT_KEY, tail, 0))
+
+    last_txid, last_id = decode_cursor(cursor, ORDER_EVENTS_SORT_KEY)
+    last_txid, last_id = cursor_int(last_txid), cursor_int(last_id)
+
+    limit = page_size(limit, settings.pagination_limit)
+    query = (
+        select(OrderEvent, Order, *_item_columns())
+        .outerjoin(Order, Order.id == OrderEvent.order_id)
+        .outerjoin(Item, Item.id == Order.item_id)
+        .outerjoin(ItemArchive, ItemArchive.id == Order.item_id)
+        .where(
+            tuple_(OrderEvent.txid, OrderEvent.id) > tuple_(literal(last_txid), literal(last_id)),
+            OrderEvent.txid < safe_txid,
+        )
+        .order_by(OrderEvent.txid, OrderEvent.id)
+        .limit(limit)
+    )
+    rows = (await session.execute(query)).all()
+
+    events = []
+    for row in rows:
+        event = OrderEventModel.from_orm(row.OrderEvent)
+        if row.Order is not None:
+            event.order = _to_expanded_order(row, ("item",))
+        events.append(event)
+    if rows:
+        last_event = rows[-1].OrderEvent
+        cursor = encode_cursor(ORDER_EVENTS_SORT_KEY, last_event.txid, last_event.id)
+    return OrderEventsModel(events=events, cursor=cursor)
+
+
+async def wait_for_order_events(
+    sessionmaker: async_sessionmaker,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    wait: float = 0,
+) -> OrderEventsModel:
+    """
+    Long polling журнала событий: ждет до wait секунд, пока после курсора
+    не появятся события.
+
+    Соединение с базой берется только на время каждой проверки, а не на все
+    ожидание. Между проверками запрос просыпается по коммиту смены статуса
+    в этом процессе или раз в ORDER_EVENTS_POLL_INTERVAL секунд.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        changed = _order_events_signal()
+        async with sessionmaker() as session:
+            result = await get_order_events(session, cursor, limit)
+        remaining = deadline - loop.time()
+        if result.events or cursor is None or remaining <= 0:
+            return result
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                changed.wait(), min(remaining, settings.order_events_poll_interval)
+            )
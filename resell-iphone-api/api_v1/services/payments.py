@@ -1,4 +1,5 @@
 from fastapi import Request, Response, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from yookassa import Configuration
 import json
 from typing import Dict, Any
@@ -10,12 +11,13 @@ logger = logging.getLogger(__name__)
 
 class PaymentService:
     @staticmethod
-    async def handle_webhook(request: Request) -> Response:
+    async def handle_webhook(request: Request, session: AsyncSession) -> Response:
         """
         Обработчик уведомлений от ЮKassa.
         
         Args:
             request (Request): Запрос от ЮKassa с данными о платеже
+            session (AsyncSession): Сессия текущего запроса
             
         Returns:
             Response: Ответ со статусом 200 OK
@@ -40,7 +42,7 @@ class PaymentService:
                 try:
                     # Обновляем статус заказа на PAID
                     update_data = OrderUpdateModel(status="PAID")
-                    await update_order(int(order_id), update_data)
+                    await update_order(session, int(order_id), update_data)
                     logger.info(f"Заказ {order_id} помечен как оплаченный")
                 except Exception as e:
                     logger.error(f"Error updating order status: {str(e)}")
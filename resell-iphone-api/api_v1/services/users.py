@@ -1,108 +1,123 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import HTTPException
 from sqlalchemy import select, func
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from config import settings
+from core.cache import TTLCache
+from core.db.hooks import on_commit
 from core.db.tables import User, Role
-from core.models.users import UserModel, UsersModel, UserCreateModel, UserUpdateModel, UserBase, UserResponseModel, RoleBase, RoleResponseModel
-from database import db
-
-
-async def create_user(data: UserBase) -> UserResponseModel:
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        # Проверяем, существует ли пользователь с таким telegram_id
-        query = select(User).where(User.telegram_id == data.telegram_id)
-        result = await session.execute(query)
-        existing_user = result.scalars().first()
-        if existing_user:
-            raise HTTPException(
-                status_code=400,
-                detail="User with this telegram_id already exists"
-            )
+from core.lookups import roles_lookup
+from core.models.users import UserModel, UsersModel, UsersBatchModel, UserCreateModel, UserUpdateModel, UserBase, UserResponseModel, RoleBase, RoleResponseModel
+
+# Пользователи по telegram_id: бот определяет пользователя почти в каждом обработчике
+users_by_telegram_id = TTLCache(
+    "users_by_telegram_id", max_entries=settings.user_cache_size, ttl=settings.user_cache_ttl
+)
+
+
+def _invalidate_user_on_commit(session: AsyncSession, telegram_id: int) -> None:
+    on_commit(session, lambda: users_by_telegram_id.invalidate(telegram_id))
+
+
+async def _to_user_response(session: AsyncSession, user: User) -> UserResponseModel:
+    # Роль берется из справочника в памяти, без дополнительного запроса к roles
+    return UserResponseModel(
+        id=user.id,
+        username=user.username,
+        name=user.name,
+        contact=user.contact,
+        telegram_id=user.telegram_id,
+        role_id=user.role_id,
+        created_at=user.created_at.isoformat(),
+        updated_at=user.updated_at.isoformat(),
+        role=await roles_lookup.get_value(session, user.role_id),
+    )
+
+
+async def create_user(session: AsyncSession, data: UserBase) -> UserResponseModel:
+    # Проверяем, существует ли пользователь с таким telegram_id
+    query = select(User).where(User.telegram_id == data.telegram_id)
+    result = await session.execute(query)
+    existing_user = result.scalars().first()
+    if existing_user:
+        raise HTTPException(
+            status_code=400,
+            detail="User with this telegram_id already exists"
+        )
         
-        # Проверяем существование роли
-        role_query = select(Role).where(Role.id == data.role_id)
-        role_result = await session.execute(role_query)
-        role = role_result.scalars().first()
-        if not role:
-            raise HTTPException(
-                status_code=400,
-                detail="Role not found"
-            )
+    # Проверяем существование роли
+    if await roles_lookup.get_value(session, data.role_id) is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Role not found"
+        )
             
-        user = User(**data.__dict__)
-        session.add(user)
-        await session.commit()
-        
-        # Загружаем пользователя вместе с ролью
-        query = select(User).options(selectinload(User.role)).where(User.id == user.id)
-        result = await session.execute(query)
-        user = result.scalars().first()
+    user = User(**data.__dict__)
+    session.add(user)
+    await session.flush()
+    _invalidate_user_on_commit(session, user.telegram_id)
+    # Подгружаем значения created_at/updated_at, заполненные базой
+    await session.refresh(user)
         
-        return UserResponseModel(
-            id=user.id,
-            username=user.username,
-            name=user.name,
-            contact=user.contact,
-            telegram_id=user.telegram_id,
-            role_id=user.role_id,
-            created_at=user.created_at.isoformat(),
-            updated_at=user.updated_at.isoformat(),
-            role=RoleResponseModel(
-                id=user.role.id,
-                name=user.role.name,
-                description=user.role.description,
-                created_at=user.role.created_at.isoformat(),
-                updated_at=user.role.updated_at.isoformat()
-            )
-        )
+    return await _to_user_response(session, user)
 
 
-async def get_user(user_id: int) -> UserResponseModel:
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        # Загружаем пользователя вместе с ролью в одном запросе
-        query = select(User).options(selectinload(User.role)).where(User.id == user_id)
-        result = await session.execute(query)
-        user = result.scalars().first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+async def get_user(session: AsyncSession, user_id: int) -> UserResponseModel:
+    query = select(User).where(User.id == user_id)
+    result = await session.execute(query)
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
             
-        return UserResponseModel(
-            id=user.id,
-            username=user.username,
-            name=user.name,
-            contact=user.contact,
-            telegram_id=user.telegram_id,
-            role_id=user.role_id,
-            created_at=user.created_at.isoformat(),
-            updated_at=user.updated_at.isoformat(),
-            role=RoleResponseModel(
-                id=user.role.id,
-                name=user.role.name,
-                description=user.role.description,
-                created_at=user.role.created_at.isoformat(),
-                updated_at=user.role.updated_at.isoformat()
-            )
-        )
+    return await _to_user_response(session, user)
+
+
+async def get_users_batch(session: AsyncSession, ids: List[int]) -> UsersBatchModel:
+    """Несколько пользователей одним запросом, в порядке ids; не найденные id — в missing."""
+    result = await session.execute(select(User).where(User.id.in_(ids)))
+    found = {user.id: user for user in result.scalars()}
+    return UsersBatchModel(
+        users=[await _to_user_response(session, found[id]) for id in ids if id in found],
+        missing=[id for id in ids if id not in found],
+    )
+
+
+async def find_user_by_telegram_id(
+    session: AsyncSession, telegram_id: int
+) -> Optional[UserResponseModel]:
+    """Пользователь с ролью по Telegram ID из users_by_telegram_id или одним запросом к users."""
+    user = users_by_telegram_id.get(telegram_id)
+    if user is not None:
+        return user
 
+    generation = users_by_telegram_id.generation
+    result = await session.execute(select(User).where(User.telegram_id == telegram_id))
+    row = result.scalars().first()
+    if row is None:
+        # Отсутствие не кэшируется: пользователь может зарегистрироваться через другой процесс API
+        return None
+    user = await _to_user_response(session, row)
+    users_by_telegram_id.set(telegram_id, user, generation)
+    return user
 
-async def get_user_id_by_telegram_id(telegram_id: int) -> int:
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        query = select(User).where(User.telegram_id == telegram_id)
-        result = await session.execute(query)
-        user = result.scalars().first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        return user.id
 
+async def get_user_by_telegram_id(session: AsyncSession, telegram_id: int) -> UserResponseModel:
+    user = await find_user_by_telegram_id(session, telegram_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
-async def check_user_exists(telegram_id: int) -> bool:
+
+async def get_user_id_by_telegram_id(session: AsyncSession, telegram_id: int) -> int:
+    user = await get_user_by_telegram_id(session, telegram_id)
+    return user.id
+
+
+async def check_user_exists(session: AsyncSession, telegram_id: int) -> bool:
     """
     Проверить существование пользователя по Telegram ID.
 
@@ -112,98 +127,56 @@ async def check_user_exists(telegram_id: int) -> bool:
     Возвращает:
         bool: True, если пользователь существует, False в противном случае.
     """
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        query = select(User).where(User.telegram_id == telegram_id)
-        result = await session.execute(query)
-        user = result.scalars().first()
-        return user is not None
-
-
-async def create_role(data: RoleBase) -> RoleResponseModel:
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        # Проверяем, существует ли роль с таким именем
-        query = select(Role).where(Role.name == data.name)
-        result = await session.execute(query)
-        existing_role = result.scalars().first()
-        if existing_role:
-            raise HTTPException(
-                status_code=400,
-                detail="Role with this name already exists"
-            )
-            
-        role = Role(**data.__dict__)
-        session.add(role)
-        await session.commit()
-        await session.refresh(role)
-        return RoleResponseModel(
-            id=role.id,
-            name=role.name,
-            description=role.description,
-            created_at=role.created_at.isoformat(),
-            updated_at=role.updated_at.isoformat()
+    return await find_user_by_telegram_id(session, telegram_id) is not None
+
+
+async def create_role(session: AsyncSession, data: RoleBase) -> RoleResponseModel:
+    # Проверяем, существует ли роль с таким именем
+    query = select(Role).where(Role.name == data.name)
+    result = await session.execute(query)
+    existing_role = result.scalars().first()
+    if existing_role:
+        raise HTTPException(
+            status_code=400,
+            detail="Role with this name already exists"
         )
-
-
-async def get_roles() -> list[RoleResponseModel]:
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        query = select(Role)
-        result = await session.execute(query)
-        roles = result.scalars().all()
-        return [
-            RoleResponseModel(
-                id=role.id,
-                name=role.name,
-                description=role.description,
-                created_at=role.created_at.isoformat(),
-                updated_at=role.updated_at.isoformat()
-            )
-            for role in roles
-        ]
-
-
-async def update_user_role(user_id: int, role_id: int) -> UserResponseModel:
-    sessionmaker = db.sessionmaker
-    async with sessionmaker() as session:
-        # Проверяем существование пользователя
-        user_query = select(User).where(User.id == user_id)
-        user_result = await session.execute(user_query)
-        user = user_result.scalars().first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
             
-        # Проверяем существование роли
-        role_query = select(Role).where(Role.id == role_id)
-        role_result = await session.execute(role_query)
-        role = role_result.scalars().first()
-        if not role:
-            raise HTTPException(status_code=404, detail="Role not found")
+    role = Role(**data.__dict__)
+    session.add(role)
+    await session.flush()
+    roles_lookup.invalidate_on_commit(session)
+    await session.refresh(role)
+    return RoleResponseModel(
+        id=role.id,
+        name=role.name,
+        description=role.description,
+        created_at=role.created_at.isoformat(),
+        updated_at=role.updated_at.isoformat()
+    )
+
+
+async def get_roles(session: AsyncSession) -> list[RoleResponseModel]:
+    roles = await roles_lookup.values(session)
+    return list(roles.values())
+
+
+async def update_user_role(session: AsyncSession, user_id: int, role_id: int) -> UserResponseModel:
+    # Проверяем существование пользователя
+    user_query = select(User).where(User.id == user_id)
+    user_result = await session.execute(user_query)
+    user = user_result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
             
-        # Обновляем роль пользователя
-        user.role_id = role_id
-        await session.commit()
-        
-        # Загружаем пользователя вместе с ролью
-        query = select(User).options(selectinload(User.role)).where(User.id == user_id)
-        result = await session.execute(query)
-        user = result.scalars().first()
+    # Проверяем существование роли
+    if await roles_lookup.get_value(session, role_id) is None:
+        raise HTTPException(status_code=404, detail="Role not found")
+            
+    # Обновляем роль пользователя
+    user.role_id = role_id
+    await session.flush()
+    _invalidate_user_on_commit(session, user.telegram_id)
+    # Подгружаем updated_at, обновленный базой
+    await session.refresh(user)
         
-        return UserResponseModel(
-            id=user.id,
-            username=user.username,
-            name=user.name,
-            contact=user.contact,
-            telegram_id=user.telegram_id,
-            role_id=user.role_id,
-            created_at=user.created_at.isoformat(),
-            updated_at=user.updated_at.isoformat(),
-            role=RoleResponseModel(
-                id=user.role.id,
-                name=user.role.name,
-                description=user.role.description,
-                created_at=user.role.created_at.isoformat(),
-                updated_at=user.role.updated_at.isoformat()
-            )
-        )
+    return await _to_user_response(session, user)
@@ -7,11 +7,7 @@ import dotenv
 dotenv.load_dotenv()
 
 # Dependency injection markers
-class DatabaseMarker:
-    pass
-
-class SettingsMarker:
-    pass
+from deps import DatabaseMarker, SettingsMarker
 
 # Settings class
 @dataclass
@@ -35,6 +31,28 @@ class Settings:
     
     # Application settings
     pagination_limit: int = int(os.getenv("PAGINATION_LIMIT", "10"))
+    # Максимум id в одном запросе /items/batch и /users/batch
+    batch_max_ids: int = int(os.getenv("BATCH_MAX_IDS", "100"))
+    # Сколько дней объявление показывается в лентах; более старые переносит в архив tasks.archive_items
+    listing_ttl_days: int = int(os.getenv("LISTING_TTL_DAYS", "7"))
+    # Сколько секунд GET /orders/events может ждать новых событий и как часто
+    # перепроверяет базу (события из других экземпляров API)
+    order_events_max_wait: float = float(os.getenv("ORDER_EVENTS_MAX_WAIT", "25"))
+    order_events_poll_interval: float = float(os.getenv("ORDER_EVENTS_POLL_INTERVAL", "1"))
+    # Сколько дней хранятся события; более старые удаляет tasks.prune_order_events
+    order_events_retention_days: int = int(os.getenv("ORDER_EVENTS_RETENTION_DAYS", "7"))
+
+    # Cache settings
+    statistics_cache_ttl: float = float(os.getenv("STATISTICS_CACHE_TTL", "60"))
+    lookup_cache_ttl: float = float(os.getenv("LOOKUP_CACHE_TTL", "300"))
+    listing_cache_size: int = int(os.getenv("LISTING_CACHE_SIZE", "512"))
+    listing_cache_max_bytes: int = int(os.getenv("LISTING_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    listing_cache_ttl: float = float(os.getenv("LISTING_CACHE_TTL", "30"))
+    user_cache_size: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    user_cache_ttl: float = float(os.getenv("USER_CACHE_TTL", "60"))
+
+    # Upload settings
+    max_upload_size: int = int(os.getenv("MAX_UPLOAD_SIZE", str(10 * 1024 * 1024)))
 
     @property
     def database_url(self) -> str:
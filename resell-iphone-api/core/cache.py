@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable, Iterable, Optional, Set, Tuple
+
+from core.metrics import CACHE_REQUESTS, CACHE_REFRESH_SECONDS, CACHE_ENTRIES, CACHE_SIZE_BYTES
+
+logger = logging.getLogger("uvicorn.error")
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+class StaleWhileRevalidateCache:
+    """
+    Кэш в памяти процесса со сроком жизни и отдачей устаревших данных.
+
+    Пока значение моложе ttl, оно отдается из кэша. Устаревшее значение
+    отдается сразу, а обновление запускается в фоне; одновременно по ключу
+    выполняется не больше одной загрузки, остальные запросы ждут ее результат.
+    """
+
+    def __init__(self, name: str, ttl: float, max_stale: Optional[float] = None):
+        self.name = name
+        self.ttl = ttl
+        # Сколько после ttl еще можно отдавать устаревшее значение (None — без ограничения)
+        self.max_stale = max_stale
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._loading: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(self, key: Hashable, loader: Loader, fresh: bool = False) -> Any:
+        """
+        Возвращает значение по ключу, при необходимости загружая его через loader.
+
+        fresh=True пропускает кэш: значение загружается заново и сохраняется.
+        """
+        if fresh:
+            CACHE_REQUESTS.labels(self.name, "bypass").inc()
+            return await self._load(key, loader)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                CACHE_REQUESTS.labels(self.name, "hit").inc()
+                return value
+            if self.max_stale is None or age < self.ttl + self.max_stale:
+                CACHE_REQUESTS.labels(self.name, "stale").inc()
+                self._refresh(key, loader)
+                return value
+
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        # shield: отмена одного ожидающего запроса не должна отменять общую загрузку
+        return await asyncio.shield(self._refresh(key, loader))
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Удаляет значение по ключу или, без ключа, все значения."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def _refresh(self, key: Hashable, loader: Loader) -> asyncio.Task:
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            self._loading[key] = task
+            task.add_done_callback(lambda done: self._loaded(key, done))
+        return task
+
+    def _loaded(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._loading.get(key) is task:
+            del self._loading[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ошибка обновления кэша {self.name}: {task.exception()}")
+
+    async def _load(self, key: Hashable, loader: Loader) -> Any:
+        started = time.perf_counter()
+        try:
+            value = await loader()
+        finally:
+            CACHE_REFRESH_SECONDS.labels(self.name).observe(time.perf_counter() - started)
+        self._entries[key] = (value, time.monotonic())
+        return value
+
+
+class ResponseCache:
+    """
+    Ограниченный LRU-кэш готовых тел ответов (JSON в байтах) с тегами.
+
+    Записи вытесняются по числу, суммарному размеру и сроку жизни.
+    invalidate_tags удаляет все записи, помеченные любым из тегов; ответ,
+    который начали строить до инвалидации, в кэш уже не попадает.
+    """
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int, ttl: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, float, FrozenSet[str]]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[Hashable]] = {}
+        self._size = 0
+        self.generation = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl:
+            if entry is not None:
+                self._remove(key)
+                self._report()
+            CACHE_REQUESTS.labels(self.name, "miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        CACHE_REQUESTS.labels(self.name, "hit").inc()
+        return entry[0]
+
+    def set(self, key: Hashable, body: bytes, tags: Iterable[str], generation: int) -> None:
+        """
+        Сохраняет ответ. generation — значение self.generation на момент начала
+        построения ответа: если с тех пор была инвалидация, ответ мог устареть.
+        """
+        if generation != self.generation or len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        tags = frozenset(tags)
+        self._entries[key] = (body, time.monotonic(), tags)
+        self._size += len(body)
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+        self._report()
+
+    def invalidate_tags(self, *tags: str) -> None:
+        self.generation += 1
+        for tag in tags:
+            for key in list(self._keys_by_tag.get(tag, ())):
+                self._remove(key)
+        self._report()
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self._keys_by_tag.clear()
+        self._size = 0
+        self._report()
+
+    def _remove(self, key: Hashable) -> None:
+        body, _, tags = self._entries.pop(key)
+        self._size -= len(body)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def _report(self) -> None:
+        CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+        CACHE_SIZE_BYTES.labels(self.name).set(self._size)
+
+
+class TTLCache:
+    """
+    Ограниченный LRU-кэш значений по ключу со сроком жизни.
+
+    Как и в ResponseCache, значение, которое начали загружать до инвалидации,
+    в кэш уже не попадает: set принимает generation на момент начала загрузки.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.generation = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl:
+            if entry is not None:
+                del self._entries[key]
+                self._report()
+            CACHE_REQUESTS.labels(self.name, "miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        CACHE_REQUESTS.labels(self.name, "hit").inc()
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, generation: int) -> None:
+        if generation != self.generation:
+            return
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._report()
+
+    def invalidate(self, key: Hashable) -> None:
+        self.generation += 1
+        if self._entries.pop(key, None) is not None:
+            self._report()
+
+    def _report(self) -> None:
+        CACHE_ENTRIES.labels(self.name).set(len(self._entries))
@@ -1,16 +1,52 @@
+import time
+
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from core.metrics import (
+    DB_POOL_SIZE,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_IDLE,
+    DB_POOL_OVERFLOW,
+    DB_POOL_WAIT_SECONDS,
+)
+from settings import Settings
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который измеряет время ожидания свободного соединения."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
 
 
 class DatabaseHandler:
-    def __init__(self, url: str):
-        self.url = url
+    def __init__(self, settings: Settings):
+        self.url = settings.database_url
         self.engine = create_async_engine(
             self.url,
-            echo=False,
+            echo=settings.db_echo,
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            pool_recycle=settings.db_pool_recycle,
+            connect_args={"statement_cache_size": settings.db_statement_cache_size},
         )
         self.sessionmaker = async_sessionmaker(
-            self.engine, autoflush=False, autocommit=False
+            self.engine, autoflush=False, autocommit=False, expire_on_commit=False
         )
 
+        pool = self.engine.pool
+        DB_POOL_SIZE.set_function(pool.size)
+        DB_POOL_CHECKED_OUT.set_function(pool.checkedout)
+        DB_POOL_IDLE.set_function(pool.checkedin)
+        DB_POOL_OVERFLOW.set_function(pool.overflow)
+
     async def close_connection(self):
         await self.engine.dispose()
@@ -0,0 +1,219 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger("uvicorn.error")
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations" / "versions"
+
+# Ключ advisory lock, под которым применяются миграции: при одновременном
+# старте нескольких экземпляров API миграции выполняет только один из них
+MIGRATIONS_LOCK_KEY = 7_210_533_101
+
+# Миграции с этим заголовком выполняются вне транзакции, по одному оператору.
+# Нужно для CREATE INDEX CONCURRENTLY, который нельзя запускать внутри транзакции
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+
+_FILENAME_RE = re.compile(r"^(\d+)_(\w+)\.sql$")
+_CONCURRENT_INDEX_RE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    path: Path
+    transactional: bool = True
+    statements: List[str] = field(default_factory=list)
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Разбивает SQL-скрипт на отдельные операторы по ';'.
+
+    Точки с запятой внутри строк, комментариев и $$-блоков (тела функций)
+    разделителями не считаются.
+    """
+    statements = []
+    current = []
+    i = 0
+    length = len(sql)
+    while i < length:
+        char = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            end = length if end == -1 else end
+            current.append(sql[i:end])
+            i = end
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            current.append(sql[i:end])
+            i = end
+        elif char == "'":
+            end = i + 1
+            while end < length:
+                if sql[end] == "'" and sql.startswith("''", end):
+                    end += 2
+                    continue
+                if sql[end] == "'":
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+        elif char == "$":
+            match = re.match(r"\$(\w*)\$", sql[i:])
+            if match:
+                tag = match.group(0)
+                end = sql.find(tag, i + len(tag))
+                end = length if end == -1 else end + len(tag)
+                current.append(sql[i:end])
+                i = end
+            else:
+                current.append(char)
+                i += 1
+        elif char == ";":
+            statements.append("".join(current))
+            current = []
+            i += 1
+        else:
+            current.append(char)
+            i += 1
+    statements.append("".join(current))
+
+    result = []
+    for statement in statements:
+        # Оператор, состоящий только из комментариев, выполнять не нужно
+        code = "\n".join(
+            line for line in statement.splitlines() if not line.strip().startswith("--")
+        )
+        if code.strip():
+            result.append(statement.strip())
+    return result
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """Читает файлы миграций вида NNNN_name.sql, отсортированные по версии."""
+    migrations = []
+    for path in directory.glob("*.sql"):
+        match = _FILENAME_RE.match(path.name)
+        if not match:
+            logger.warning(f"Пропущен файл миграции с некорректным именем: {path.name}")
+            continue
+        sql = path.read_text(encoding="utf-8")
+        migrations.append(Migration(
+            version=int(match.group(1)),
+            name=match.group(2),
+            path=path,
+            transactional=not sql.lstrip().startswith(NO_TRANSACTION_MARKER),
+            statements=split_statements(sql),
+        ))
+    migrations.sort(key=lambda migration: migration.version)
+
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+async def _drop_invalid_index(conn: AsyncConnection, statement: str) -> None:
+    """
+    Удаляет невалидный индекс, оставшийся от прерванного CREATE INDEX CONCURRENTLY.
+
+    Иначе IF NOT EXISTS молча пропустит его, и индекс так и останется неиспользуемым.
+    """
+    match = _CONCURRENT_INDEX_RE.search(statement)
+    if not match:
+        return
+    index_name = match.group(1)
+    result = await conn.exec_driver_sql(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        f"WHERE c.relname = '{index_name}' AND NOT i.indisvalid"
+    )
+    if result.first():
+        logger.warning(f"Удаляем невалидный индекс {index_name} перед повторным построением")
+        await conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+async def _apply(engine: AsyncEngine, conn: AsyncConnection, migration: Migration) -> None:
+    record = (
+        "INSERT INTO schema_migrations (version, name) "
+        f"VALUES ({migration.version}, '{migration.name}')"
+    )
+    if migration.transactional:
+        async with engine.begin() as tx:
+            for statement in migration.statements:
+                await tx.exec_driver_sql(statement)
+            await tx.exec_driver_sql(record)
+        return
+
+    # Соединение conn работает в режиме autocommit: каждый оператор фиксируется сразу,
+    # поэтому все операторы такой миграции должны быть идемпотентными (IF NOT EXISTS)
+    for statement in migration.statements:
+        await _drop_invalid_index(conn, statement)
+        await conn.exec_driver_sql(statement)
+    await conn.exec_driver_sql(record)
+
+
+async def apply_migrations(engine: AsyncEngine, directory: Path = MIGRATIONS_DIR) -> List[int]:
+    """
+    Применяет все еще не примененные миграции из directory.
+
+    Примененные версии хранятся в таблице schema_migrations. Возвращает список
+    версий, примененных при этом вызове.
+    """
+    migrations = load_migrations(directory)
+    applied_now = []
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql(f"SELECT pg_advisory_lock({MIGRATIONS_LOCK_KEY})")
+        try:
+            await conn.exec_driver_sql(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version INTEGER PRIMARY KEY, "
+                "name TEXT NOT NULL, "
+                "applied_at TIMESTAMP NOT NULL DEFAULT now())"
+            )
+            result = await conn.exec_driver_sql("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in result}
+
+            for migration in migrations:
+                if migration.version in applied:
+                    continue
+                logger.info(f"Применяем миграцию {migration.version:04d}_{migration.name}")
+                await _apply(engine, conn, migration)
+                applied_now.append(migration.version)
+        finally:
+            await conn.exec_driver_sql(f"SELECT pg_advisory_unlock({MIGRATIONS_LOCK_KEY})")
+
+    if applied_now:
+        logger.info(f"Применено миграций: {len(applied_now)}")
+    else:
+        logger.info("Схема базы данных актуальна")
+    return applied_now
+
+
+async def _main() -> None:
+    from database_handler import settings
+    from core.db import DatabaseHandler
+
+    logging.basicConfig(level=logging.INFO)
+    handler = DatabaseHandler(settings)
+    try:
+        await apply_migrations(handler.engine)
+    finally:
+        await handler.close_connection()
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(_main())
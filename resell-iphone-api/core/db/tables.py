@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, Text, TIMESTAMP, Float, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, Text, TIMESTAMP, Float, ForeignKey, Enum, Boolean, Date, Index, text
 from sqlalchemy.dialects.postgresql import TSVECTOR, BIGINT, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 
 from .base import Base
@@ -15,6 +15,10 @@ class Category(Base):
 
     items = relationship("Item", back_populates="category")
 
+    __table_args__ = (
+        Index("idx_categories_name", name),
+    )
+
 
 class Item(Base):
     __tablename__ = "items"
@@ -29,20 +33,53 @@ class Item(Base):
     user_id = Column(BIGINT, ForeignKey("users.id"), nullable=False)
     currency = Column(Text, nullable=False)
     is_sold = Column(Boolean, nullable=False, default=False)
+    # Поисковый документ (name с весом A, description с весом B) поддерживает триггер
+    # items_search_vector_trigger; в обычных выборках колонка не загружается
+    search_vector = deferred(Column(TSVECTOR))
+
+    # Индексы создаются миграциями из migrations/versions
+    __table_args__ = (
+        Index("idx_items_date_id", date.desc(), id.desc()),
+        Index("idx_items_unsold_date_id", date.desc(), id.desc(), postgresql_where=text("NOT is_sold")),
+        Index("idx_items_category_date_id", category_id, date.desc(), id.desc()),
+        Index("idx_items_user_date_id", user_id, date.desc(), id.desc()),
+        Index("idx_items_price_id", price, id),
+        Index("idx_items_unsold_price_id", price, id, postgresql_where=text("NOT is_sold")),
+        Index("idx_items_search_vector", "search_vector", postgresql_using="gin"),
+        Index("idx_items_image", image),
+    )
 
     category = relationship("Category", back_populates="items")
-    vector = relationship("ItemVector", back_populates="item", uselist=False)
     user = relationship("User", back_populates="items")
-    images = relationship("Image", back_populates="item")
-    orders = relationship("Order", back_populates="item")
-
-
-class ItemVector(Base):
-    __tablename__ = "item_vectors"
+    # Внешних ключей на items нет: после переноса в items_archive заказы
+    # и изображения продолжают ссылаться на id товара
+    images = relationship(
+        "Image", back_populates="item", primaryjoin="Item.id == foreign(Image.item_id)"
+    )
+    orders = relationship(
+        "Order", back_populates="item", primaryjoin="Item.id == foreign(Order.item_id)"
+    )
+
+
+class ItemArchive(Base):
+    """Объявления старше LISTING_TTL_DAYS без открытых заказов (tasks.archive_items)."""
+    __tablename__ = "items_archive"
     id = Column(Integer, primary_key=True)
-    product_id = Column(Integer, ForeignKey("items.id"), nullable=False)
-    vector = Column(TSVECTOR, nullable=False)
-    item = relationship("Item", back_populates="vector")
+    name = Column(Text, nullable=False)
+    image = Column(Text, nullable=False)
+    date = Column(TIMESTAMP, nullable=False)
+    price = Column(Float, nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    contact = Column(Text, nullable=False)
+    description = Column(Text, nullable=False)
+    user_id = Column(BIGINT, ForeignKey("users.id"), nullable=False)
+    currency = Column(Text, nullable=False)
+    is_sold = Column(Boolean, nullable=False)
+    archived_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_items_archive_user_date", user_id, date.desc()),
+    )
 
 
 class Role(Base):
@@ -59,11 +96,22 @@ class Role(Base):
 class Image(Base):
     __tablename__ = "images"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
+    item_id = Column(Integer, nullable=False)
     file_path = Column(Text, nullable=False)
+    # SHA-256 содержимого: одинаковые загрузки ссылаются на один файл
+    content_hash = Column(Text)
+    variants = Column(JSONB)
     created_at = Column(TIMESTAMP, nullable=False, default=func.now())
     
-    item = relationship("Item", back_populates="images")
+    item = relationship(
+        "Item", back_populates="images", primaryjoin="Item.id == foreign(Image.item_id)"
+    )
+
+    __table_args__ = (
+        Index("idx_images_item_id", item_id),
+        Index("idx_images_content_hash", content_hash),
+        Index("idx_images_file_path", file_path),
+    )
 
 
 class Order(Base):
@@ -71,7 +119,7 @@ class Order(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     buyer_id = Column(BIGINT, ForeignKey("users.id"), nullable=False)
     seller_id = Column(BIGINT, ForeignKey("users.id"), nullable=False)
-    item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
+    item_id = Column(Integer, nullable=False)
     buyer_telegram_id = Column(BIGINT, nullable=False)
     seller_telegram_id = Column(BIGINT, nullable=False)
     buyer_phone = Column(Text, nullable=False)
@@ -84,7 +132,16 @@ class Order(Base):
 
     buyer = relationship("User", foreign_keys=[buyer_id], back_populates="buyer_orders")
     seller = relationship("User", foreign_keys=[seller_id], back_populates="seller_orders")
-    item = relationship("Item", back_populates="orders")
+    item = relationship(
+        "Item", back_populates="orders", primaryjoin="Item.id == foreign(Order.item_id)"
+    )
+
+    __table_args__ = (
+        Index("idx_orders_buyer_created_at", buyer_id, created_at.desc(), id.desc()),
+        Index("idx_orders_seller_created_at", seller_id, created_at.desc(), id.desc()),
+        Index("idx_orders_created_at", created_at, postgresql_include=["total"]),
+        Index("idx_orders_item_id", item_id),
+    )
 
 
 class User(Base):
@@ -102,3 +159,70 @@ class User(Base):
     items = relationship("Item", back_populates="user")
     buyer_orders = relationship("Order", foreign_keys=[Order.buyer_id], back_populates="buyer")
     seller_orders = relationship("Order", foreign_keys=[Order.seller_id], back_populates="seller")
+
+    __table_args__ = (
+        Index("idx_users_role_id", role_id),
+    )
+
+
+# Агрегаты статистики (migrations/versions/0005_statistics_rollups.sql).
+# Триггеры добавляют строки-дельты, tasks.compact_statistics сворачивает их по ключу
+class OrderDailyStats(Base):
+    __tablename__ = "order_daily_stats"
+    id = Column(BIGINT, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False)
+    orders_count = Column(BIGINT, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_order_daily_stats_day", day),
+    )
+
+
+# Одна строка на пользователя, обновляется функцией user_activity_add (0012)
+class UserActivity(Base):
+    __tablename__ = "user_activity"
+    id = Column(BIGINT, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    items_count = Column(BIGINT, nullable=False, default=0)
+    orders_count = Column(BIGINT, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_user_activity_user_id", user_id, unique=True),
+    )
+
+
+class RoleUserStats(Base):
+    __tablename__ = "role_user_stats"
+    id = Column(BIGINT, primary_key=True, autoincrement=True)
+    role_id = Column(Integer, nullable=False)
+    users_count = Column(BIGINT, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_role_user_stats_role_id", role_id),
+    )
+
+
+# Число активных продавцов и покупателей: строки-дельты, которые добавляет
+# user_activity_add, когда итог пользователя пересекает ноль (0012)
+class ActiveUserStats(Base):
+    __tablename__ = "active_user_stats"
+    id = Column(BIGINT, primary_key=True, autoincrement=True)
+    sellers_count = Column(BIGINT, nullable=False, default=0)
+    buyers_count = Column(BIGINT, nullable=False, default=0)
+
+
+# Журнал смен статуса заказов (migrations/versions/0011_order_events.sql).
+# Строки добавляет триггер orders_events_trigger, API их только читает
+class OrderEvent(Base):
+    __tablename__ = "order_events"
+    id = Column(BIGINT, primary_key=True, autoincrement=True)
+    order_id = Column(Integer, nullable=False)
+    status = Column(Text, nullable=False)
+    previous_status = Column(Text)
+    txid = Column(BIGINT, nullable=False, server_default=text("txid_current()"))
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_order_events_txid_id", txid, id),
+    )
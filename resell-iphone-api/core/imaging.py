@@ -0,0 +1,256 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageOps
+
+from core.metrics import IMAGE_PROCESSING_SECONDS
+
+# Производные изображения: имя -> максимальная сторона в пикселях
+VARIANT_SIZES = {
+    "thumb": 320,
+    "card": 800,
+    "full": 1600,
+}
+
+DERIVED_DIR = "static/uploads/derived"
+
+JPEG_OPTIONS = {"quality": 85, "optimize": True, "progressive": True}
+WEBP_OPTIONS = {"quality": 80, "method": 4}
+# Форматы оригиналов, которые можно пересохранить без метаданных, не теряя
+# кадров: формат -> (формат записи, параметры). Качество выше, чем у производных.
+# MPO (так открываются JPEG с камер iPhone) сохраняется обычным JPEG: второй
+# кадр — служебное изображение камеры, в объявлении показывается только первый
+CLEAN_FORMATS = {
+    "JPEG": ("JPEG", {"quality": 95, "optimize": True}),
+    "MPO": ("JPEG", {"quality": 95, "optimize": True}),
+    "PNG": ("PNG", {"optimize": True}),
+    "WEBP": ("WEBP", {"quality": 95, "method": 4}),
+}
+
+# Метаданные, которые не должны попасть в публичный оригинал (геопозиция и т.п.)
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+
+Variants = Dict[str, Dict[str, str]]
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def _save(image: Image.Image, path: str, format: str, options: dict) -> None:
+    """Сохраняет изображение во временный файл и атомарно переименовывает его."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as target:
+            image.save(target, format=format, **options)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """JPEG не поддерживает прозрачность: подкладываем белый фон."""
+    if image.mode != "RGBA":
+        return image
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def _has_metadata(image: Image.Image) -> bool:
+    """EXIF, XMP, комментарии или текстовые блоки PNG."""
+    return (
+        bool(image.getexif())
+        or any(key in image.info for key in METADATA_KEYS)
+        or bool(getattr(image, "text", None))
+    )
+
+
+def planned_variants(source_path: str, output_dir: str = DERIVED_DIR) -> Variants:
+    """
+    Пути производных для source_path. Каталог выбирается по первым символам
+    имени файла (хэша содержимого), как и для оригиналов.
+    """
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    directory = os.path.join(output_dir, stem[:2], stem[2:4])
+    return {
+        name: {
+            "jpeg": os.path.join(directory, f"{stem}_{name}.jpg"),
+            "webp": os.path.join(directory, f"{stem}_{name}.webp"),
+        }
+        for name in VARIANT_SIZES
+    }
+
+
+def strip_metadata(source_path: str, output_dir: str) -> Optional[str]:
+    """
+    Пишет копию изображения без метаданных (EXIF с геопозицией, XMP,
+    комментарии, текстовые блоки PNG) во временный .part-файл в output_dir
+    и возвращает его путь. Ориентация из EXIF применяется к пикселям,
+    цветовой профиль и прозрачность палитры сохраняются.
+
+    Возвращает None, если метаданных нет или изображение нельзя пересохранить
+    без потерь (форматы вне CLEAN_FORMATS, анимации): файл используется как есть.
+    Выполняется в процессе пула.
+
+    Raises:
+        InvalidImage: если файл не удалось прочитать как изображение
+    """
+    try:
+        with Image.open(source_path) as original:
+            original.load()
+            source_format = original.format
+            if source_format not in CLEAN_FORMATS or not _has_metadata(original):
+                return None
+            if source_format != "MPO" and getattr(original, "n_frames", 1) > 1:
+                return None
+            image = ImageOps.exif_transpose(original)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e))
+
+    target_format, options = CLEAN_FORMATS[source_format]
+    options = {**options, "exif": b""}
+    icc_profile = image.info.get("icc_profile")
+    if icc_profile:
+        options["icc_profile"] = icc_profile
+    transparency = image.info.get("transparency")
+    image.info = {} if transparency is None else {"transparency": transparency}
+
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as target:
+            image.save(target, format=target_format, **options)
+            target.flush()
+            os.fsync(target.fileno())
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+    return tmp_path
+
+
+def render_variants(source_path: str, output_dir: str = DERIVED_DIR) -> Variants:
+    """
+    Строит производные изображения source_path в форматах JPEG и WebP.
+    Если все производные уже есть (файл загружали раньше), ничего не делает.
+
+    Выполняется в процессе пула, поэтому модуль не должен импортировать
+    приложение и работу с БД. Ориентация из EXIF применяется
+    к пикселям, сами метаданные EXIF в производные не копируются.
+
+    Returns:
+        {"thumb": {"jpeg": path, "webp": path}, "card": {...}, "full": {...}}
+
+    Raises:
+        InvalidImage: если файл не удалось прочитать как изображение
+    """
+    variants = planned_variants(source_path, output_dir)
+    if all(os.path.exists(path) for path in variant_paths(variants)):
+        return variants
+
+    try:
+        with Image.open(source_path) as original:
+            original.load()
+            image = ImageOps.exif_transpose(original)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e))
+
+    icc_profile = image.info.get("icc_profile")
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    # Оставляем только цветовой профиль: EXIF, XMP и комментарии отбрасываются
+    image.info = {}
+
+    extra = {"icc_profile": icc_profile} if icc_profile else {}
+    written = []
+    try:
+        for name, max_side in VARIANT_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+
+            jpeg_path = variants[name]["jpeg"]
+            os.makedirs(os.path.dirname(jpeg_path), exist_ok=True)
+            _save(_flatten(resized), jpeg_path, "JPEG", {**JPEG_OPTIONS, **extra})
+            written.append(jpeg_path)
+
+            webp_path = variants[name]["webp"]
+            _save(resized, webp_path, "WEBP", {**WEBP_OPTIONS, **extra})
+            written.append(webp_path)
+    except BaseException:
+        # Неполный набор производных не нужен: удаляем уже записанные файлы
+        for path in written:
+            with suppress(FileNotFoundError):
+                os.remove(path)
+        raise
+    return variants
+
+
+def variant_paths(variants: Optional[Variants]) -> List[str]:
+    """Все файлы, перечисленные в variants."""
+    if not variants:
+        return []
+    return [path for formats in variants.values() for path in formats.values()]
+
+
+def pick_variant(file_path: str, variants: Optional[Variants], size: Optional[str]) -> str:
+    """
+    Путь к JPEG-варианту размера size. Если размер не запрошен или вариантов
+    нет (изображения, загруженные до появления производных), возвращает оригинал.
+    """
+    if not size or not variants or size not in variants:
+        return file_path
+    return variants[size].get("jpeg", file_path)
+
+
+class ImageProcessor:
+    """
+    Пул процессов для построения производных изображений.
+
+    Масштабирование и перекодирование нагружают CPU и держат GIL, поэтому
+    выполняются в отдельных процессах. Число задач, ожидающих пула,
+    ограничено семафором, чтобы очередь не росла без предела.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def start(self, workers: int) -> None:
+        # spawn: дочерние процессы не наследуют event loop и соединения с БД
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._slots = asyncio.Semaphore(workers * 2)
+
+    async def _run(self, function, *args):
+        if self._executor is None:
+            raise RuntimeError("Image processor is not started")
+        async with self._slots:
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._executor, function, *args)
+            finally:
+                IMAGE_PROCESSING_SECONDS.observe(time.perf_counter() - started)
+
+    async def render(self, source_path: str, output_dir: str = DERIVED_DIR) -> Variants:
+        return await self._run(render_variants, source_path, output_dir)
+
+    async def strip_metadata(self, source_path: str, output_dir: str) -> Optional[str]:
+        return await self._run(strip_metadata, source_path, output_dir)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+image_processor = ImageProcessor()
@@ -0,0 +1,116 @@
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from core.db.hooks import on_commit
+from core.db.tables import Category, Role
+from core.metrics import CACHE_REQUESTS
+from core.models.users import RoleResponseModel
+
+
+class LookupTable:
+    """
+    Справочник name <-> id, целиком хранящийся в памяти процесса.
+
+    Подходит для небольших редко меняющихся таблиц (категории, роли).
+    Запись в таблицу должна вызывать invalidate_on_commit; ttl ограничивает
+    расхождение между процессами API, которые об этой записи не узнали.
+    """
+
+    def __init__(self, name: str, model, to_value: Callable[[Any], Any], ttl: float):
+        self.name = name
+        self.model = model
+        self.to_value = to_value
+        self.ttl = ttl
+        self._ids: Dict[str, int] = {}
+        self._values: Dict[int, Any] = {}
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+
+    async def load(self, session: AsyncSession) -> Tuple[Dict[str, int], Dict[int, Any]]:
+        generation = self._generation
+        result = await session.execute(select(self.model))
+        rows = result.scalars().all()
+        ids = {row.name: row.id for row in rows}
+        values = {row.id: self.to_value(row) for row in rows}
+        # Если справочник инвалидировали во время загрузки, прочитанные данные
+        # могут быть старше записи: используем их для текущего вызова, но не сохраняем
+        if generation == self._generation:
+            self._ids, self._values = ids, values
+            self._loaded_at = time.monotonic()
+        return ids, values
+
+    async def _snapshot(self, session: AsyncSession) -> Tuple[Dict[str, int], Dict[int, Any]]:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+            return await self.load(session)
+        return self._ids, self._values
+
+    async def get_id(self, session: AsyncSession, name: str) -> Optional[int]:
+        ids, _ = await self._snapshot(session)
+        if name in ids:
+            CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return ids[name]
+        # Запись могла появиться в другом процессе API
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        result = await session.execute(select(self.model.id).where(self.model.name == name))
+        found = result.scalar()
+        if found is not None:
+            self.invalidate()
+        return found
+
+    async def values(self, session: AsyncSession, ids: Iterable[int] = ()) -> Dict[int, Any]:
+        """
+        Все значения справочника по id.
+
+        Если какого-то из ids нет в памяти (запись из другого процесса API),
+        справочник перечитывается.
+        """
+        _, values = await self._snapshot(session)
+        if any(id not in values for id in ids):
+            CACHE_REQUESTS.labels(self.name, "miss").inc()
+            _, values = await self.load(session)
+        return values
+
+    async def get_value(self, session: AsyncSession, id: int) -> Optional[Any]:
+        _, values = await self._snapshot(session)
+        if id in values:
+            CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return values[id]
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        row = await session.get(self.model, id)
+        if row is None:
+            return None
+        self.invalidate()
+        return self.to_value(row)
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._loaded_at = None
+
+    def invalidate_on_commit(self, session: AsyncSession) -> None:
+        on_commit(session, self.invalidate)
+
+
+def _role_model(role: Role) -> RoleResponseModel:
+    return RoleResponseModel(
+        id=role.id,
+        name=role.name,
+        description=role.description,
+        created_at=role.created_at.isoformat(),
+        updated_at=role.updated_at.isoformat(),
+    )
+
+
+categories_lookup = LookupTable(
+    "categories", Category, lambda category: category.name, ttl=settings.lookup_cache_ttl
+)
+roles_lookup = LookupTable("roles", Role, _role_model, ttl=settings.lookup_cache_ttl)
+
+
+async def warm_lookups(session: AsyncSession) -> None:
+    """Загружает справочники при старте приложения."""
+    await categories_lookup.load(session)
+    await roles_lookup.load(session)
@@ -0,0 +1,62 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Метрики пула соединений с базой данных
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Configured number of persistent connections in the pool"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool"
+)
+DB_POOL_IDLE = Gauge(
+    "db_pool_idle", "Idle connections currently held by the pool"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections opened above pool_size (negative while the pool is warming up)"
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# Метрики кэшей в памяти процесса (core/cache.py)
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Cache lookups by result: hit, stale (served while refreshing), miss or bypass",
+    ["cache", "result"],
+)
+CACHE_REFRESH_SECONDS = Histogram(
+    "cache_refresh_seconds",
+    "Time spent loading a fresh value into the cache",
+    ["cache"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+CACHE_ENTRIES = Gauge(
+    "cache_entries", "Entries currently held by the cache", ["cache"]
+)
+CACHE_SIZE_BYTES = Gauge(
+    "cache_size_bytes", "Total size of cached response bodies", ["cache"]
+)
+
+# Метрики обработки изображений (core/imaging.py)
+IMAGE_PROCESSING_SECONDS = Histogram(
+    "image_processing_seconds",
+    "Time spent rendering image variants, including the wait for a pool worker",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# Метрики очистки загруженных файлов (tasks/collect_uploads.py)
+UPLOAD_GC_REMOVED_FILES = Counter(
+    "upload_gc_removed_files", "Unreferenced upload files deleted by the sweeper"
+)
+UPLOAD_GC_RECLAIMED_BYTES = Counter(
+    "upload_gc_reclaimed_bytes", "Disk space reclaimed by deleting unreferenced upload files"
+)
+UPLOAD_GC_ORPHAN_BYTES = Gauge(
+    "upload_gc_orphan_bytes", "Unreferenced upload files left on disk after the last sweep (dry runs included)"
+)
+
+# Метрики архивации объявлений (tasks/archive_items.py)
+ITEMS_ARCHIVED = Counter(
+    "items_archived", "Expired listings moved from items to items_archive"
+)
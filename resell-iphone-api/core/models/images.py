@@ -1,5 +1,6 @@
+from enum import Enum
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional
 
 
 class ImageBase(BaseModel):
@@ -9,10 +10,18 @@ class ImageBase(BaseModel):
     file_path: str
 
 
+class ImageSize(str, Enum):
+    THUMB = "thumb"
+    CARD = "card"
+    FULL = "full"
+
+
 class ImageModel(ImageBase):
     id: int
     item_id: int
     created_at: str
+    variants: Optional[Dict[str, Dict[str, str]]] = None
+    content_hash: Optional[str] = None
 
 
 class ImageCreateModel(BaseModel):
@@ -27,6 +27,7 @@ class ItemModel(ItemBase):
 class ItemsModel(BaseModel):
     page: int
     next_page: bool
+    next_cursor: Optional[str] = None
     items: list[ItemModel]
 
 
@@ -35,6 +36,11 @@ class ItemExtendedModel(ItemModel):
     user_id: int
 
 
+class ItemsBatchModel(BaseModel):
+    items: list[ItemExtendedModel]
+    missing: list[int]
+
+
 class ItemCreateModel(ItemBase):
     description: str
     image: Optional[UploadFile] = None
@@ -25,6 +25,53 @@ class OrderModel(OrderBase):
     updated_at: datetime
 
 
+class OrderItemModel(BaseModel):
+    id: int
+    name: str
+    price: float
+    currency: str
+    is_sold: bool
+    # Объявление уже перенесено в items_archive
+    archived: bool
+
+
+class OrderUserModel(BaseModel):
+    id: int
+    username: Optional[str] = None
+    name: str
+
+
+class OrderExpandedModel(OrderModel):
+    # Заполняются только при запросе через expand
+    item: Optional[OrderItemModel] = None
+    buyer: Optional[OrderUserModel] = None
+    seller: Optional[OrderUserModel] = None
+
+
+class OrdersPageModel(BaseModel):
+    orders: List[OrderExpandedModel]
+    next_cursor: Optional[str] = None
+
+
+class OrderEventModel(BaseModel):
+    class Config:
+        from_attributes = True
+
+    id: int
+    order_id: int
+    status: str
+    previous_status: Optional[str] = None
+    created_at: datetime
+    # Заказ с товаром на момент чтения события; None, если заказа уже нет
+    order: Optional[OrderExpandedModel] = None
+
+
+class OrderEventsModel(BaseModel):
+    events: List[OrderEventModel]
+    # Передается в следующий запрос, чтобы получить события после этих
+    cursor: str
+
+
 class OrdersModel(BaseModel):
     orders: List[OrderModel]
     total: int
@@ -47,6 +47,11 @@ class UsersModel(BaseModel):
     total: int
 
 
+class UsersBatchModel(BaseModel):
+    users: List[UserResponseModel]
+    missing: List[int]
+
+
 class UserCreateModel(UserBase):
     pass
 
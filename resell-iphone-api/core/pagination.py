@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+
+from fastapi import HTTPException
+
+
+def encode_cursor(sort: str, *values: Any) -> str:
+    """
+    Кодирует позицию keyset-пагинации в непрозрачную строку.
+
+    Курсор хранит ключ сортировки (например, "date:desc") и значения
+    последней строки страницы, чтобы его нельзя было применить к другой сортировке.
+    """
+    payload = [sort] + [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, size: int = 2) -> List[Any]:
+    """
+    Декодирует курсор и возвращает size сохраненных значений.
+
+    Raises:
+        HTTPException: 400 если курсор поврежден или выдан для другой сортировки
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(payload, list) or len(payload) != size + 1 or payload[0] != sort:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return payload[1:]
+
+
+def cursor_int(value: Any) -> int:
+    """
+    Целое значение из курсора (например, id последней строки).
+
+    Raises:
+        HTTPException: 400 если значение не целое число
+    """
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+
+def cursor_number(value: Any) -> float:
+    """
+    Числовое значение из курсора (цена, ранг поиска).
+
+    Raises:
+        HTTPException: 400 если значение не число
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return float(value)
+
+
+def page_size(limit: int | None, max_limit: int) -> int:
+    """Размер страницы, выбранный клиентом, но не больше max_limit."""
+    if not limit:
+        return max_limit
+    return min(limit, max_limit)
+
+
+def parse_ids(raw: str, max_ids: int) -> List[int]:
+    """
+    Разбирает список id через запятую ("3,1,2") без повторов, сохраняя порядок.
+
+    Raises:
+        HTTPException: 400 если список пуст, содержит не числа или длиннее max_ids
+    """
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    if not ids:
+        raise HTTPException(status_code=400, detail="ids must not be empty")
+    if len(ids) > max_ids:
+        raise HTTPException(status_code=400, detail=f"Too many ids (max {max_ids})")
+    return ids
@@ -0,0 +1,208 @@
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from mimetypes import guess_type
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# Файлы с хэшем содержимого в имени (core.uploads.blob_path и их производные)
+# никогда не меняются, поэтому кэшируются клиентами и прокси без перепроверки
+_CONTENT_ADDRESSED_RE = re.compile(r"^[0-9a-f]{64}(_\w+)?\.\w+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Разбирает заголовок Range вида bytes=a-b, bytes=a- или bytes=-n.
+
+    Возвращает включительные границы или None, если заголовок нужно
+    проигнорировать и отдать файл целиком (в том числе для нескольких
+    диапазонов: это допускается RFC 9110).
+
+    Raises:
+        RangeNotSatisfiable: если диапазон лежит за концом файла
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, separator, end_text = spec.strip().partition("-")
+    if not separator:
+        return None
+    try:
+        if not start_text:
+            suffix = int(end_text)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - suffix), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start < 0 or (end_text and end < start):
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Слабое сравнение для If-None-Match: W/"x" совпадает с "x"."""
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class StaticFileResponse(Response):
+    """
+    Отдает файл или его диапазон [start, end].
+
+    Если сервер поддерживает расширение ASGI http.response.pathsend, файл
+    целиком передается серверу по пути и отправляется без чтения в Python
+    (например, через sendfile). Иначе файл читается кусками вне event loop.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        headers: dict,
+        media_type: str,
+        start: int,
+        end: int,
+        status_code: int = 200,
+    ):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers({**headers, "content-length": str(end - start + 1)})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        whole_file = self.status_code == 200
+        if whole_file and "http.response.pathsend" in scope.get("extensions", {}):
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class ImageStaticFiles(StaticFiles):
+    """
+    Раздача /static с заголовками кэширования, условными запросами и Range.
+
+    - Файлы с хэшем содержимого в имени отдаются с Cache-Control immutable
+      на год и ETag из имени файла, остальные — с обязательной перепроверкой
+    - If-None-Match и If-Modified-Since дают 304 без чтения файла
+    - Range с одним диапазоном дает 206, с учетом If-Range
+    - Если задан accel_redirect_prefix, тело отдает фронтовой прокси:
+      ответ содержит только заголовки и X-Accel-Redirect с путем файла
+      (nginx: internal location с alias на каталог static)
+    """
+
+    def __init__(self, *, directory: str, accel_redirect_prefix: Optional[str] = None, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.accel_redirect_prefix = accel_redirect_prefix
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        # Страницы 404 в режиме html отдаем как обычно
+        if status_code != 200:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        full_path = str(full_path)
+        filename = os.path.basename(full_path)
+        size = stat_result.st_size
+        last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        if _CONTENT_ADDRESSED_RE.match(filename):
+            etag = f'"{filename}"'
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            etag = f'"{stat_result.st_mtime_ns:x}-{size:x}"'
+            cache_control = REVALIDATE_CACHE_CONTROL
+        media_type = guess_type(filename)[0] or "application/octet-stream"
+        headers = {
+            "etag": etag,
+            "last-modified": last_modified,
+            "cache-control": cache_control,
+            "accept-ranges": "bytes",
+        }
+
+        request_headers = Headers(scope=scope)
+        if self._not_modified(request_headers, etag, stat_result.st_mtime):
+            return Response(status_code=304, headers=headers)
+
+        if self.accel_redirect_prefix:
+            relative_path = os.path.relpath(full_path, os.path.realpath(self.directory))
+            headers["x-accel-redirect"] = self.accel_redirect_prefix.rstrip("/") + "/" + quote(relative_path)
+            return Response(status_code=200, headers=headers, media_type=media_type)
+
+        byte_range = None
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range in (etag, last_modified)):
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                return Response(
+                    status_code=416,
+                    headers={**headers, "content-range": f"bytes */{size}"},
+                )
+
+        if byte_range is None:
+            return StaticFileResponse(full_path, headers, media_type, 0, size - 1)
+        start, end = byte_range
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+        return StaticFileResponse(full_path, headers, media_type, start, end, status_code=206)
+
+    @staticmethod
+    def _not_modified(request_headers: Headers, etag: str, mtime: float) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return _etag_matches(if_none_match, etag)
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
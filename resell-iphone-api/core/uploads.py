@@ -0,0 +1,324 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from core.imaging import InvalidImage, Variants, image_processor, variant_paths
+
+UPLOAD_DIR = "static/uploads"
+# Каталог, общий с ботом (том shared_static в docker-compose)
+SHARED_DIR = "static"
+CHUNK_SIZE = 1024 * 1024
+
+# Файл, повторно загруженный за последние BLOB_REUSE_WINDOW секунд, при удалении
+# изображения не трогаем: запись о новой загрузке может быть еще не зафиксирована
+BLOB_REUSE_WINDOW = 600
+
+_EXTENSION_ALIASES = {".jpeg": ".jpg"}
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    content_hash: str
+    # Файл записан этой загрузкой, а не найден готовым с тем же содержимым
+    created: bool
+    mtime: float
+    variants: Optional[Variants] = None
+
+
+def file_extension(filename: str) -> str:
+    """Расширение файла в нижнем регистре, .jpeg приводится к .jpg."""
+    extension = os.path.splitext(filename)[1].lower()
+    return _EXTENSION_ALIASES.get(extension, extension)
+
+
+def blob_path(content_hash: str, extension: str, upload_dir: str = UPLOAD_DIR) -> str:
+    """
+    Путь к файлу по хэшу его содержимого: static/uploads/ab/cd/abcd....jpg.
+
+    Два уровня вложенности по первым символам хэша держат каталоги небольшими.
+    """
+    return os.path.join(upload_dir, content_hash[:2], content_hash[2:4], f"{content_hash}{extension}")
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(source: str, target: str) -> bool:
+    """
+    Создает target с содержимым source, если его еще нет: жесткой ссылкой,
+    а если файловая система ее не поддерживает — копией через временный файл.
+    Возвращает True, если target создан этим вызовом.
+    """
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(target):
+        return False
+    try:
+        os.link(source, target)
+        return True
+    except FileExistsError:
+        return False
+    except OSError:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        os.close(fd)
+        try:
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, target)
+        except BaseException:
+            remove_files(tmp_path)
+            raise
+        return True
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_temp(source: BinaryIO, upload_dir: str, max_bytes: int) -> str:
+    """
+    Копирует загруженный файл кусками во временный .part-файл в upload_dir
+    и возвращает его путь. Выполняется в пуле потоков.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, suffix=".part")
+    try:
+        written = 0
+        with os.fdopen(fd, "wb") as target:
+            while chunk := source.read(CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge()
+                target.write(chunk)
+            target.flush()
+            os.fsync(target.fileno())
+    except BaseException:
+        remove_files(tmp_path)
+        raise
+    return tmp_path
+
+
+def store_blob(source: str, extension: str, upload_dir: str = UPLOAD_DIR, move: bool = False) -> StoredUpload:
+    """
+    Сохраняет файл source в путь по хэшу его содержимого. С move файл
+    (временный, из той же файловой системы) переименовывается, иначе
+    связывается жесткой ссылкой или копируется. Если файл с таким содержимым
+    уже есть, новая копия отбрасывается. Выполняется в пуле потоков.
+    """
+    content_hash = hash_file(source)
+    final_path = blob_path(content_hash, extension, upload_dir)
+    shard_dir = os.path.dirname(final_path)
+    os.makedirs(shard_dir, exist_ok=True)
+    if move:
+        try:
+            # Обновленный mtime защищает файл от удаления вместе с прежними ссылками
+            os.utime(final_path)
+            os.unlink(source)
+            created = False
+        except FileNotFoundError:
+            os.replace(source, final_path)
+            _fsync_dir(shard_dir)
+            created = True
+    else:
+        created = link_or_copy(source, final_path)
+        if not created:
+            os.utime(final_path)
+    return StoredUpload(
+        path=final_path,
+        content_hash=content_hash,
+        created=created,
+        mtime=os.stat(final_path).st_mtime,
+    )
+
+
+def _check_shared_file(source: str, max_bytes: int) -> None:
+    if not os.path.isfile(source):
+        raise FileNotFoundError(source)
+    if os.path.getsize(source) > max_bytes:
+        raise UploadTooLarge()
+
+
+def shared_file_path(reference: str) -> str:
+    """
+    Путь к файлу, который передан ссылкой на общий каталог SHARED_DIR.
+
+    Raises:
+        HTTPException: 400 если путь ведет за пределы SHARED_DIR или в UPLOAD_DIR
+    """
+    shared_root = os.path.realpath(SHARED_DIR)
+    upload_root = os.path.realpath(UPLOAD_DIR)
+    path = os.path.realpath(reference)
+    if (
+        os.path.commonpath([shared_root, path]) != shared_root
+        or os.path.commonpath([upload_root, path]) == upload_root
+    ):
+        raise HTTPException(status_code=400, detail="image_path must point to a file in the shared static directory")
+    return path
+
+
+async def _receive_source(
+    file: Optional[UploadFile], shared_path: Optional[str], upload_dir: str, max_bytes: int
+) -> Tuple[str, str, bool]:
+    """
+    Исходный файл изображения: загруженный файл, записанный во временный,
+    или файл, который клиент уже положил в общий каталог (бот сохраняет туда
+    фото из Telegram), без повторной передачи содержимого.
+    Возвращает путь, расширение и признак временного файла.
+
+    Raises:
+        HTTPException: 400 если путь недопустим или файла нет
+        HTTPException: 413 если файл больше max_bytes
+        HTTPException: 500 если файл не удалось сохранить
+    """
+    too_large = HTTPException(status_code=413, detail=f"File is too large (max {max_bytes} bytes)")
+    try:
+        if file is not None:
+            if file.size is not None and file.size > max_bytes:
+                raise too_large
+            source = await run_in_threadpool(_write_temp, file.file, upload_dir, max_bytes)
+            return source, file_extension(file.filename or ""), True
+        source = shared_file_path(shared_path)
+        await run_in_threadpool(_check_shared_file, source, max_bytes)
+        return source, file_extension(source), False
+    except FileNotFoundError:
+        raise HTTPException(status_code=400, detail="Shared file not found")
+    except UploadTooLarge:
+        raise too_large
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
+
+
+async def store_image_upload(
+    file: Optional[UploadFile] = None,
+    shared_path: Optional[str] = None,
+    upload_dir: str = UPLOAD_DIR,
+    max_bytes: int = settings.max_upload_size,
+) -> StoredUpload:
+    """
+    Сохраняет изображение в upload_dir под именем по хэшу содержимого
+    и строит его производные (core.imaging).
+
+    Метаданные (EXIF с геопозицией и т.п.) удаляются до подсчета хэша: в
+    хранилище попадает уже очищенный файл, а одинаковые после очистки
+    изображения хранятся один раз. Файл пишется вне event loop, а возвращенный
+    путь указывает на уже сброшенный на диск файл, поэтому запись в БД можно
+    делать после.
+
+    Изображение передается либо загруженным файлом file, либо путем
+    shared_path в общем каталоге.
+
+    Raises:
+        HTTPException: 400 если файл не удалось прочитать как изображение
+        HTTPException: 400 если путь в общем каталоге недопустим или файла нет
+        HTTPException: 413 если файл больше max_bytes
+        HTTPException: 500 если файл не удалось сохранить
+    """
+    source, extension, temporary = await _receive_source(file, shared_path, upload_dir, max_bytes)
+    try:
+        clean = await image_processor.strip_metadata(source, upload_dir)
+        if clean is not None:
+            if temporary:
+                await run_in_threadpool(remove_files, source)
+            source, temporary = clean, True
+        upload = await run_in_threadpool(store_blob, source, extension, upload_dir, temporary)
+    except InvalidImage:
+        raise HTTPException(status_code=400, detail="File is not a valid image")
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
+    finally:
+        # Временный файл либо переименован в путь по хэшу, либо больше не нужен
+        if temporary:
+            await run_in_threadpool(remove_files, source)
+
+    try:
+        upload.variants = await image_processor.render(upload.path)
+    except InvalidImage:
+        await discard_upload(upload)
+        raise HTTPException(status_code=400, detail="File is not a valid image")
+    except BaseException:
+        await discard_upload(upload)
+        raise
+    return upload
+
+
+async def receive_image_upload(
+    file: Optional[UploadFile], shared_path: Optional[str]
+) -> Optional[StoredUpload]:
+    """
+    Изображение из формы объявления: загруженный файл, путь в общем каталоге
+    или ничего, если изображение не передано.
+
+    Raises:
+        HTTPException: 400 если переданы и файл, и путь
+    """
+    if file and shared_path:
+        raise HTTPException(status_code=400, detail="Pass either image or image_path, not both")
+    if file:
+        return await store_image_upload(file)
+    if shared_path:
+        return await store_image_upload(shared_path=shared_path)
+    return None
+
+
+def remove_files(*paths: str) -> None:
+    for path in paths:
+        with suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def _remove_unless_reused(paths: List[str], reused_after: float) -> bool:
+    """
+    Удаляет файлы изображения, если оригинал (paths[0]) не загружали
+    повторно после reused_after. Возвращает True, если файлы удалены.
+    """
+    try:
+        if os.stat(paths[0]).st_mtime > reused_after:
+            return False
+    except FileNotFoundError:
+        pass
+    remove_files(*paths)
+    return True
+
+
+async def discard_upload(upload: StoredUpload) -> None:
+    """
+    Удаляет файлы загрузки, например если запись в БД не удалась.
+
+    Файл, найденный готовым, и файл, который успели загрузить повторно,
+    принадлежат и другим записям, поэтому остаются на месте.
+    """
+    if not upload.created:
+        return
+    paths = [upload.path, *variant_paths(upload.variants)]
+    await run_in_threadpool(_remove_unless_reused, paths, upload.mtime)
+
+
+def remove_image_files(file_path: str, variants: Optional[Variants]) -> bool:
+    """
+    Удаляет оригинал изображения и его производные, на которые больше нет ссылок.
+    Недавно загруженный повторно файл не удаляется.
+    """
+    paths = [file_path, *variant_paths(variants)]
+    return _remove_unless_reused(paths, time.time() - BLOB_REUSE_WINDOW)
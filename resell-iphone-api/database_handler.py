@@ -1,14 +1,7 @@
 import os
-from core.db.tables import User, Item, Category, ItemVector
 
 import dotenv
-from sqlalchemy.ext.asyncio import (
-    create_async_engine,
-    async_sessionmaker,
-)
 
-from core.db.base import Base
-from core.db.tables import User, Item, Category, ItemVector  # Импортируем все модели
 from settings import Settings
 
 dotenv.load_dotenv()
@@ -23,26 +16,21 @@ settings = Settings(
     cors_allowed_methods=os.getenv("ALLOWED_METHODS", "GET,POST,PUT,DELETE,OPTIONS").split(","),
     cors_allowed_headers=os.getenv("ALLOWED_HEADERS", "*").split(","),
     pagination_limit=int(os.getenv("PAGINATION_LIMIT", "10")),
+    db_pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    db_max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    db_pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    db_pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "True").lower() == "true",
+    db_pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    db_statement_cache_size=int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")),
+    db_echo=os.getenv("DB_ECHO", "False").lower() == "true",
+    stats_compaction_interval=float(os.getenv("STATS_COMPACTION_INTERVAL", "300")),
+    image_workers=int(os.getenv("IMAGE_WORKERS", "2")),
+    upload_gc_interval=float(os.getenv("UPLOAD_GC_INTERVAL", "3600")),
+    upload_gc_grace=float(os.getenv("UPLOAD_GC_GRACE", "86400")),
+    items_archive_interval=float(os.getenv("ITEMS_ARCHIVE_INTERVAL", "3600")),
+    items_archive_batch_size=int(os.getenv("ITEMS_ARCHIVE_BATCH_SIZE", "500")),
+    order_events_prune_interval=float(os.getenv("ORDER_EVENTS_PRUNE_INTERVAL", "3600")),
+    order_events_prune_batch_size=int(os.getenv("ORDER_EVENTS_PRUNE_BATCH_SIZE", "1000")),
+    static_accel_redirect=os.getenv("STATIC_ACCEL_REDIRECT") or None,
 )
 
-
-class DatabaseHandler:
-    def __init__(self, url: str):
-        self.url = url
-        self.engine = create_async_engine(
-            self.url,
-            echo=True,
-        )
-        self.sessionmaker = async_sessionmaker(
-            self.engine, autoflush=False, autocommit=False
-        )
-
-
-postgres_url = f"postgresql+asyncpg://{settings.db_user}:{settings.db_password}@{settings.db_host}:{settings.db_port}/{settings.db_name}"
-db = DatabaseHandler(postgres_url)
-
-
-async def init_tables(db_handler: DatabaseHandler):
-    """Initialize database tables"""
-    async with db_handler.engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
@@ -1,6 +1,26 @@
+from typing import AsyncIterator
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
 class DatabaseMarker:
     pass
 
 
 class SettingsMarker:
     pass
+
+
+async def get_session(
+    sessionmaker: async_sessionmaker = Depends(DatabaseMarker),
+) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия на время запроса: одно соединение из пула и одна транзакция.
+
+    Соединение берется из пула при первом запросе к БД. Транзакция фиксируется
+    после успешной обработки запроса и откатывается, если обработчик выбросил исключение.
+    """
+    async with sessionmaker() as session:
+        async with session.begin():
+            yield session
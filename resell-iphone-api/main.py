@@ -4,14 +4,21 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from sqlalchemy import text
 import uvicorn.logging
 from prometheus_fastapi_instrumentator import Instrumentator, metrics
 
 import api_v1
-from core.db.base import Base
-from database_handler import DatabaseHandler, settings, init_tables
+from database import db
+from database_handler import settings
+from core.db.migrations import apply_migrations
+from core.lookups import warm_lookups
+from core.imaging import image_processor
+from core.static import ImageStaticFiles
+from tasks.compact_statistics import run_periodically as compact_statistics_periodically
+from tasks.collect_uploads import run_periodically as collect_uploads_periodically
+from tasks.archive_items import run_periodically as archive_items_periodically
+from tasks.prune_order_events import run_periodically as prune_order_events_periodically
 from deps import DatabaseMarker, SettingsMarker
 from settings import Settings
 from api_v1.routers import images, items, categories, users, health, payments
@@ -21,35 +28,83 @@ logger = logging.getLogger("uvicorn.error")
 
 
 @asynccontextmanager
-async def lifespan(app: FastAPI):
+async def lifespan(root_app: FastAPI):
+    # Маршруты и их dependency_overrides принадлежат вложенному приложению /api,
+    # а lifespan вложенных приложений Starlette не запускает
+    app = root_app.state.api
     settings = app.dependency_overrides[SettingsMarker]()
 
-    postgres_url = f"postgresql+asyncpg://{settings.db_user}:{settings.db_password}@{settings.db_host}:{settings.db_port}/{settings.db_name}"
-    logger.info(f"Подключение к базе данных по URL: {postgres_url}")
-    db = DatabaseHandler(postgres_url)
+    logger.info(
+        f"Подключение к базе данных {settings.db_host}:{settings.db_port}/{settings.db_name} "
+        f"(pool_size={settings.db_pool_size}, max_overflow={settings.db_max_overflow})"
+    )
+    handler = db.connect(settings)
 
     # 🔍 Проверка подключения
     try:
-        async with db.engine.connect() as conn:
+        async with handler.engine.connect() as conn:
             await conn.execute(text("SELECT 1"))
             logger.info("✅ Успешное подключение к базе данных")
     except Exception as e:
         logger.error(f"❌ Ошибка подключения к базе данных: {e}")
+        await db.close()
+        raise
+
+    try:
+        await apply_migrations(handler.engine)
+    except Exception as e:
+        logger.error(f"❌ Ошибка применения миграций: {e}")
+        await db.close()
         raise
 
-    await init_tables(db)  # ← Не забудь передать db
     app.dependency_overrides.update({
-        DatabaseMarker: lambda: db.sessionmaker,
+        DatabaseMarker: lambda: handler.sessionmaker,
     })
 
+    # Справочники категорий и ролей держим в памяти
+    async with handler.sessionmaker() as session:
+        await warm_lookups(session)
+
+    # Производные изображений строятся в отдельных процессах
+    image_processor.start(settings.image_workers)
+
+    background_tasks = [
+        asyncio.create_task(
+            compact_statistics_periodically(handler.engine, settings.stats_compaction_interval)
+        ),
+        asyncio.create_task(
+            collect_uploads_periodically(
+                handler.engine, settings.upload_gc_interval, settings.upload_gc_grace
+            )
+        ),
+        asyncio.create_task(
+            archive_items_periodically(
+                handler.engine, settings.items_archive_interval, settings.items_archive_batch_size
+            )
+        ),
+        asyncio.create_task(
+            prune_order_events_periodically(
+                handler.engine,
+                settings.order_events_prune_interval,
+                settings.order_events_prune_batch_size,
+            )
+        ),
+    ]
+
     yield
 
-    await db.engine.dispose()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    image_processor.close()
+    await db.close()
 
 
 def register_app(settings: Settings) -> FastAPI:
-    root_app = FastAPI()
-    app = FastAPI(lifespan=lifespan)
+    root_app = FastAPI(lifespan=lifespan)
+    app = FastAPI()
+    app.dependency_overrides[SettingsMarker] = lambda: settings
+    root_app.state.api = app
     
     # Инициализация Prometheus метрик
     instrumentator = Instrumentator()
@@ -77,7 +132,11 @@ def register_app(settings: Settings) -> FastAPI:
     )
 
     root_app.mount("/api", app)
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+    app.mount(
+        "/static",
+        ImageStaticFiles(directory="static", accel_redirect_prefix=settings.static_accel_redirect),
+        name="static",
+    )
 
     return root_app
 
@@ -0,0 +1,72 @@
+-- Базовая схема: совпадает с моделями core/db/tables.py на момент перехода
+-- на версионные миграции. IF NOT EXISTS позволяет применить ее к базе,
+-- созданной раньше через Base.metadata.create_all.
+
+CREATE TABLE IF NOT EXISTS roles (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT now(),
+    updated_at TIMESTAMP DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    telegram_id BIGINT UNIQUE,
+    username TEXT,
+    name TEXT NOT NULL,
+    contact TEXT,
+    role_id INTEGER NOT NULL REFERENCES roles(id),
+    created_at TIMESTAMP DEFAULT now(),
+    updated_at TIMESTAMP DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT now(),
+    updated_at TIMESTAMP DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS items (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    image TEXT NOT NULL,
+    date TIMESTAMP NOT NULL,
+    price FLOAT NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    contact TEXT NOT NULL,
+    description TEXT NOT NULL,
+    user_id BIGINT NOT NULL REFERENCES users(id),
+    currency TEXT NOT NULL,
+    is_sold BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS item_vectors (
+    id SERIAL PRIMARY KEY,
+    product_id INTEGER NOT NULL REFERENCES items(id),
+    vector TSVECTOR NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS images (
+    id SERIAL PRIMARY KEY,
+    item_id INTEGER NOT NULL REFERENCES items(id),
+    file_path TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id SERIAL PRIMARY KEY,
+    buyer_id BIGINT NOT NULL REFERENCES users(id),
+    seller_id BIGINT NOT NULL REFERENCES users(id),
+    item_id INTEGER NOT NULL REFERENCES items(id),
+    buyer_telegram_id BIGINT NOT NULL,
+    seller_telegram_id BIGINT NOT NULL,
+    buyer_phone TEXT NOT NULL,
+    seller_phone TEXT NOT NULL,
+    delivery_address TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total FLOAT NOT NULL,
+    created_at TIMESTAMP DEFAULT now(),
+    updated_at TIMESTAMP DEFAULT now()
+);
@@ -0,0 +1,56 @@
+-- migrate: no-transaction
+-- Индексы под запросы api_v1/services/items.py, orders.py и statistics.py.
+-- Строятся CONCURRENTLY, чтобы не блокировать запись в таблицы на рабочей базе.
+
+-- Ленты товаров: сортировка по (date, id) и keyset-курсор по той же паре
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_date_id
+    ON items (date DESC, id DESC);
+
+-- Непроданные товары (/items/unsold) — основная лента бота
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_unsold_date_id
+    ON items (date DESC, id DESC) WHERE NOT is_sold;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_category_date_id
+    ON items (category_id, date DESC, id DESC);
+
+-- Товары пользователя; также покрывает count(DISTINCT user_id) в статистике
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_user_date_id
+    ON items (user_id, date DESC, id DESC);
+
+-- Сортировка по цене (filter_type=price)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_price_id
+    ON items (price, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_unsold_price_id
+    ON items (price, id) WHERE NOT is_sold;
+
+-- Полнотекстовый поиск
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_item_vectors_product_id
+    ON item_vectors (product_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_item_vectors_vector
+    ON item_vectors USING GIN (vector);
+
+-- Заказы пользователя как покупателя и как продавца
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_buyer_created_at
+    ON orders (buyer_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_seller_created_at
+    ON orders (seller_id, created_at DESC, id DESC);
+
+-- Статистика за год/месяц: диапазон по created_at с суммой total без чтения таблицы
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_created_at
+    ON orders (created_at) INCLUDE (total);
+
+-- Внешние ключи, по которым ищут или удаляют дочерние строки
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_item_id
+    ON orders (item_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_images_item_id
+    ON images (item_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_role_id
+    ON users (role_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_categories_name
+    ON categories (name);
@@ -0,0 +1,26 @@
+-- Поисковый документ хранится в самой таблице items вместо отдельной item_vectors.
+-- Колонка добавляется без значения по умолчанию, поэтому таблица не перезаписывается;
+-- существующие строки заполняет миграция 0013, она же удаляет item_vectors.
+
+ALTER TABLE items ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+
+-- Тот же конфиг 'russian', что и в plainto_tsquery при поиске
+CREATE OR REPLACE FUNCTION items_search_document(name TEXT, description TEXT)
+RETURNS TSVECTOR AS $$
+    SELECT setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(description, '')), 'B');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION items_search_vector_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector := items_search_document(NEW.name, NEW.description);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS items_search_vector_trigger ON items;
+CREATE TRIGGER items_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON items
+    FOR EACH ROW
+    EXECUTE FUNCTION items_search_vector_update();
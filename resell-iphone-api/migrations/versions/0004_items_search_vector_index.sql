@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_search_vector
+    ON items USING GIN (search_vector);
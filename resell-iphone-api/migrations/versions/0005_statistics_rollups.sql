@@ -0,0 +1,115 @@
+-- Агрегаты для GET /statistics, поддерживаемые триггерами.
+-- Триггеры только добавляют строки-дельты (без блокировок общих строк при
+-- параллельной записи), а tasks.compact_statistics периодически сворачивает
+-- дельты в одну строку на ключ. Читатели всегда суммируют все строки ключа.
+
+CREATE TABLE IF NOT EXISTS order_daily_stats (
+    id BIGSERIAL PRIMARY KEY,
+    day DATE NOT NULL,
+    orders_count BIGINT NOT NULL DEFAULT 0,
+    revenue DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_order_daily_stats_day ON order_daily_stats (day);
+
+CREATE TABLE IF NOT EXISTS user_activity (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    items_count BIGINT NOT NULL DEFAULT 0,
+    orders_count BIGINT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_user_activity_user_id ON user_activity (user_id);
+
+CREATE TABLE IF NOT EXISTS role_user_stats (
+    id BIGSERIAL PRIMARY KEY,
+    role_id INTEGER NOT NULL,
+    users_count BIGINT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_role_user_stats_role_id ON role_user_stats (role_id);
+
+-- Заказы: количество и выручка по дням, активность покупателей
+CREATE OR REPLACE FUNCTION orders_stats_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO order_daily_stats (day, orders_count, revenue)
+        VALUES (coalesce(OLD.created_at, 'epoch')::date, -1, -OLD.total);
+        INSERT INTO user_activity (user_id, orders_count) VALUES (OLD.buyer_id, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO order_daily_stats (day, orders_count, revenue)
+        VALUES (coalesce(NEW.created_at, 'epoch')::date, 1, NEW.total);
+        INSERT INTO user_activity (user_id, orders_count) VALUES (NEW.buyer_id, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS orders_stats_trigger ON orders;
+CREATE TRIGGER orders_stats_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF created_at, total, buyer_id ON orders
+    FOR EACH ROW
+    EXECUTE FUNCTION orders_stats_update();
+
+-- Товары: активность продавцов
+CREATE OR REPLACE FUNCTION items_stats_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO user_activity (user_id, items_count) VALUES (OLD.user_id, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO user_activity (user_id, items_count) VALUES (NEW.user_id, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS items_stats_trigger ON items;
+CREATE TRIGGER items_stats_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF user_id ON items
+    FOR EACH ROW
+    EXECUTE FUNCTION items_stats_update();
+
+-- Пользователи: количество по ролям
+CREATE OR REPLACE FUNCTION users_stats_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO role_user_stats (role_id, users_count) VALUES (OLD.role_id, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO role_user_stats (role_id, users_count) VALUES (NEW.role_id, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_stats_trigger ON users;
+CREATE TRIGGER users_stats_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF role_id ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION users_stats_update();
+
+-- Начальное заполнение. CREATE TRIGGER выше держит блокировку таблиц до конца
+-- транзакции, поэтому между снимком и включением триггеров записи не теряются.
+DELETE FROM order_daily_stats;
+INSERT INTO order_daily_stats (day, orders_count, revenue)
+SELECT coalesce(created_at, 'epoch')::date AS day, count(*), sum(total)
+FROM orders
+GROUP BY day;
+
+DELETE FROM user_activity;
+INSERT INTO user_activity (user_id, items_count, orders_count)
+SELECT user_id, sum(items_count), sum(orders_count)
+FROM (
+    SELECT user_id, count(*) AS items_count, 0 AS orders_count FROM items GROUP BY user_id
+    UNION ALL
+    SELECT buyer_id, 0, count(*) FROM orders GROUP BY buyer_id
+) activity
+GROUP BY user_id;
+
+DELETE FROM role_user_stats;
+INSERT INTO role_user_stats (role_id, users_count)
+SELECT role_id, count(*)
+FROM users
+GROUP BY role_id;
@@ -0,0 +1,5 @@
+-- Пути к производным изображениям (core.imaging):
+-- {"thumb": {"jpeg": "...", "webp": "..."}, "card": {...}, "full": {...}}.
+-- У изображений, загруженных раньше, колонка остается NULL и отдается оригинал.
+
+ALTER TABLE images ADD COLUMN IF NOT EXISTS variants JSONB;
@@ -0,0 +1,6 @@
+-- Файлы изображений хранятся по SHA-256 содержимого (core.uploads.blob_path),
+-- одинаковые загрузки ссылаются на один файл. Число записей с тем же content_hash
+-- служит счетчиком ссылок. Для старых файлов хэш заполняет
+-- python -m tasks.migrate_uploads.
+
+ALTER TABLE images ADD COLUMN IF NOT EXISTS content_hash TEXT;
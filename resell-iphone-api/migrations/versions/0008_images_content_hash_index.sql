@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_images_content_hash
+    ON images (content_hash);
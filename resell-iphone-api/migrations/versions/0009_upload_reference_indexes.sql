@@ -0,0 +1,8 @@
+-- migrate: no-transaction
+
+-- Поиск ссылок на файл по пути для tasks.collect_uploads
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_images_file_path
+    ON images (file_path);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_image
+    ON items (image);
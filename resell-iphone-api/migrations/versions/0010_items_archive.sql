@@ -0,0 +1,54 @@
+-- Архив объявлений: tasks.archive_items переносит сюда объявления старше
+-- LISTING_TTL_DAYS, на которые нет открытых заказов, и в items остается
+-- только рабочий набор.
+
+CREATE TABLE IF NOT EXISTS items_archive (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    image TEXT NOT NULL,
+    date TIMESTAMP NOT NULL,
+    price FLOAT NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    contact TEXT NOT NULL,
+    description TEXT NOT NULL,
+    user_id BIGINT NOT NULL REFERENCES users(id),
+    currency TEXT NOT NULL,
+    is_sold BOOLEAN NOT NULL,
+    archived_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_items_archive_user_date
+    ON items_archive (user_id, date DESC);
+
+-- Заказы и изображения ссылаются на товар и после переноса в архив,
+-- поэтому внешние ключи на items больше не подходят
+ALTER TABLE orders DROP CONSTRAINT IF EXISTS orders_item_id_fkey;
+ALTER TABLE images DROP CONSTRAINT IF EXISTS images_item_id_fkey;
+
+-- Перенос в архив удаляет строки из items, но не меняет активность продавцов:
+-- задача архивации выставляет resale.archiving = 'on' на время своей транзакции
+CREATE OR REPLACE FUNCTION items_stats_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('resale.archiving', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO user_activity (user_id, items_count) VALUES (OLD.user_id, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO user_activity (user_id, items_count) VALUES (NEW.user_id, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Все объявления, действующие и архивные: для истории заказов и отчетов
+CREATE OR REPLACE VIEW items_history AS
+    SELECT id, name, image, date, price, category_id, contact, description,
+           user_id, currency, is_sold, NULL::TIMESTAMP AS archived_at
+    FROM items
+    UNION ALL
+    SELECT id, name, image, date, price, category_id, contact, description,
+           user_id, currency, is_sold, archived_at
+    FROM items_archive;
@@ -0,0 +1,38 @@
+-- Журнал смен статуса заказов для GET /orders/events (transactional outbox).
+-- Строку добавляет триггер в той же транзакции, что и изменение заказа: при
+-- откате события нет, после коммита оно гарантированно видно читателям.
+-- Хранятся ORDER_EVENTS_RETENTION_DAYS дней, затем их удаляет tasks.prune_order_events.
+--
+-- txid — транзакция, записавшая событие. Читатель отдает только события с
+-- txid меньше xmin своего снимка, то есть транзакции которых уже завершены,
+-- и движется по (txid, id). Так событие, чей id выдан раньше, а коммит
+-- случился позже, не будет пропущено курсором.
+
+CREATE TABLE IF NOT EXISTS order_events (
+    id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    previous_status TEXT,
+    txid BIGINT NOT NULL DEFAULT txid_current(),
+    created_at TIMESTAMP NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_order_events_txid_id ON order_events (txid, id);
+
+CREATE OR REPLACE FUNCTION orders_events_record()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO order_events (order_id, status) VALUES (NEW.id, NEW.status);
+    ELSIF NEW.status IS DISTINCT FROM OLD.status THEN
+        INSERT INTO order_events (order_id, status, previous_status)
+        VALUES (NEW.id, NEW.status, OLD.status);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS orders_events_trigger ON orders;
+CREATE TRIGGER orders_events_trigger
+    AFTER INSERT OR UPDATE OF status ON orders
+    FOR EACH ROW
+    EXECUTE FUNCTION orders_events_record();
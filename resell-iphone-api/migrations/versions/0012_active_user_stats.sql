@@ -0,0 +1,89 @@
+-- Число активных продавцов и покупателей для GET /statistics без просмотра
+-- всех пользователей. user_activity становится одной строкой на пользователя,
+-- которую триггеры обновляют через user_activity_add: он видит итог до и после
+-- изменения и, когда итог пересекает ноль, добавляет строку-дельту в
+-- active_user_stats. Дельты сворачивает tasks.compact_statistics, читатели
+-- суммируют все строки.
+
+-- Пока функции и данные меняются, записи в orders и items ждут
+LOCK TABLE orders, items, user_activity IN SHARE ROW EXCLUSIVE MODE;
+
+WITH moved AS (
+    DELETE FROM user_activity
+    RETURNING user_id, items_count, orders_count
+)
+INSERT INTO user_activity (user_id, items_count, orders_count)
+SELECT user_id, sum(items_count), sum(orders_count) FROM moved GROUP BY user_id;
+
+DROP INDEX IF EXISTS idx_user_activity_user_id;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_activity_user_id ON user_activity (user_id);
+
+CREATE TABLE IF NOT EXISTS active_user_stats (
+    id BIGSERIAL PRIMARY KEY,
+    sellers_count BIGINT NOT NULL DEFAULT 0,
+    buyers_count BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION user_activity_add(p_user_id BIGINT, p_items BIGINT, p_orders BIGINT)
+RETURNS VOID AS $$
+DECLARE
+    new_items BIGINT;
+    new_orders BIGINT;
+    sellers_delta INTEGER;
+    buyers_delta INTEGER;
+BEGIN
+    INSERT INTO user_activity AS a (user_id, items_count, orders_count)
+    VALUES (p_user_id, p_items, p_orders)
+    ON CONFLICT (user_id) DO UPDATE
+        SET items_count = a.items_count + excluded.items_count,
+            orders_count = a.orders_count + excluded.orders_count
+    RETURNING a.items_count, a.orders_count INTO new_items, new_orders;
+
+    sellers_delta := (new_items > 0)::INTEGER - (new_items - p_items > 0)::INTEGER;
+    buyers_delta := (new_orders > 0)::INTEGER - (new_orders - p_orders > 0)::INTEGER;
+    IF sellers_delta <> 0 OR buyers_delta <> 0 THEN
+        INSERT INTO active_user_stats (sellers_count, buyers_count)
+        VALUES (sellers_delta, buyers_delta);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION orders_stats_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO order_daily_stats (day, orders_count, revenue)
+        VALUES (coalesce(OLD.created_at, 'epoch')::date, -1, -OLD.total);
+        PERFORM user_activity_add(OLD.buyer_id, 0, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO order_daily_stats (day, orders_count, revenue)
+        VALUES (coalesce(NEW.created_at, 'epoch')::date, 1, NEW.total);
+        PERFORM user_activity_add(NEW.buyer_id, 0, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Как и в 0010: перенос в архив не меняет активность продавцов
+CREATE OR REPLACE FUNCTION items_stats_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('resale.archiving', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM user_activity_add(OLD.user_id, -1, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM user_activity_add(NEW.user_id, 1, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Начальное заполнение по уже свернутой user_activity
+DELETE FROM active_user_stats;
+INSERT INTO active_user_stats (sellers_count, buyers_count)
+SELECT count(*) FILTER (WHERE items_count > 0), count(*) FILTER (WHERE orders_count > 0)
+FROM user_activity;
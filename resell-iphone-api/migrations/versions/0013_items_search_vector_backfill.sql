@@ -0,0 +1,10 @@
+-- Заполняет items.search_vector для строк, созданных до триггера из 0003:
+-- без этого они не находятся поиском. В items только действующие объявления
+-- (не старше LISTING_TTL_DAYS), поэтому хватает одного оператора; для большой
+-- таблицы то же самое пачками делает python -m tasks.backfill_search_vector.
+UPDATE items
+SET search_vector = items_search_document(name, description)
+WHERE search_vector IS NULL;
+
+-- Прежнее хранилище поисковых векторов больше не нужно
+DROP TABLE IF EXISTS item_vectors;
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 
 @dataclass
@@ -13,3 +13,38 @@ class Settings:
     cors_allowed_methods: List[str]
     cors_allowed_headers: List[str]
     pagination_limit: int
+
+    # Connection pool settings
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800
+    db_statement_cache_size: int = 100
+    db_echo: bool = False
+
+    # Периодичность сжатия агрегатов статистики, секунд
+    stats_compaction_interval: float = 300.0
+
+    # Число процессов для построения производных изображений
+    image_workers: int = 2
+
+    # Очистка файлов без ссылок в БД: периодичность и минимальный возраст файла, секунд
+    upload_gc_interval: float = 3600.0
+    upload_gc_grace: float = 86400.0
+
+    # Архивация просроченных объявлений: периодичность, секунд, и размер пачки
+    items_archive_interval: float = 3600.0
+    items_archive_batch_size: int = 500
+
+    # Очистка журнала событий заказов: периодичность, секунд, и размер пачки
+    order_events_prune_interval: float = 3600.0
+    order_events_prune_batch_size: int = 1000
+
+    # Префикс internal location фронтового прокси: если задан, файлы /static
+    # отдает прокси по заголовку X-Accel-Redirect
+    static_accel_redirect: Optional[str] = None
+
+    @property
+    def database_url(self) -> str:
+        return f"postgresql+asyncpg://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
@@ -0,0 +1,112 @@
+"""
+Переносит просроченные объявления из items в items_archive.
+
+Запуск: python -m tasks.archive_items [--batch-size 500] [--pause 0.1]
+
+Та же задача периодически выполняется API (ITEMS_ARCHIVE_INTERVAL секунд).
+Переносятся объявления старше LISTING_TTL_DAYS, на которые нет открытых
+заказов. Каждая пачка — одна короткая транзакция: строки удаляются из items
+и вставляются в архив одним оператором, уже заблокированные строки пропускаются.
+Агрегаты статистики при переносе не меняются (см. resale.archiving
+в migrations/versions/0010_items_archive.sql).
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings as app_settings
+from core.db import DatabaseHandler
+from core.metrics import ITEMS_ARCHIVED
+from database_handler import settings
+
+logger = logging.getLogger(__name__)
+
+# Заказы в этих статусах еще не завершены, их товары остаются в items
+OPEN_ORDER_STATUSES = ("CREATED",)
+
+ARCHIVE_BATCH = text("""
+    WITH moved AS (
+        DELETE FROM items
+        WHERE id IN (
+            SELECT i.id FROM items i
+            WHERE i.date < now() - make_interval(days => :ttl_days)
+              AND NOT EXISTS (
+                  SELECT 1 FROM orders o
+                  WHERE o.item_id = i.id AND o.status = ANY(:open_statuses)
+              )
+            ORDER BY i.date
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, name, image, date, price, category_id, contact,
+                  description, user_id, currency, is_sold
+    )
+    INSERT INTO items_archive (id, name, image, date, price, category_id, contact,
+                               description, user_id, currency, is_sold)
+    SELECT id, name, image, date, price, category_id, contact,
+           description, user_id, currency, is_sold
+    FROM moved
+""")
+
+
+async def archive_items(
+    engine: AsyncEngine,
+    batch_size: int,
+    ttl_days: int = app_settings.listing_ttl_days,
+    pause: float = 0.0,
+) -> int:
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            await conn.execute(text("SET LOCAL resale.archiving = 'on'"))
+            result = await conn.execute(ARCHIVE_BATCH, {
+                "ttl_days": ttl_days,
+                "open_statuses": list(OPEN_ORDER_STATUSES),
+                "batch_size": batch_size,
+            })
+        moved = result.rowcount
+        total += moved
+        ITEMS_ARCHIVED.inc(moved)
+        if moved < batch_size:
+            break
+        logger.info(f"Перенесено в архив {total} объявлений")
+        if pause:
+            await asyncio.sleep(pause)
+    if total:
+        logger.info(f"Архивация завершена, перенесено объявлений: {total}")
+    return total
+
+
+async def run_periodically(engine: AsyncEngine, interval: float, batch_size: int) -> None:
+    """Фоновая задача для lifespan: переносит просроченные объявления каждые interval секунд."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Пауза между пачками оставляет место обычным запросам
+            await archive_items(engine, batch_size, pause=0.1)
+        except Exception as e:
+            logger.error(f"Ошибка архивации объявлений: {e}")
+
+
+async def main(batch_size: int, pause: float) -> None:
+    handler = DatabaseHandler(settings)
+    try:
+        await archive_items(handler.engine, batch_size, pause=pause)
+    finally:
+        await handler.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.items_archive_batch_size,
+        help="Объявлений в одной транзакции",
+    )
+    parser.add_argument("--pause", type=float, default=0.1, help="Пауза между пачками, секунд")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size, args.pause))
@@ -0,0 +1,70 @@
+"""
+Заполняет items.search_vector для строк, созданных до появления триггера.
+
+Запуск: python -m tasks.backfill_search_vector [--batch-size 1000] [--pause 0.1]
+
+Строки обновляются пачками по id, каждая пачка в своей короткой транзакции,
+поэтому задачу можно запускать на рабочей базе и прерывать в любой момент.
+Миграция 0013 заполняет оставшиеся строки одним оператором; на большой
+таблице задачу стоит запустить до нее, чтобы миграция почти ничего не меняла.
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from core.db import DatabaseHandler
+from database_handler import settings
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH = text("""
+    UPDATE items
+    SET search_vector = items_search_document(name, description)
+    WHERE id IN (
+        SELECT id FROM items
+        WHERE id > :last_id AND search_vector IS NULL
+        ORDER BY id
+        LIMIT :batch_size
+    )
+    RETURNING id
+""")
+
+
+async def backfill(handler: DatabaseHandler, batch_size: int, pause: float) -> int:
+    last_id = 0
+    total = 0
+    while True:
+        async with handler.engine.begin() as conn:
+            result = await conn.execute(
+                BACKFILL_BATCH, {"last_id": last_id, "batch_size": batch_size}
+            )
+            ids = [row[0] for row in result]
+        if not ids:
+            break
+        last_id = max(ids)
+        total += len(ids)
+        logger.info(f"Обновлено {total} товаров (последний id {last_id})")
+        if pause:
+            await asyncio.sleep(pause)
+    return total
+
+
+async def main(batch_size: int, pause: float) -> None:
+    handler = DatabaseHandler(settings)
+    try:
+        total = await backfill(handler, batch_size, pause)
+        logger.info(f"Готово, заполнено search_vector: {total}")
+    finally:
+        await handler.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000, help="Строк в одной транзакции")
+    parser.add_argument("--pause", type=float, default=0.1, help="Пауза между пачками, секунд")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size, args.pause))
@@ -0,0 +1,202 @@
+"""
+Удаляет файлы изображений, на которые не ссылаются таблицы images, items и items_archive.
+
+Запуск: python -m tasks.collect_uploads [--dry-run] [--grace 86400] [--batch-size 500]
+
+Та же задача периодически выполняется API (UPLOAD_GC_INTERVAL секунд).
+Обходятся static/uploads (оригиналы, производные, недописанные .part-файлы)
+и копии фото, которые бот сохраняет в static/. Пути сверяются с базой пачками.
+Удаляются только файлы старше grace секунд: загрузка записывает файл до коммита
+записи о нем, а бот держит свою копию, пока пользователь заполняет объявление.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.db import DatabaseHandler
+from core.imaging import DERIVED_DIR
+from core.metrics import UPLOAD_GC_ORPHAN_BYTES, UPLOAD_GC_RECLAIMED_BYTES, UPLOAD_GC_REMOVED_FILES
+from core.uploads import UPLOAD_DIR
+from database_handler import settings
+
+logger = logging.getLogger(__name__)
+
+# Каталог, куда бот скачивает фото перед отправкой в API
+BOT_STATIC_DIR = "static"
+
+_BOT_COPY_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.jpg$")
+_DERIVED_RE = re.compile(r"^([0-9a-f]{64})_\w+\.\w+$")
+
+REFERENCED_PATHS = text("""
+    SELECT file_path FROM images WHERE file_path = ANY(:paths)
+    UNION
+    SELECT image FROM items WHERE image = ANY(:paths)
+    UNION
+    SELECT image FROM items_archive WHERE image = ANY(:paths)
+""")
+
+REFERENCED_HASHES = text("""
+    SELECT DISTINCT content_hash FROM images WHERE content_hash = ANY(:hashes)
+""")
+
+
+@dataclass
+class Candidate:
+    path: str
+    size: int
+    # Для производных — хэш оригинала; они живы, пока жива любая запись с этим хэшем
+    content_hash: Optional[str] = None
+    # Недописанный временный файл: ссылок на него не бывает
+    temporary: bool = False
+
+
+@dataclass
+class SweepResult:
+    scanned: int = 0
+    orphaned: int = 0
+    orphaned_bytes: int = 0
+    removed: int = 0
+    reclaimed_bytes: int = 0
+
+
+def _scan(cutoff: float) -> Iterator[Candidate]:
+    """Файлы старше cutoff, которые могут оказаться ненужными."""
+    derived_root = os.path.normpath(DERIVED_DIR)
+    for directory, _, filenames in os.walk(UPLOAD_DIR):
+        in_derived = os.path.normpath(directory).startswith(derived_root)
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > cutoff:
+                continue
+            if filename.endswith(".part"):
+                yield Candidate(path, stat.st_size, temporary=True)
+            elif in_derived:
+                match = _DERIVED_RE.match(filename)
+                # Производные со старыми именами переносит tasks.migrate_uploads
+                if match:
+                    yield Candidate(path, stat.st_size, content_hash=match.group(1))
+            else:
+                yield Candidate(path, stat.st_size)
+
+    if not os.path.isdir(BOT_STATIC_DIR):
+        return
+    with os.scandir(BOT_STATIC_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file() or not _BOT_COPY_RE.match(entry.name):
+                continue
+            stat = entry.stat()
+            if stat.st_mtime <= cutoff:
+                yield Candidate(os.path.join(BOT_STATIC_DIR, entry.name), stat.st_size)
+
+
+def _remove(candidates: List[Candidate], cutoff: float) -> List[Candidate]:
+    removed = []
+    for candidate in candidates:
+        try:
+            # Файл могли загрузить повторно после сверки с базой (обновлен mtime)
+            if os.stat(candidate.path).st_mtime > cutoff:
+                continue
+            os.remove(candidate.path)
+        except FileNotFoundError:
+            continue
+        removed.append(candidate)
+    return removed
+
+
+async def _find_orphans(engine: AsyncEngine, batch: List[Candidate]) -> List[Candidate]:
+    paths = [c.path for c in batch if not c.temporary and c.content_hash is None]
+    hashes = list({c.content_hash for c in batch if c.content_hash})
+
+    referenced_paths, referenced_hashes = set(), set()
+    async with engine.connect() as conn:
+        if paths:
+            result = await conn.execute(REFERENCED_PATHS, {"paths": paths})
+            referenced_paths = set(result.scalars())
+        if hashes:
+            result = await conn.execute(REFERENCED_HASHES, {"hashes": hashes})
+            referenced_hashes = set(result.scalars())
+
+    return [
+        c for c in batch
+        if c.path not in referenced_paths and c.content_hash not in referenced_hashes
+    ]
+
+
+async def collect_uploads(
+    engine: AsyncEngine, grace: float, batch_size: int = 500, dry_run: bool = False
+) -> SweepResult:
+    cutoff = time.time() - grace
+    scanner = _scan(cutoff)
+    result = SweepResult()
+    while True:
+        batch = await asyncio.to_thread(list, itertools.islice(scanner, batch_size))
+        if not batch:
+            break
+        result.scanned += len(batch)
+
+        orphans = await _find_orphans(engine, batch)
+        result.orphaned += len(orphans)
+        result.orphaned_bytes += sum(c.size for c in orphans)
+        if dry_run:
+            for candidate in orphans:
+                logger.info(f"[dry-run] {candidate.path} ({candidate.size} байт)")
+            continue
+
+        removed = await asyncio.to_thread(_remove, orphans, cutoff)
+        reclaimed = sum(c.size for c in removed)
+        result.removed += len(removed)
+        result.reclaimed_bytes += reclaimed
+        UPLOAD_GC_REMOVED_FILES.inc(len(removed))
+        UPLOAD_GC_RECLAIMED_BYTES.inc(reclaimed)
+
+    UPLOAD_GC_ORPHAN_BYTES.set(result.orphaned_bytes - result.reclaimed_bytes)
+    logger.info(
+        f"Проверено файлов: {result.scanned}, без ссылок: {result.orphaned} "
+        f"({result.orphaned_bytes} байт), удалено: {result.removed} ({result.reclaimed_bytes} байт)"
+    )
+    return result
+
+
+async def run_periodically(engine: AsyncEngine, interval: float, grace: float) -> None:
+    """Фоновая задача для lifespan: удаляет ненужные файлы каждые interval секунд."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await collect_uploads(engine, grace)
+        except Exception as e:
+            logger.error(f"Ошибка очистки загруженных файлов: {e}")
+
+
+async def main(grace: float, batch_size: int, dry_run: bool) -> None:
+    handler = DatabaseHandler(settings)
+    try:
+        await collect_uploads(handler.engine, grace, batch_size, dry_run)
+    finally:
+        await handler.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--grace", type=float, default=settings.upload_gc_grace,
+        help="Не трогать файлы моложе указанного числа секунд",
+    )
+    parser.add_argument("--batch-size", type=int, default=500, help="Файлов в одной сверке с базой")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать, что будет удалено")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.grace, args.batch_size, args.dry_run))
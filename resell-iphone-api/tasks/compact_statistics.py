@@ -0,0 +1,89 @@
+"""
+Сворачивает строки-дельты агрегатов статистики в одну строку на ключ.
+
+Запуск: python -m tasks.compact_statistics
+
+Та же задача периодически выполняется API (STATS_COMPACTION_INTERVAL секунд).
+Каждая таблица обрабатывается одним оператором: удаленные строки сразу
+заменяются их суммой, поэтому параллельные читатели видят те же итоги.
+user_activity не сворачивается: в ней одна строка на пользователя
+(migrations/versions/0012_active_user_stats.sql).
+"""
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.db import DatabaseHandler
+from database_handler import settings
+
+logger = logging.getLogger(__name__)
+
+COMPACT_QUERIES = {
+    "order_daily_stats": text("""
+        WITH keys AS (
+            SELECT day FROM order_daily_stats GROUP BY day HAVING count(*) > 1
+        ),
+        moved AS (
+            DELETE FROM order_daily_stats s USING keys
+            WHERE s.day = keys.day
+            RETURNING s.day, s.orders_count, s.revenue
+        )
+        INSERT INTO order_daily_stats (day, orders_count, revenue)
+        SELECT day, sum(orders_count), sum(revenue) FROM moved GROUP BY day
+    """),
+    "role_user_stats": text("""
+        WITH keys AS (
+            SELECT role_id FROM role_user_stats GROUP BY role_id HAVING count(*) > 1
+        ),
+        moved AS (
+            DELETE FROM role_user_stats s USING keys
+            WHERE s.role_id = keys.role_id
+            RETURNING s.role_id, s.users_count
+        )
+        INSERT INTO role_user_stats (role_id, users_count)
+        SELECT role_id, sum(users_count) FROM moved GROUP BY role_id
+    """),
+    # Ключ один: сворачиваем, только если дельт больше одной строки
+    "active_user_stats": text("""
+        WITH moved AS (
+            DELETE FROM active_user_stats
+            WHERE EXISTS (SELECT 1 FROM active_user_stats OFFSET 1)
+            RETURNING sellers_count, buyers_count
+        )
+        INSERT INTO active_user_stats (sellers_count, buyers_count)
+        SELECT sum(sellers_count), sum(buyers_count) FROM moved HAVING count(*) > 0
+    """),
+}
+
+
+async def compact_statistics(engine: AsyncEngine) -> None:
+    for table, query in COMPACT_QUERIES.items():
+        async with engine.begin() as conn:
+            result = await conn.execute(query)
+        if result.rowcount:
+            logger.info(f"{table}: свернуто ключей {result.rowcount}")
+
+
+async def run_periodically(engine: AsyncEngine, interval: float) -> None:
+    """Фоновая задача для lifespan: сворачивает агрегаты каждые interval секунд."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await compact_statistics(engine)
+        except Exception as e:
+            logger.error(f"Ошибка сжатия агрегатов статистики: {e}")
+
+
+async def main() -> None:
+    handler = DatabaseHandler(settings)
+    try:
+        await compact_statistics(handler.engine)
+    finally:
+        await handler.close_connection()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
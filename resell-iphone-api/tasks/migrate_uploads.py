@@ -0,0 +1,170 @@
+"""
+Переносит изображения, загруженные до хранения по хэшу, в static/uploads/ab/cd/<sha256>.
+
+Запуск: python -m tasks.migrate_uploads [--batch-size 100] [--pause 0.1] [--grace 30]
+
+Записи images без content_hash обрабатываются пачками по id. Из файла удаляются
+метаданные (очищенная копия пишется рядом, исходный файл не меняется), результат
+хэшируется и связывается с путем по хэшу (жесткой ссылкой или копией),
+производные строятся заново, а images.file_path, items.image
+и items_archive.image обновляются в транзакции пачки. Одинаковые файлы
+сводятся к одному. Старые файлы удаляются через --grace секунд после коммита,
+когда закэшированные ленты с прежними путями устареют, поэтому задачу можно
+запускать на рабочей базе и прерывать в любой момент.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from config import settings as app_settings
+from core.db import DatabaseHandler
+from core.imaging import InvalidImage, Variants, render_variants, strip_metadata, variant_paths
+from core.uploads import UPLOAD_DIR, file_extension, remove_files, store_blob
+from database_handler import settings
+
+logger = logging.getLogger(__name__)
+
+SELECT_BATCH = text("""
+    SELECT id, file_path, variants FROM images
+    WHERE id > :last_id AND content_hash IS NULL
+    ORDER BY id
+    LIMIT :batch_size
+""")
+
+# По file_path, а не по id: старый файл могут разделять несколько записей
+UPDATE_IMAGES = text("""
+    UPDATE images
+    SET file_path = :new_path, content_hash = :content_hash, variants = :variants
+    WHERE file_path = :old_path AND content_hash IS NULL
+""").bindparams(bindparam("variants", type_=JSONB))
+
+UPDATE_ITEMS = text("UPDATE items SET image = :new_path WHERE image = :old_path")
+UPDATE_ARCHIVED_ITEMS = text("UPDATE items_archive SET image = :new_path WHERE image = :old_path")
+
+
+@dataclass
+class MovedFile:
+    old_path: str
+    new_path: str
+    content_hash: str
+    variants: Optional[Variants]
+    # Старые файлы, которые больше не нужны после коммита
+    obsolete: List[str] = field(default_factory=list)
+
+
+def migrate_file(file_path: str, variants: Optional[Variants]) -> Optional[MovedFile]:
+    """Переносит один файл с производными. Выполняется в пуле потоков."""
+    if not os.path.exists(file_path):
+        logger.warning(f"Файл {file_path} не найден, запись пропущена")
+        return None
+
+    try:
+        clean = strip_metadata(file_path, UPLOAD_DIR)
+    except InvalidImage as e:
+        logger.warning(f"Не удалось прочитать {file_path}: {e}")
+        clean = None
+    try:
+        stored = store_blob(clean or file_path, file_extension(file_path), move=clean is not None)
+    finally:
+        if clean is not None:
+            remove_files(clean)
+    new_path = stored.path
+    try:
+        new_variants = render_variants(new_path)
+    except InvalidImage as e:
+        logger.warning(f"Не удалось построить производные для {file_path}: {e}")
+        new_variants = None
+
+    kept = {new_path, *variant_paths(new_variants)}
+    return MovedFile(
+        old_path=file_path,
+        new_path=new_path,
+        content_hash=stored.content_hash,
+        variants=new_variants,
+        obsolete=[path for path in [file_path, *variant_paths(variants)] if path not in kept],
+    )
+
+
+async def _remove_expired(pending: Deque[Tuple[float, List[str]]], grace: float) -> None:
+    while pending and pending[0][0] + grace <= time.monotonic():
+        _, paths = pending.popleft()
+        await asyncio.to_thread(remove_files, *paths)
+
+
+async def migrate(handler: DatabaseHandler, batch_size: int, pause: float, grace: float) -> int:
+    last_id = 0
+    total = 0
+    pending: Deque[Tuple[float, List[str]]] = deque()
+    while True:
+        async with handler.engine.connect() as conn:
+            result = await conn.execute(
+                SELECT_BATCH, {"last_id": last_id, "batch_size": batch_size}
+            )
+            rows = result.all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        moved = []
+        for row in rows:
+            moved_file = await asyncio.to_thread(migrate_file, row.file_path, row.variants)
+            if moved_file:
+                moved.append(moved_file)
+
+        async with handler.engine.begin() as conn:
+            for moved_file in moved:
+                params = {
+                    "old_path": moved_file.old_path,
+                    "new_path": moved_file.new_path,
+                    "content_hash": moved_file.content_hash,
+                    "variants": moved_file.variants,
+                }
+                await conn.execute(UPDATE_IMAGES, params)
+                await conn.execute(UPDATE_ITEMS, params)
+                await conn.execute(UPDATE_ARCHIVED_ITEMS, params)
+
+        pending.append((time.monotonic(), [path for m in moved for path in m.obsolete]))
+        total += len(moved)
+        logger.info(f"Перенесено {total} изображений (последний id {last_id})")
+        await _remove_expired(pending, grace)
+        if pause:
+            await asyncio.sleep(pause)
+
+    if pending:
+        logger.info(f"Ожидаем {grace} с перед удалением старых файлов")
+        await asyncio.sleep(max(0.0, pending[-1][0] + grace - time.monotonic()))
+        await _remove_expired(pending, grace)
+    return total
+
+
+async def main(batch_size: int, pause: float, grace: float) -> None:
+    handler = DatabaseHandler(settings)
+    try:
+        total = await migrate(handler, batch_size, pause, grace)
+        logger.info(f"Готово, перенесено изображений: {total}")
+    finally:
+        await handler.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=100, help="Изображений в одной транзакции")
+    parser.add_argument("--pause", type=float, default=0.1, help="Пауза между пачками, секунд")
+    parser.add_argument(
+        "--grace",
+        type=float,
+        default=app_settings.listing_cache_ttl,
+        help="Через сколько секунд после коммита удалять старые файлы",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size, args.pause, args.grace))
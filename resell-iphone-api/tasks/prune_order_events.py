@@ -0,0 +1,86 @@
+"""
+Удаляет из журнала order_events события старше ORDER_EVENTS_RETENTION_DAYS.
+
+Запуск: python -m tasks.prune_order_events [--batch-size 1000] [--pause 0.1]
+
+Та же задача периодически выполняется API (ORDER_EVENTS_PRUNE_INTERVAL секунд).
+События удаляются пачками по id, каждая пачка — короткая транзакция. Старые
+события лежат в начале первичного ключа, поэтому отдельный индекс по created_at
+не нужен. Потребитель, чей курсор старше срока хранения, удаленные события не получит.
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings as app_settings
+from core.db import DatabaseHandler
+from database_handler import settings
+
+logger = logging.getLogger(__name__)
+
+PRUNE_BATCH = text("""
+    DELETE FROM order_events
+    WHERE id IN (
+        SELECT id FROM order_events
+        WHERE created_at < now() - make_interval(days => :retention_days)
+        ORDER BY id
+        LIMIT :batch_size
+    )
+""")
+
+
+async def prune_order_events(
+    engine: AsyncEngine,
+    batch_size: int,
+    retention_days: int = app_settings.order_events_retention_days,
+    pause: float = 0,
+) -> int:
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(PRUNE_BATCH, {
+                "retention_days": retention_days,
+                "batch_size": batch_size,
+            })
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            break
+        if pause:
+            await asyncio.sleep(pause)
+    if total:
+        logger.info(f"Удалено событий заказов: {total}")
+    return total
+
+
+async def run_periodically(engine: AsyncEngine, interval: float, batch_size: int) -> None:
+    """Фоновая задача для lifespan: удаляет старые события каждые interval секунд."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await prune_order_events(engine, batch_size, pause=0.1)
+        except Exception as e:
+            logger.error(f"Ошибка очистки журнала событий заказов: {e}")
+
+
+async def main(batch_size: int, pause: float) -> None:
+    handler = DatabaseHandler(settings)
+    try:
+        await prune_order_events(handler.engine, batch_size, pause=pause)
+    finally:
+        await handler.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.order_events_prune_batch_size,
+        help="Событий в одной транзакции",
+    )
+    parser.add_argument("--pause", type=float, default=0.1, help="Пауза между пачками, секунд")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size, args.pause))
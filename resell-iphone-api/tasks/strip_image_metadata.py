@@ -0,0 +1,153 @@
+"""
+Удаляет метаданные (EXIF с геопозицией, XMP, комментарии) из уже сохраненных оригиналов изображений.
+
+Запуск: python -m tasks.strip_image_metadata [--batch-size 100] [--pause 0.1]
+
+Новые загрузки очищаются до сохранения (core.uploads.store_image_upload),
+задача нужна для файлов, загруженных раньше. Оригиналы перебираются пачками
+по id записей images. Файл по хэшу раздается как неизменяемый, поэтому он не
+перезаписывается: очищенная копия сохраняется под своим хэшем, для нее строятся
+производные, а images.file_path, images.content_hash, images.variants,
+items.image и items_archive.image обновляются в одной транзакции. Старый файл
+с производными остается без ссылок и удаляется tasks.collect_uploads через
+UPLOAD_GC_GRACE, когда закэшированные ленты с прежними путями устареют.
+Файлы без метаданных не меняются, поэтому задачу можно прерывать и запускать повторно.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from contextlib import suppress
+from typing import List, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from core.db import DatabaseHandler
+from core.imaging import InvalidImage, Variants, render_variants, strip_metadata, variant_paths
+from core.uploads import UPLOAD_DIR, file_extension, remove_files, store_blob
+from database_handler import settings
+from tasks.migrate_uploads import UPDATE_ARCHIVED_ITEMS, UPDATE_ITEMS, MovedFile
+
+logger = logging.getLogger(__name__)
+
+SELECT_BATCH = text("""
+    SELECT id, file_path, variants FROM images
+    WHERE id > :last_id AND content_hash IS NOT NULL
+    ORDER BY id
+    LIMIT :batch_size
+""")
+
+# По file_path, а не по id: файл разделяют все записи с тем же содержимым
+UPDATE_IMAGES = text("""
+    UPDATE images
+    SET file_path = :new_path, content_hash = :content_hash, variants = :variants
+    WHERE file_path = :old_path
+""").bindparams(bindparam("variants", type_=JSONB))
+
+
+def strip_file(file_path: str, variants: Optional[Variants]) -> Optional[MovedFile]:
+    """
+    Сохраняет очищенную копию одного оригинала с производными.
+    Возвращает None, если очищать нечего. Выполняется в пуле потоков.
+    """
+    if not os.path.exists(file_path):
+        return None
+    try:
+        clean = strip_metadata(file_path, UPLOAD_DIR)
+    except InvalidImage as e:
+        logger.warning(f"Не удалось прочитать {file_path}: {e}")
+        return None
+    if clean is None:
+        return None
+    try:
+        stored = store_blob(clean, file_extension(file_path), move=True)
+    finally:
+        remove_files(clean)
+    try:
+        new_variants = render_variants(stored.path)
+    except InvalidImage as e:
+        logger.warning(f"Не удалось построить производные для {stored.path}: {e}")
+        new_variants = None
+    return MovedFile(
+        old_path=file_path,
+        new_path=stored.path,
+        content_hash=stored.content_hash,
+        variants=new_variants,
+        obsolete=[file_path, *variant_paths(variants)],
+    )
+
+
+def _touch(paths: List[str]) -> None:
+    """Отсчет UPLOAD_GC_GRACE для старых файлов начинается с момента, когда на них пропали ссылки."""
+    for path in paths:
+        with suppress(FileNotFoundError):
+            os.utime(path)
+
+
+async def strip_images(handler: DatabaseHandler, batch_size: int, pause: float) -> int:
+    last_id = 0
+    total = 0
+    # Одни и те же файлы разделяют несколько записей
+    seen = set()
+    while True:
+        async with handler.engine.connect() as conn:
+            result = await conn.execute(
+                SELECT_BATCH, {"last_id": last_id, "batch_size": batch_size}
+            )
+            rows = result.all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        moved = []
+        for row in rows:
+            if row.file_path in seen:
+                continue
+            seen.add(row.file_path)
+            moved_file = await asyncio.to_thread(strip_file, row.file_path, row.variants)
+            if moved_file:
+                seen.add(moved_file.new_path)
+                moved.append(moved_file)
+
+        if moved:
+            async with handler.engine.begin() as conn:
+                for moved_file in moved:
+                    params = {
+                        "old_path": moved_file.old_path,
+                        "new_path": moved_file.new_path,
+                        "content_hash": moved_file.content_hash,
+                        "variants": moved_file.variants,
+                    }
+                    await conn.execute(UPDATE_IMAGES, params)
+                    await conn.execute(UPDATE_ITEMS, params)
+                    await conn.execute(UPDATE_ARCHIVED_ITEMS, params)
+            kept = {path for m in moved for path in [m.new_path, *variant_paths(m.variants)]}
+            await asyncio.to_thread(
+                _touch, [path for m in moved for path in m.obsolete if path not in kept]
+            )
+
+        total += len(moved)
+        logger.info(f"Очищено {total} файлов (последний id {last_id})")
+        if pause:
+            await asyncio.sleep(pause)
+    return total
+
+
+async def main(batch_size: int, pause: float) -> None:
+    handler = DatabaseHandler(settings)
+    try:
+        total = await strip_images(handler, batch_size, pause)
+        logger.info(f"Готово, очищено файлов: {total}")
+    finally:
+        await handler.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=100, help="Записей images в одной пачке")
+    parser.add_argument("--pause", type=float, default=0.1, help="Пауза между пачками, секунд")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch_size, args.pause))
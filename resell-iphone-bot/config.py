@@ -7,6 +7,24 @@ load_dotenv()
 # API settings
 API_TOKEN = os.getenv("API_TOKEN")
 API_HOST = os.getenv("API_HOST", "http://localhost:8015")
+# Пул соединений и таймауты клиента API (секунды)
+API_POOL_LIMIT = int(os.getenv("API_POOL_LIMIT", "100"))
+API_POOL_LIMIT_PER_HOST = int(os.getenv("API_POOL_LIMIT_PER_HOST", "30"))
+API_KEEPALIVE_TIMEOUT = float(os.getenv("API_KEEPALIVE_TIMEOUT", "30"))
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "10"))
+API_UPLOAD_TIMEOUT = float(os.getenv("API_UPLOAD_TIMEOUT", "60"))
+# Передавать API путь к фото в общем каталоге static вместо самого файла
+# (бот и API должны видеть один и тот же static, как в docker-compose)
+IMAGE_HANDOFF = os.getenv("IMAGE_HANDOFF", "False").lower() == "true"
+# Кэш профилей пользователей (id, роль, контакт) по telegram_id
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+# SQLite-файл с file_id фото, уже отправленных в Telegram
+FILE_ID_CACHE_PATH = os.getenv("FILE_ID_CACHE_PATH", "data/file_ids.sqlite3")
+# Уведомления об оплате по журналу событий заказов API: файл с курсором
+# и сколько секунд один запрос ждет событий (не больше ORDER_EVENTS_MAX_WAIT в API)
+ORDER_EVENTS_CURSOR_PATH = os.getenv("ORDER_EVENTS_CURSOR_PATH", "data/order_events.cursor")
+ORDER_EVENTS_WAIT = float(os.getenv("ORDER_EVENTS_WAIT", "25"))
 
 # Bot settings
 BOT_TOKEN = os.getenv("BOT_TOKEN") or API_TOKEN  # Используем API_TOKEN как fallback
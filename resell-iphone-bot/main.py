@@ -2,7 +2,6 @@ import asyncio
 import os
 from dotenv import load_dotenv
 
-import aiohttp
 from aiogram import Bot, Dispatcher, types, Router
 from aiogram import filters
 from aiogram.fsm.context import FSMContext
@@ -19,7 +18,23 @@ from routers.item import router as item_router
 from routers.main import router as main_router
 from states import register
 from templates.main import contact_keyboard, main_menu
-from config import API_HOST, BOT_TOKEN
+from services.api import ApiClient, ApiError
+from services.media import file_ids
+from services.order_events import consume_order_events
+from config import (
+    API_HOST,
+    API_KEEPALIVE_TIMEOUT,
+    API_POOL_LIMIT,
+    API_POOL_LIMIT_PER_HOST,
+    API_TIMEOUT,
+    API_UPLOAD_TIMEOUT,
+    BOT_TOKEN,
+    FILE_ID_CACHE_PATH,
+    ORDER_EVENTS_CURSOR_PATH,
+    ORDER_EVENTS_WAIT,
+    PROFILE_CACHE_SIZE,
+    PROFILE_CACHE_TTL,
+)
 
 # Загрузка переменных окружения
 load_dotenv()
@@ -27,116 +42,102 @@ load_dotenv()
 router = Router()
 
 @router.message(filters.Command("start"))
-async def send_welcome(message: types.Message, state: FSMContext) -> None:
+async def send_welcome(message: types.Message, state: FSMContext, api: ApiClient) -> None:
     await state.set_state(None)
     await state.clear()
     
     # Проверяем существование пользователя
-    async with aiohttp.ClientSession() as session:
-        try:
-            # Проверяем существование пользователя
-            async with session.get(f"{API_HOST}/api/api/users/telegram/{message.from_user.id}/exists") as exists_response:
-                if exists_response.status == 200:
-                    exists = await exists_response.json()
-                    if exists:
-                        # Если пользователь существует, получаем его данные
-                        async with session.get(f"{API_HOST}/api/api/users/telegram/{message.from_user.id}/id") as id_response:
-                            if id_response.status == 200:
-                                user_id = await id_response.json()
-                                async with session.get(f"{API_HOST}/api/api/users/{user_id}") as user_response:
-                                    if user_response.status == 200:
-                                        user_data = await user_response.json()
-                                        role = user_data.get("role", {}).get("name", "buyer")
-                                        await message.answer(
-                                            text=f"Выберите нужный пункт меню 👇",
-                                            reply_markup=await main_menu(role=role),
-                                        )
-                                        return
-                    else:
-                        # Если пользователь не существует, запрашиваем контакт
-                        logger.info(f"User:{message.from_user.id} Command: /start - New user")
-                        await message.answer(
-                            "Чтобы отправить контакт, нажмите на кнопку ниже",
-                            reply_markup=await contact_keyboard(),
-                        )
-                        await state.set_state(register.Register.CONTACT)
-        except Exception as e:
-            logger.error(f"Error in send_welcome: {str(e)}")
-            await message.answer(
-                text="Ошибка при проверке данных пользователя. Пожалуйста, попробуйте позже.",
-                reply_markup=await contact_keyboard(),
-            )
-            await state.set_state(register.Register.CONTACT)
+    try:
+        profile = await api.get_profile(message.from_user.id)
+    except Exception as e:
+        logger.error(f"Error in send_welcome: {str(e)}")
+        await message.answer(
+            text="Ошибка при проверке данных пользователя. Пожалуйста, попробуйте позже.",
+            reply_markup=await contact_keyboard(),
+        )
+        await state.set_state(register.Register.CONTACT)
+        return
+
+    if profile:
+        await message.answer(
+            text=f"Выберите нужный пункт меню 👇",
+            reply_markup=await main_menu(role=profile.role),
+        )
+    else:
+        # Если пользователь не существует, запрашиваем контакт
+        logger.info(f"User:{message.from_user.id} Command: /start - New user")
+        await message.answer(
+            "Чтобы отправить контакт, нажмите на кнопку ниже",
+            reply_markup=await contact_keyboard(),
+        )
+        await state.set_state(register.Register.CONTACT)
 
 
 @router.message(register.Register.CONTACT)
 async def get_contact(
-    message: types.Message, bot: Bot, state: FSMContext
+    message: types.Message, bot: Bot, state: FSMContext, api: ApiClient
 ) -> None:
     if message.contact:
         logger.info(f"Processing contact for user {message.from_user.id}")
         # Сначала проверяем, существует ли пользователь
-        async with aiohttp.ClientSession() as session:
+        try:
+            logger.info(f"Checking if user exists: {message.from_user.id}")
             try:
-                logger.info(f"Checking if user exists: {message.from_user.id}")
-                async with session.get(f"{API_HOST}/api/api/users/telegram/{message.from_user.id}/exists") as exists_response:
-                    if exists_response.status == 200:
-                        exists = await exists_response.json()
-                        logger.info(f"User exists check result: {exists}")
-                        if exists:
-                            # Если пользователь существует, получаем его данные
-                            logger.info(f"Getting user data for existing user: {message.from_user.id}")
-                            async with session.get(f"{API_HOST}/api/api/users/telegram/{message.from_user.id}/id") as id_response:
-                                if id_response.status == 200:
-                                    user_id = await id_response.json()
-                                    async with session.get(f"{API_HOST}/api/api/users/{user_id}") as user_response:
-                                        if user_response.status == 200:
-                                            user_data = await user_response.json()
-                                            role = user_data.get("role", {}).get("name", "buyer")
-                                            await message.answer(
-                                                text=f"Выберите нужный пункт меню 👇",
-                                                reply_markup=await main_menu(role=role),
-                                            )
-                                            await state.set_state(None)
-                                            await state.clear()
-                                            return
-                        else:
-                            # Если пользователь не существует, создаем нового
-                            logger.info(f"Creating new user: {message.from_user.id}")
-                            user_data = {
-                                "telegram_id": message.from_user.id,
-                                "username": message.from_user.username or str(message.from_user.id),
-                                "name": f"{message.from_user.first_name} {message.from_user.last_name or ''}".strip() or str(message.from_user.id),
-                                "contact": message.contact.phone_number,
-                                "role_id": 1  # ID роли "buyer" (покупатель) - роль по умолчанию для новых пользователей
-                            }
-                            
-                            logger.info(f"Sending user data: {user_data}")
-                            async with session.post(f"{API_HOST}/api/api/users/", json=user_data) as response:
-                                response_text = await response.text()
-                                logger.info(f"Create user response status: {response.status}, text: {response_text}")
-                                
-                                # После создания пользователя показываем меню покупателя
-                                # Все новые пользователи по умолчанию становятся покупателями
-                                await message.answer(
-                                    text=f"Вы успешно зарегистрированы как покупатель! Выберите нужный пункт меню 👇",
-                                    reply_markup=await main_menu(role="buyer"),
-                                )
-                                await state.set_state(None)
-                                await state.clear()
-                    else:
-                        error_text = await exists_response.text()
-                        logger.error(f"Error checking user existence: {error_text}")
-                        await message.answer(
-                            text="Ошибка при проверке существования пользователя. Пожалуйста, попробуйте позже.",
-                            reply_markup=await contact_keyboard(),
-                        )
-            except Exception as e:
-                logger.error(f"Exception in get_contact: {str(e)}")
+                profile = await api.get_profile(message.from_user.id)
+            except ApiError as e:
+                logger.error(f"Error checking user existence: {e}")
+                await message.answer(
+                    text="Ошибка при проверке существования пользователя. Пожалуйста, попробуйте позже.",
+                    reply_markup=await contact_keyboard(),
+                )
+                return
+
+            if profile:
+                # Пользователь уже зарегистрирован
+                await message.answer(
+                    text=f"Выберите нужный пункт меню 👇",
+                    reply_markup=await main_menu(role=profile.role),
+                )
+                await state.set_state(None)
+                await state.clear()
+                return
+
+            # Если пользователь не существует, создаем нового
+            logger.info(f"Creating new user: {message.from_user.id}")
+            user_data = {
+                "telegram_id": message.from_user.id,
+                "username": message.from_user.username or str(message.from_user.id),
+                "name": f"{message.from_user.first_name} {message.from_user.last_name or ''}".strip() or str(message.from_user.id),
+                "contact": message.contact.phone_number,
+                "role_id": 1  # ID роли "buyer" (покупатель) - роль по умолчанию для новых пользователей
+            }
+            
+            logger.info(f"Sending user data: {user_data}")
+            try:
+                created = await api.create_user(user_data)
+                logger.info(f"Created user: {created}")
+            except ApiError as e:
+                logger.error(f"Error creating user: {e}")
                 await message.answer(
                     text="Ошибка при регистрации. Пожалуйста, попробуйте позже.",
                     reply_markup=await contact_keyboard(),
                 )
+                return
+            
+            # После создания пользователя показываем меню покупателя
+            # Все новые пользователи по умолчанию становятся покупателями
+            await message.answer(
+                text=f"Вы успешно зарегистрированы как покупатель! Выберите нужный пункт меню 👇",
+                reply_markup=await main_menu(role="buyer"),
+            )
+            await state.set_state(None)
+            await state.clear()
+        except Exception as e:
+            logger.error(f"Exception in get_contact: {str(e)}")
+            await message.answer(
+                text="Ошибка при регистрации. Пожалуйста, попробуйте позже.",
+                reply_markup=await contact_keyboard(),
+            )
     else:
         await message.answer(
             "Пожалуйста, отправьте контакт",
@@ -149,19 +150,42 @@ async def main() -> None:
     await logger.complete()
 
     bot = Bot(token=BOT_TOKEN)
-    dp = Dispatcher()
+    # Один клиент API на весь процесс: обработчики получают его аргументом api
+    api = ApiClient(
+        API_HOST,
+        limit=API_POOL_LIMIT,
+        limit_per_host=API_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=API_KEEPALIVE_TIMEOUT,
+        timeout=API_TIMEOUT,
+        upload_timeout=API_UPLOAD_TIMEOUT,
+        profile_cache_size=PROFILE_CACHE_SIZE,
+        profile_cache_ttl=PROFILE_CACHE_TTL,
+    )
+    await api.start()
+    # file_id уже отправленных фото: повторный показ карточки не загружает файл
+    file_ids.open(FILE_ID_CACHE_PATH)
+    dp = Dispatcher(api=api)
     
     # Регистрируем роутеры
     dp.include_router(router)  # Основной роутер с командами
     dp.include_router(item_router)  # Роутер для работы с объявлениями
     dp.include_router(main_router)  # Роутер для основного меню
 
+    # Уведомления покупателю и продавцу об оплате заказа
+    order_events_task = asyncio.create_task(
+        consume_order_events(bot, api, ORDER_EVENTS_CURSOR_PATH, wait=ORDER_EVENTS_WAIT)
+    )
+
     try:
         # Запускаем бота в режиме polling
         await dp.start_polling(bot)
     except Exception as e:
         logger.error(f"Error starting bot: {e}")
     finally:
+        order_events_task.cancel()
+        await asyncio.gather(order_events_task, return_exceptions=True)
+        await api.close()
+        file_ids.close()
         await bot.close()
 
 
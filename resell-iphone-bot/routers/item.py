@@ -1,4 +1,5 @@
 from uuid import uuid4
+import asyncio
 import os
 
 import aiohttp
@@ -19,13 +20,45 @@ from templates.item import (
     get_currency_buttons,
 )
 from templates.main import main_menu
-from config import API_HOST
+from config import IMAGE_HANDOFF
+from services.api import ApiClient, ApiError
+from services.media import file_ids, photo_key, send_photo
 
 router = Router()
 
 
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+async def attach_image(form_data: aiohttp.FormData, image_path: str) -> None:
+    """
+    Добавляет фото объявления в форму запроса к API.
+
+    В режиме IMAGE_HANDOFF передается только путь в общем с API каталоге
+    static: API забирает файл сам, содержимое по сети не передается.
+    Иначе файл читается вне event loop и отправляется в форме.
+    """
+    if IMAGE_HANDOFF:
+        form_data.add_field("image_path", image_path)
+        return
+    content = await asyncio.to_thread(_read_file, image_path)
+    form_data.add_field(
+        "image",
+        content,
+        filename=os.path.basename(image_path),
+        content_type="image/jpeg",
+    )
+
+
+def is_new_photo(image_path: str) -> bool:
+    """Фото, загруженное в этом диалоге: бот сохраняет его прямо в static/, а не в static/uploads."""
+    return os.path.dirname(os.path.normpath(image_path)) == "static"
+
+
 @router.callback_query(Add.MAIN)
-async def process_callback(callback_query: CallbackQuery, state: FSMContext):
+async def process_callback(callback_query: CallbackQuery, state: FSMContext, api: ApiClient):
     names = {
         "item_name": "Название",
         "item_price": "Цена",
@@ -63,7 +96,7 @@ async def process_callback(callback_query: CallbackQuery, state: FSMContext):
         if callback_query.data == "item_category":
             await callback_query.message.edit_caption(
                 caption=f"Выберите категорию",
-                reply_markup=await get_categories_buttons(),
+                reply_markup=await get_categories_buttons(api),
             )
         elif callback_query.data == "item_contact":
             await callback_query.message.edit_caption(
@@ -94,21 +127,17 @@ async def process_callback(callback_query: CallbackQuery, state: FSMContext):
 
         try:
             # Проверяем доступность API
-            async with aiohttp.ClientSession() as session:
-                try:
-                    async with session.get(f"{API_HOST}/api/api/v1/health-check") as response:
-                        if response.status != 200:
-                            raise Exception("API недоступен")
-                        response_data = await response.json()
-                        if response_data.get("status") != "ok" or response_data.get("database") != "connected":
-                            raise Exception("API не готов к работе")
-                except Exception as e:
-                    logger.error(f"API недоступен: {str(e)}")
-                    await callback_query.answer(
-                        "Ошибка: сервис временно недоступен",
-                        show_alert=True
-                    )
-                    return
+            try:
+                response_data = await api.health_check()
+                if response_data.get("status") != "ok" or response_data.get("database") != "connected":
+                    raise Exception("API не готов к работе")
+            except Exception as e:
+                logger.error(f"API недоступен: {str(e)}")
+                await callback_query.answer(
+                    "Ошибка: сервис временно недоступен",
+                    show_alert=True
+                )
+                return
 
             # Создаем FormData
             form_data = aiohttp.FormData()
@@ -147,12 +176,7 @@ async def process_callback(callback_query: CallbackQuery, state: FSMContext):
                 
                 try:
                     # Добавляем изображение в форму
-                    form_data.add_field(
-                        'image',
-                        open(image_path, 'rb'),
-                        filename=os.path.basename(image_path),
-                        content_type='image/jpeg'
-                    )
+                    await attach_image(form_data, image_path)
                     logger.info(f"Image added to form data: {image_path}")
                 except Exception as e:
                     logger.error(f"Error adding image to form data: {str(e)}")
@@ -167,40 +191,35 @@ async def process_callback(callback_query: CallbackQuery, state: FSMContext):
             # Логируем данные перед отправкой
             logger.info(f"Current state data: {data}")
             logger.info(f"Form data fields: {form_data._fields}")
-            logger.info(f"Sending request to: {API_HOST}/api/api/items/?telegram_id={callback_query.from_user.id}")
+            logger.info(f"Creating item for telegram_id={callback_query.from_user.id}")
             await logger.complete()
 
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        f"{API_HOST}/api/api/items/?telegram_id={callback_query.from_user.id}",
-                        data=form_data
-                    ) as response:
-                        response_text = await response.text()
-                        logger.info(f"API Response status: {response.status}")
-                        logger.info(f"API Response headers: {response.headers}")
-                        logger.info(f"API Response text: {response_text}")
-                        
-                        if response.status == 200:
-                            await callback_query.answer(
-                                "Объявление успешно создано",
-                                show_alert=True
-                            )
-                            await state.set_state(None)
-                            await state.clear()
-                            await callback_query.message.delete()
-                            await callback_query.bot.send_message(
-                                chat_id=callback_query.message.chat.id,
-                                text="Выберите нужный пункт меню 👇",
-                                reply_markup=await main_menu(),
-                            )
-                        else:
-                            error_msg = f"Ошибка при создании объявления: {response_text}"
-                            logger.error(error_msg)
-                            await callback_query.answer(
-                                error_msg,
-                                show_alert=True
-                            )
+                try:
+                    created = await api.create_item(callback_query.from_user.id, form_data)
+                except ApiError as e:
+                    if e.status is None:
+                        raise
+                    error_msg = f"Ошибка при создании объявления: {e.detail}"
+                    logger.error(error_msg)
+                    await callback_query.answer(
+                        error_msg,
+                        show_alert=True
+                    )
+                    return
+                logger.info(f"API Response: {created}")
+                await callback_query.answer(
+                    "Объявление успешно создано",
+                    show_alert=True
+                )
+                await state.set_state(None)
+                await state.clear()
+                await callback_query.message.delete()
+                await callback_query.bot.send_message(
+                    chat_id=callback_query.message.chat.id,
+                    text="Выберите нужный пункт меню 👇",
+                    reply_markup=await main_menu(),
+                )
             except Exception as e:
                 error_msg = f"Ошибка при отправке на API: {str(e)}"
                 logger.error(error_msg)
@@ -241,16 +260,12 @@ async def process_callback(callback_query: CallbackQuery, state: FSMContext):
             form_data.add_field('contact', str(data["contact"]))
             form_data.add_field('description', str(data["description"]))
             
-            # Обработка изображения
+            # Обработка изображения: отправляем только новое фото,
+            # сохраненное в API изображение остается без изменений
             if "image" in data and data["image"]:
                 image_path = data["image"]
-                if os.path.exists(image_path):
-                    form_data.add_field(
-                        'image',
-                        open(image_path, 'rb'),
-                        filename=os.path.basename(image_path),
-                        content_type='image/jpeg'
-                    )
+                if is_new_photo(image_path) and os.path.exists(image_path):
+                    await attach_image(form_data, image_path)
             
             logger.info(f"Sending update data with FormData")
             
@@ -263,15 +278,13 @@ async def process_callback(callback_query: CallbackQuery, state: FSMContext):
             )
             return
         else:
-            async with aiohttp.ClientSession() as session:
-                async with session.patch(
-                    f"{API_HOST}/api/api/items/{data['id']}", data=form_data
-                ) as response:
-                    status = response.status
-                    if status != 204:
-                        error_text = await response.text()
-                        logger.error(f"Error updating item: {error_text}")
-            if status == 204:
+            try:
+                await api.update_item(data['id'], form_data)
+                updated = True
+            except ApiError as e:
+                logger.error(f"Error updating item: {e}")
+                updated = False
+            if updated:
                 await callback_query.bot.answer_callback_query(
                     callback_query.id,
                     text="Объявление обновлено",
@@ -294,10 +307,13 @@ async def process_callback(callback_query: CallbackQuery, state: FSMContext):
 
     elif callback_query.data == "delete":
         data = await state.get_data()
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(f"{API_HOST}/api/api/items/{data['id']}") as response:
-                status = response.status
-        if status == 204:
+        try:
+            await api.delete_item(data['id'])
+            deleted = True
+        except ApiError as e:
+            logger.error(f"Error deleting item: {e}")
+            deleted = False
+        if deleted:
             await callback_query.bot.answer_callback_query(
                 callback_query.id,
                 text="Объявление удалено",
@@ -325,42 +341,29 @@ async def process_callback(callback_query: CallbackQuery, state: FSMContext):
     StateFilter(Add.NAME, Add.PRICE, Add.CONTACT, Add.PHOTO, Add.DESCRIPTION)
 )
 async def process_attr_callback(
-    callback_query: CallbackQuery, state: FSMContext
+    callback_query: CallbackQuery, state: FSMContext, api: ApiClient
 ):
     logger.info(f"User:{callback_query.from_user.id} Query: {callback_query.data}")
     await logger.complete()
     if callback_query.data == "default_contact":
-        async with aiohttp.ClientSession() as session:
-            # Получаем ID пользователя по telegram_id
-            async with session.get(
-                f"{API_HOST}/api/api/users/telegram/{callback_query.from_user.id}/exists"
-            ) as response:
-                if response.status == 200:
-                    user_id = await response.json()
-                    # Получаем информацию о пользователе по его ID
-                    async with session.get(
-                        f"{API_HOST}/api/api/users/{user_id}"
-                    ) as user_response:
-                        if user_response.status == 200:
-                            result = await user_response.json()
-                            await state.update_data({"contact": result.get("contact")})
-                            await callback_query.bot.answer_callback_query(
-                                callback_query.id,
-                                text=f"Контакт сохранён",
-                                show_alert=False,
-                            )
-                        else:
-                            await callback_query.bot.answer_callback_query(
-                                callback_query.id,
-                                text=f"Ошибка при получении контакта",
-                                show_alert=True,
-                            )
-                else:
-                    await callback_query.bot.answer_callback_query(
-                        callback_query.id,
-                        text=f"Ошибка при получении ID пользователя",
-                        show_alert=True,
-                    )
+        # Получаем пользователя по telegram_id
+        try:
+            profile = await api.get_profile(callback_query.from_user.id)
+        except ApiError:
+            profile = None
+        if profile:
+            await state.update_data({"contact": profile.contact})
+            await callback_query.bot.answer_callback_query(
+                callback_query.id,
+                text=f"Контакт сохранён",
+                show_alert=False,
+            )
+        else:
+            await callback_query.bot.answer_callback_query(
+                callback_query.id,
+                text=f"Ошибка при получении контакта",
+                show_alert=True,
+            )
     else:
         await callback_query.bot.answer_callback_query(
             callback_query.id,
@@ -433,7 +436,7 @@ async def process_attr_text(message: Message, state: FSMContext):
     )
     await message.delete()
     data = await state.get_data()
-    await data["message"].delete()
+    # Карточка редактируется на месте, новое сообщение не отправляется
     await get_item_menu(data["message"], state)
     await state.set_state(Add.MAIN)
 
@@ -460,9 +463,10 @@ async def process_price(message: Message, state: FSMContext):
         )
     except Exception as e:
         await data["message"].delete()
-        await message.bot.send_photo(
-            chat_id=message.chat.id,
-            photo=data["image"],
+        await send_photo(
+            message.bot,
+            message.chat.id,
+            data["image"],
             caption=f"Выберите валюту:",
             reply_markup=await get_currency_buttons(),
         )
@@ -528,6 +532,8 @@ async def process_photo(message: Message, state: FSMContext):
                 raise Exception("File was not saved successfully")
                 
             await state.update_data(image=f"static/{unique_filename}")
+            # Telegram уже хранит это фото: карточка отправит его по file_id
+            await file_ids.set(photo_key(f"static/{unique_filename}"), photo.file_id)
             logger.info(f"Photo successfully saved as: static/{unique_filename}")
             
             await message.answer(
@@ -551,12 +557,6 @@ async def process_photo(message: Message, state: FSMContext):
     await message.delete()
     data = await state.get_data()
     if "message" in data:
-        await data["message"].delete()
-        # Создаем временный callback_query для возврата в меню
-        temp_callback = type('obj', (object,), {
-            'message': data["message"],
-            'bot': message.bot,
-            'delete': lambda: None
-        })
-        await get_item_menu(temp_callback, state)
+        # Меняем фото в той же карточке
+        await get_item_menu(data["message"], state)
     await state.set_state(Add.MAIN)
@@ -0,0 +1,264 @@
+from typing import Any, Optional
+
+import aiohttp
+from loguru import logger
+
+from .profiles import Profile, ProfileCache
+
+try:
+    import orjson
+
+    def json_dumps(value: Any) -> str:
+        return orjson.dumps(value).decode()
+
+    json_loads = orjson.loads
+except ImportError:  # orjson необязателен, стандартный json тоже работает
+    import json
+
+    json_dumps = json.dumps
+    json_loads = json.loads
+
+# Все маршруты API смонтированы под /api/api
+API_PREFIX = "/api/api"
+
+
+class ApiError(Exception):
+    """Ответ API с кодом ошибки или сбой соединения (status is None)."""
+
+    def __init__(self, status: Optional[int], detail: str):
+        super().__init__(f"{status}: {detail}" if status else detail)
+        self.status = status
+        self.detail = detail
+
+
+class ApiClient:
+    """
+    Клиент API магазина, общий для всех обработчиков.
+
+    Создается один раз в main.main() и передается в обработчики через
+    данные диспетчера (аргумент api). Соединения с API_HOST держатся
+    в пуле keep-alive, поэтому нажатие кнопки не открывает новое TCP-соединение.
+    Методы возвращают разобранный JSON и бросают ApiError при ошибке.
+
+    Профили пользователей (id, роль, контакт) кэшируются по telegram_id,
+    поэтому меню для уже известного пользователя строится без запросов к API.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        limit: int = 100,
+        limit_per_host: int = 30,
+        keepalive_timeout: float = 30,
+        timeout: float = 10,
+        upload_timeout: float = 60,
+        profile_cache_size: int = 10000,
+        profile_cache_ttl: float = 300,
+    ):
+        self.base_url = host.rstrip("/") + API_PREFIX
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.upload_timeout = aiohttp.ClientTimeout(total=upload_timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.profiles = ProfileCache(profile_cache_size, profile_cache_ttl)
+
+    async def start(self) -> None:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector, timeout=self.timeout, json_serialize=json_dumps
+        )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        not_found_ok: bool = False,
+        timeout: Optional[aiohttp.ClientTimeout] = None,
+        **kwargs,
+    ) -> Any:
+        if self._session is None:
+            raise RuntimeError("ApiClient is not started")
+        try:
+            async with self._session.request(
+                method, self.base_url + path, timeout=timeout or self.timeout, **kwargs
+            ) as response:
+                body = await response.read()
+                status = response.status
+        except (aiohttp.ClientError, TimeoutError) as e:
+            logger.error(f"API {method} {path} failed: {e!r}")
+            raise ApiError(None, str(e) or type(e).__name__)
+
+        if status == 404 and not_found_ok:
+            return None
+        if status >= 400:
+            detail = body.decode(errors="replace")
+            logger.error(f"API {method} {path} returned {status}: {detail}")
+            raise ApiError(status, detail)
+        if not body:
+            return None
+        return json_loads(body)
+
+    # Пользователи и роли
+
+    def _remember(self, user: dict) -> Profile:
+        profile = Profile.from_user(user)
+        self.profiles.set(user["telegram_id"], profile)
+        return profile
+
+    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[dict]:
+        """Пользователь с ролью или None, если он не зарегистрирован. Всегда идет в API."""
+        user = await self._request("GET", f"/users/telegram/{telegram_id}", not_found_ok=True)
+        if user is not None:
+            self._remember(user)
+        return user
+
+    async def get_profile(self, telegram_id: int) -> Optional[Profile]:
+        """Профиль из кэша или из API; None, если пользователь не зарегистрирован."""
+        profile = self.profiles.get(telegram_id)
+        if profile is not None:
+            return profile
+        user = await self.get_user_by_telegram_id(telegram_id)
+        return Profile.from_user(user) if user is not None else None
+
+    async def get_user_id(self, telegram_id: int) -> int:
+        profile = await self.get_profile(telegram_id)
+        if profile is None:
+            raise ApiError(404, "User not found")
+        return profile.user_id
+
+    async def get_user(self, user_id: int) -> dict:
+        return await self._request("GET", f"/users/{user_id}")
+
+    async def create_user(self, data: dict) -> dict:
+        user = await self._request("POST", "/users/", json=data)
+        self._remember(user)
+        return user
+
+    async def get_roles(self) -> list:
+        return await self._request("GET", "/users/roles/")
+
+    async def set_user_role(self, user_id: int, role_id: int) -> dict:
+        # В ответе пользователь с новой ролью: меню изменится без ожидания TTL
+        user = await self._request("PUT", f"/users/{user_id}/role/{role_id}")
+        self._remember(user)
+        return user
+
+    # Объявления
+
+    async def get_item(
+        self, item_id: int, size: Optional[str] = None, include_archived: bool = False
+    ) -> dict:
+        params = {}
+        if size:
+            params["size"] = size
+        if include_archived:
+            params["include_archived"] = "true"
+        return await self._request("GET", f"/items/{item_id}", params=params)
+
+    async def get_items(
+        self,
+        page: int = 1,
+        unsold: bool = False,
+        category: Optional[str] = None,
+        filter_type: Optional[str] = None,
+        filter_value: Optional[str] = None,
+    ) -> dict:
+        params = {"page": page}
+        for name, value in (
+            ("category", category),
+            ("filter_type", filter_type),
+            ("filter_value", filter_value),
+        ):
+            if value:
+                params[name] = value
+        return await self._request("GET", "/items/unsold" if unsold else "/items/", params=params)
+
+    async def get_user_unsold_items(self, user_id: int, page: int = 1) -> dict:
+        return await self._request("GET", f"/items/unsold/by_user/{user_id}", params={"page": page})
+
+    async def create_item(self, telegram_id: int, form: aiohttp.FormData) -> dict:
+        return await self._request(
+            "POST",
+            "/items/",
+            params={"telegram_id": telegram_id},
+            data=form,
+            timeout=self.upload_timeout,
+        )
+
+    async def update_item(self, item_id: int, form: aiohttp.FormData) -> None:
+        await self._request("PATCH", f"/items/{item_id}", data=form, timeout=self.upload_timeout)
+
+    async def delete_item(self, item_id: int) -> None:
+        await self._request("DELETE", f"/items/{item_id}")
+
+    # Категории
+
+    async def get_categories(self) -> list:
+        return await self._request("GET", "/categories/")
+
+    async def create_category(self, name: str) -> dict:
+        return await self._request("POST", "/categories/", json={"name": name})
+
+    async def update_category(self, category_id: int, name: str) -> dict:
+        return await self._request("PUT", f"/categories/{category_id}", json={"name": name})
+
+    async def delete_category(self, category_id: int) -> None:
+        await self._request("DELETE", f"/categories/{category_id}")
+
+    # Заказы
+
+    async def get_order(self, order_id: int) -> dict:
+        return await self._request("GET", f"/orders/{order_id}")
+
+    async def create_order(self, data: dict) -> dict:
+        return await self._request("POST", "/orders/", json=data)
+
+    async def update_order(self, order_id: int, data: dict) -> dict:
+        return await self._request("PATCH", f"/orders/{order_id}", json=data)
+
+    async def get_order_events(self, cursor: Optional[str] = None, wait: float = 0) -> dict:
+        """События заказов после cursor; API держит запрос до wait секунд, пока их нет."""
+        params = {"wait": wait}
+        if cursor:
+            params["cursor"] = cursor
+        return await self._request(
+            "GET",
+            "/orders/events",
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=wait + self.timeout.total),
+        )
+
+    async def get_user_orders(
+        self,
+        user_id: int,
+        is_buyer: bool,
+        expand: Optional[str] = None,
+        status: Optional[str] = None,
+        cursor: Optional[str] = None,
+    ) -> dict:
+        params = {"is_buyer": "true" if is_buyer else "false"}
+        for name, value in (("expand", expand), ("status", status), ("cursor", cursor)):
+            if value:
+                params[name] = value
+        return await self._request("GET", f"/orders/user/{user_id}", params=params)
+
+    # Служебное
+
+    async def get_statistics(self) -> dict:
+        return await self._request("GET", "/statistics/")
+
+    async def health_check(self) -> dict:
+        return await self._request("GET", "/v1/health-check")
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from contextlib import suppress
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, InputMediaPhoto, Message
+from loguru import logger
+
+
+class FileIdCache:
+    """
+    Соответствие изображение -> file_id Telegram, сохраняемое в SQLite.
+
+    Ключ — нормализованный путь к файлу или URL. Файлы объявлений не
+    меняются по одному и тому же пути (оригиналы API хранятся по хэшу
+    содержимого, копии бота — под uuid), поэтому file_id можно отправлять
+    вместо файла, пока Telegram его принимает. Запросы к SQLite выполняются
+    в потоке, найденные значения дополнительно держатся в памяти.
+    """
+
+    def __init__(self):
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._memory: Dict[str, str] = {}
+
+    def open(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS file_ids (key TEXT PRIMARY KEY, file_id TEXT NOT NULL)"
+            )
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _select(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT file_id FROM file_ids WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _upsert(self, key: str, file_id: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO file_ids (key, file_id) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET file_id = excluded.file_id",
+                (key, file_id),
+            )
+
+    def _delete(self, key: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM file_ids WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> Optional[str]:
+        file_id = self._memory.get(key)
+        if file_id is None and self._connection is not None:
+            file_id = await asyncio.to_thread(self._select, key)
+            if file_id is not None:
+                self._memory[key] = file_id
+        return file_id
+
+    async def set(self, key: str, file_id: str) -> None:
+        if self._memory.get(key) == file_id:
+            return
+        self._memory[key] = file_id
+        if self._connection is not None:
+            await asyncio.to_thread(self._upsert, key, file_id)
+
+    async def forget(self, key: str) -> None:
+        self._memory.pop(key, None)
+        if self._connection is not None:
+            await asyncio.to_thread(self._delete, key)
+
+
+file_ids = FileIdCache()
+
+
+def _is_url(photo: str) -> bool:
+    return photo.startswith(("http://", "https://"))
+
+
+def photo_key(photo: str) -> str:
+    """Ключ кэша: URL как есть, путь — в нормализованном виде."""
+    return photo if _is_url(photo) else os.path.normpath(photo)
+
+
+async def send_photo(bot: Bot, chat_id: int, photo: str, **kwargs) -> Message:
+    """
+    Отправляет фото по пути или URL. Если Telegram уже получал это
+    изображение, отправляется только его file_id, иначе файл загружается
+    и file_id из ответа запоминается.
+    """
+    key = photo_key(photo)
+    file_id = await file_ids.get(key)
+    if file_id is not None:
+        try:
+            return await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+        except TelegramBadRequest as e:
+            # file_id другого бота или устаревший: загружаем файл заново
+            logger.warning(f"Cached file_id for {key} was rejected: {e}")
+            await file_ids.forget(key)
+
+    message = await bot.send_photo(
+        chat_id=chat_id,
+        photo=photo if _is_url(photo) else FSInputFile(photo),
+        **kwargs,
+    )
+    if message.photo:
+        await file_ids.set(key, message.photo[-1].file_id)
+    return message
+
+
+async def edit_photo(
+    bot: Bot,
+    chat_id: int,
+    message: Optional[Message],
+    photo: str,
+    shown: Optional[str] = None,
+    **kwargs,
+) -> Message:
+    """
+    Показывает photo с подписью и клавиатурой (caption, reply_markup) в уже
+    отправленном сообщении message, не создавая нового.
+
+    shown — ключ фото (photo_key), которое сейчас в сообщении: если оно не
+    изменилось, меняется только подпись, иначе фото заменяется через
+    edit_message_media (по file_id, если он известен). Если сообщение
+    нельзя отредактировать (текстовое, слишком старое, удалено), оно
+    удаляется и фото отправляется заново.
+    """
+    key = photo_key(photo)
+    if message is not None and message.photo:
+        try:
+            if shown == key:
+                result = await bot.edit_message_caption(
+                    chat_id=message.chat.id, message_id=message.message_id, **kwargs
+                )
+            else:
+                file_id = await file_ids.get(key)
+                media = InputMediaPhoto(
+                    media=file_id or (photo if _is_url(photo) else FSInputFile(photo)),
+                    caption=kwargs.get("caption"),
+                )
+                result = await bot.edit_message_media(
+                    chat_id=message.chat.id,
+                    message_id=message.message_id,
+                    media=media,
+                    reply_markup=kwargs.get("reply_markup"),
+                )
+                if isinstance(result, Message) and result.photo:
+                    await file_ids.set(key, result.photo[-1].file_id)
+            return result if isinstance(result, Message) else message
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                return message
+            logger.info(f"Can't edit message {message.message_id}, sending a new one: {e}")
+
+    if message is not None:
+        with suppress(TelegramBadRequest):
+            await message.delete()
+    return await send_photo(bot, chat_id, photo, **kwargs)
@@ -0,0 +1,157 @@
+import asyncio
+import os
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from loguru import logger
+
+from services.api import ApiClient, ApiError
+
+
+def _read_cursor(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_cursor(path: str, cursor: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(cursor)
+    os.replace(tmp_path, path)
+
+
+async def notify_order_paid(bot: Bot, order: dict) -> None:
+    """
+    Сообщает покупателю и продавцу, что заказ оплачен. Ошибка отправки одному
+    из них (например, бот заблокирован) не мешает уведомить второго.
+    """
+    try:
+        await _notify_buyer(bot, order)
+    except TelegramAPIError as e:
+        logger.error(f"Error sending payment notification to buyer {order['buyer_telegram_id']}: {e}")
+    try:
+        await _notify_seller(bot, order)
+    except TelegramAPIError as e:
+        logger.error(f"Error sending notification to seller {order['seller_telegram_id']}: {e}")
+
+
+async def _notify_buyer(bot: Bot, order: dict) -> None:
+    await bot.send_message(
+        chat_id=order["buyer_telegram_id"],
+        text=f"✅ Заказ #{order['id']} успешно оплачен! Спасибо за покупку.\n"
+             "Скоро с вами свяжется продавец для уточнения деталей доставки.",
+        reply_markup=InlineKeyboardMarkup(
+            inline_keyboard=[
+                [
+                    InlineKeyboardButton(
+                        text="🔙 Вернуться в главное меню",
+                        callback_data="back_to_menu"
+                    )
+                ]
+            ]
+        )
+    )
+    logger.info(f"Payment notification sent to buyer {order['buyer_telegram_id']}")
+
+
+async def _notify_seller(bot: Bot, order: dict) -> None:
+    # Товар приходит вместе с заказом (в том числе из архива)
+    item_name = (order.get("item") or {}).get("name") or f"#{order['item_id']}"
+    seller_message = (
+        "🛍️ У вас новый заказ!\n\n"
+        f"📱 Товар: {item_name}\n"
+        f"💰 Сумма: {order['total']} RUB\n"
+        f"🏠 Адрес доставки: {order['delivery_address']}\n"
+        f"📞 Телефон покупателя: {order['buyer_phone']}\n\n"
+        "Пожалуйста, свяжитесь с покупателем для уточнения деталей доставки."
+    )
+    await bot.send_message(
+        chat_id=order["seller_telegram_id"],
+        text=seller_message,
+        reply_markup=InlineKeyboardMarkup(
+            inline_keyboard=[
+                [
+                    InlineKeyboardButton(
+                        text="📦 Управление заказами",
+                        callback_data="my_orders_seller"
+                    )
+                ]
+            ]
+        )
+    )
+    logger.info(f"Notification sent to seller {order['seller_telegram_id']}")
+
+
+async def consume_order_events(
+    bot: Bot,
+    api: ApiClient,
+    cursor_path: str,
+    wait: float = 25,
+    retry_delay: float = 5,
+) -> None:
+    """
+    Фоновая задача: читает журнал событий заказов API (GET /orders/events
+    в режиме long polling) и рассылает уведомления об оплате.
+
+    Курсор сохраняется в cursor_path после каждой пачки, поэтому после
+    перезапуска бот продолжает с того же места и не теряет оплаты, случившиеся
+    пока он был остановлен. При первом запуске чтение начинается с конца
+    журнала. Уведомление может повториться, если бот остановится между
+    отправкой и сохранением курсора. API хранит события
+    ORDER_EVENTS_RETENTION_DAYS дней: если бот простоял дольше, более
+    старые оплаты он пропустит.
+    """
+    try:
+        cursor = await asyncio.to_thread(_read_cursor, cursor_path)
+    except Exception as e:
+        logger.error(f"Can't read order events cursor {cursor_path}, starting from the tail: {e}")
+        cursor = None
+    while True:
+        # Задача — единственный источник уведомлений об оплате, поэтому любая
+        # ошибка (ответ API, запись курсора на диск) только откладывает чтение
+        try:
+            cursor = await _consume_batch(bot, api, cursor, cursor_path, wait)
+        except ApiError as e:
+            if e.status == 400 and cursor is not None:
+                # Курсор от другой базы или поврежден: начинаем с конца журнала
+                logger.error(f"Order events cursor rejected, starting from the tail: {e}")
+                cursor = None
+                continue
+            logger.warning(f"Can't read order events, retrying in {retry_delay}s: {e}")
+            await asyncio.sleep(retry_delay)
+        except Exception as e:
+            logger.exception(f"Error consuming order events, retrying in {retry_delay}s: {e}")
+            await asyncio.sleep(retry_delay)
+
+
+async def _consume_batch(
+    bot: Bot, api: ApiClient, cursor: Optional[str], cursor_path: str, wait: float
+) -> Optional[str]:
+    """Обрабатывает одну пачку событий и возвращает курсор для следующего запроса."""
+    result = await api.get_order_events(cursor, wait=wait)
+    for event in result["events"]:
+        order = event.get("order")
+        if event["status"] != "PAID" or order is None:
+            continue
+        try:
+            await notify_order_paid(bot, order)
+        except Exception as e:
+            logger.error(f"Error sending payment notification for order {event['order_id']}: {e}")
+
+    if result["cursor"] == cursor:
+        return cursor
+    try:
+        await asyncio.to_thread(_write_cursor, cursor_path, result["cursor"])
+    except OSError as e:
+        # Пачка уже разослана: продолжаем с нового курсора в памяти, чтобы не
+        # повторять уведомления; после перезапуска часть из них может повториться
+        logger.error(f"Can't save order events cursor to {cursor_path}: {e}")
+    return result["cursor"]
@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Profile:
+    """То, что бот знает о пользователе для построения меню и заказов."""
+
+    user_id: int
+    role: str
+    contact: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: dict) -> "Profile":
+        """Из ответа API с пользователем (UserResponseModel)."""
+        return cls(
+            user_id=user["id"],
+            role=(user.get("role") or {}).get("name", "buyer"),
+            contact=user.get("contact"),
+        )
+
+
+class ProfileCache:
+    """
+    Ограниченный LRU-кэш telegram_id -> Profile со сроком жизни.
+
+    Заполняется при первом обращении к пользователю и обновляется ответами
+    API, которые меняют пользователя (регистрация, смена роли). Срок жизни
+    ограничивает, насколько долго бот может не видеть изменения, сделанные
+    в обход него (другим экземпляром бота или напрямую через API).
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[Profile, float]]" = OrderedDict()
+
+    def get(self, telegram_id: int) -> Optional[Profile]:
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] >= self.ttl:
+            del self._entries[telegram_id]
+            return None
+        self._entries.move_to_end(telegram_id)
+        return entry[0]
+
+    def set(self, telegram_id: int, profile: Profile) -> None:
+        self._entries[telegram_id] = (profile, time.monotonic())
+        self._entries.move_to_end(telegram_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int) -> None:
+        self._entries.pop(telegram_id, None)
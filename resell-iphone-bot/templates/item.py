@@ -1,15 +1,14 @@
-import aiohttp
 from aiogram.fsm.context import FSMContext
 from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
     CallbackQuery,
     Message,
-    FSInputFile,
 )
 
 from states import item
-from config import API_HOST
+from services.api import ApiClient
+from services.media import edit_photo, photo_key, send_photo
 
 
 async def item_menu(upload: bool = False) -> InlineKeyboardMarkup:
@@ -75,11 +74,11 @@ async def get_item_menu(
     photo: str = "https://elm48.ru/bitrix/templates/kitlisa-market/img/shop.png",
     update: bool = False,
 ) -> Message:
-    (
-        await callback_query.message.delete()
-        if isinstance(callback_query, CallbackQuery)
-        else callback_query.delete()
-    )
+    """
+    Показывает карточку объявления. Если callback_query относится к уже
+    показанной карточке (или передано само сообщение карточки), она
+    редактируется на месте, иначе сообщение заменяется новой карточкой.
+    """
     state_data = await state.get_data()
     if state_data.get("update"):
         update = True
@@ -90,73 +89,36 @@ async def get_item_menu(
 Валюта: {state_data.get('currency')}
 Контактный номер: {state_data.get('contact')}
     """
-    chat_id = (
-        callback_query.chat.id
+    card = (
+        callback_query
         if isinstance(callback_query, Message)
-        else callback_query.message.chat.id
+        else callback_query.message
     )
 
     if state_data.get("image"):
         photo = state_data.get("image")
         photo = photo.replace("http://127.0.0.1:8015/api", ".")
-        message = await callback_query.bot.send_photo(
-            chat_id=chat_id,
-            photo=FSInputFile(photo),
-            caption=caption,
-            reply_markup=await item_menu(update),
-        )
-        await state.update_data(message=message)
-        return message
-    if await state.get_state() is None:
+    elif await state.get_state() is None:
         await state.set_state(item.Add.MAIN)
-        message = await callback_query.bot.send_photo(
-            chat_id=chat_id,
-            photo=photo,
-            caption=caption,
-            reply_markup=await item_menu(update),
-        )
-        await state.update_data(message=message)
-        return message
-    if isinstance(callback_query, Message):
-        message = await callback_query.bot.send_photo(
-            chat_id=chat_id,
-            photo=photo,
-            caption=caption,
-            reply_markup=await item_menu(update),
-        )
-        await state.update_data(message=message)
-        return message
-    elif state_data.get("photo"):
-        message = await callback_query.bot.send_photo(
-            chat_id=chat_id,
-            photo=FSInputFile(state_data.get("photo")),
-            caption=caption,
-            reply_markup=await item_menu(update),
-        )
-        await state.update_data(message=message)
-        return message
-    else:
-        message = await callback_query.bot.send_photo(
-            chat_id=chat_id,
-            photo=photo,
-            caption=caption,
-            reply_markup=await item_menu(update),
-        )
-        await state.update_data(message=message)
-        return message
+    elif isinstance(callback_query, CallbackQuery) and state_data.get("photo"):
+        photo = state_data.get("photo")
+
+    message = await edit_photo(
+        callback_query.bot,
+        card.chat.id,
+        card,
+        photo,
+        shown=state_data.get("card_photo"),
+        caption=caption,
+        reply_markup=await item_menu(update),
+    )
+    await state.update_data(message=message, card_photo=photo_key(photo))
+    return message
 
 
-async def get_categories_buttons() -> InlineKeyboardMarkup:
+async def get_categories_buttons(api: ApiClient) -> InlineKeyboardMarkup:
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{API_HOST}/api/api/categories/") as response:
-                if response.status != 200:
-                    return InlineKeyboardMarkup(
-                        inline_keyboard=[
-                            [InlineKeyboardButton(text="🔙 Назад", callback_data="create_ad")]
-                        ]
-                    )
-                result = await response.json()
+        result = await api.get_categories()
 
         keyboard = [
             [
@@ -257,25 +219,28 @@ async def view_item_menu(
     if state_data.get("image"):
         photo = state_data.get("image")
         photo = photo.replace("http://127.0.0.1:8015/api", ".")
-        message = await callback_query.bot.send_photo(
-            chat_id=chat_id,
-            photo=FSInputFile(photo),
+        message = await send_photo(
+            callback_query.bot,
+            chat_id,
+            photo,
             caption=caption,
             reply_markup=markup,
         )
         return message
     elif state_data.get("photo"):
-        message = await callback_query.bot.send_photo(
-            chat_id=chat_id,
-            photo=FSInputFile(state_data.get("photo")),
+        message = await send_photo(
+            callback_query.bot,
+            chat_id,
+            state_data.get("photo"),
             caption=caption,
             reply_markup=markup,
         )
         return message
     else:
-        message = await callback_query.bot.send_photo(
-            chat_id=chat_id,
-            photo=photo,
+        message = await send_photo(
+            callback_query.bot,
+            chat_id,
+            photo,
             caption=caption,
             reply_markup=markup,
         )
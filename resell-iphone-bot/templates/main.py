@@ -1,4 +1,3 @@
-import aiohttp
 from aiogram.types import (
     ReplyKeyboardMarkup,
     KeyboardButton,
@@ -11,6 +10,8 @@ from aiogram.types import (
 from aiogram.fsm.context import FSMContext
 from loguru import logger
 
+from services.api import ApiClient
+
 
 async def contact_keyboard() -> ReplyKeyboardMarkup:
     keyboard = [[KeyboardButton(text="Отправить контакты", request_contact=True)]]
@@ -85,33 +86,12 @@ def get_main_menu() -> InlineKeyboardMarkup:
     return markup
 
 
-async def get_users_ads(telegram_id: int, host: str, page: int = 1) -> InlineKeyboardMarkup:
+async def get_users_ads(telegram_id: int, api: ApiClient, page: int = 1) -> InlineKeyboardMarkup:
     try:
         # Сначала получаем ID пользователя по telegram_id
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{host}/api/api/users/telegram/{telegram_id}/id"
-            ) as response:
-                if response.status != 200:
-                    return InlineKeyboardMarkup(
-                        inline_keyboard=[
-                            [InlineKeyboardButton(text="🔙 Назад в меню", callback_data="back_to_menu")]
-                        ]
-                    )
-                user_id = await response.json()
-
+        user_id = await api.get_user_id(telegram_id)
         # Получаем непроданные объявления пользователя
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{host}/api/api/items/unsold/by_user/{user_id}?page={page}"
-            ) as response:
-                if response.status != 200:
-                    return InlineKeyboardMarkup(
-                        inline_keyboard=[
-                            [InlineKeyboardButton(text="🔙 Назад в меню", callback_data="back_to_menu")]
-                        ]
-                    )
-                result = await response.json()
+        result = await api.get_user_unsold_items(user_id, page)
 
         keyboard = [
             [
@@ -149,14 +129,9 @@ async def get_users_ads(telegram_id: int, host: str, page: int = 1) -> InlineKey
 
 
 async def get_ads(
-    host: str, page: int = 1, category: str = None
+    api: ApiClient, page: int = 1, category: str = None
 ) -> InlineKeyboardMarkup:
-    url = f"{host}/api/api/items/?page={page}"
-    if category:
-        url += f"&category={category}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            result = await response.json()
+    result = await api.get_items(page, category=category)
     keyboard = [
         [
             InlineKeyboardButton(
@@ -202,39 +177,28 @@ async def get_filter_menu() -> InlineKeyboardMarkup:
 
 
 async def get_ads_with_filters(
-    host: str,
+    api: ApiClient,
     page: int = 1,
     category: str = None,
     filter_type: str = None,
     filter_value: str = None,
     show_all: bool = False
 ) -> InlineKeyboardMarkup:
-    # Формируем URL с параметрами
-    # Для обычных пользователей и по умолчанию используем эндпоинт unsold
-    base_url = f"{host}/api/api/items/{'unsold' if not show_all else ''}"
-    url = f"{base_url}?page={page}"
-    
-    if category:
-        url += f"&category={category}"
-    if filter_type:
-        url += f"&filter_type={filter_type}"
-    if filter_value:
-        url += f"&filter_value={filter_value}"
-    
-    logger.info(f"Requesting ads with URL: {url}")
+    logger.info(
+        f"Requesting ads: page={page}, category={category}, "
+        f"filter_type={filter_type}, filter_value={filter_value}"
+    )
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    logger.error(f"Error getting ads: {response.status}")
-                    return InlineKeyboardMarkup(
-                        inline_keyboard=[
-                            [InlineKeyboardButton(text="🔙 Назад в меню", callback_data="back_to_menu")]
-                        ]
-                    )
-                result = await response.json()
-                logger.info(f"Received response: {result}")
+        # Для обычных пользователей и по умолчанию используем эндпоинт unsold
+        result = await api.get_items(
+            page,
+            unsold=not show_all,
+            category=category,
+            filter_type=filter_type,
+            filter_value=filter_value,
+        )
+        logger.info(f"Received response: {result}")
         
         # Создаем кнопки для объявлений
         keyboard = []
@@ -299,21 +263,10 @@ async def get_ads_with_filters(
         )
 
 
-async def get_all_items(host: str, page: int = 1, show_unsold: bool = False) -> InlineKeyboardMarkup:
+async def get_all_items(api: ApiClient, page: int = 1, show_unsold: bool = False) -> InlineKeyboardMarkup:
     try:
-        # Формируем URL в зависимости от того, нужны ли все товары или только непроданные
-        endpoint = "unsold" if show_unsold else ""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{host}/api/api/items/{endpoint}?page={page}"
-            ) as response:
-                if response.status != 200:
-                    return InlineKeyboardMarkup(
-                        inline_keyboard=[
-                            [InlineKeyboardButton(text="🔙 Назад в меню", callback_data="back_to_menu")]
-                        ]
-                    )
-                result = await response.json()
+        # Все товары или только непроданные
+        result = await api.get_items(page, unsold=show_unsold)
 
         keyboard = [
             [